@@ -0,0 +1,178 @@
+"""Bundles - a translated project compiled into one zipapp (.pyz) with its bytecode, compact debug maps, language files and the
+debugger, so programs start from one file (`python project.pyz [program] [arguments]`) without compiling or parsing anything"""
+import builtins
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+
+import debug
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_MODULES = ("bundle.py", "debug.py", "heatmap.py", "log.py", "languages/language.py")  # What bundles run with, besides the standard library
+BOOTSTRAP = "import bundle\nbundle.main()\n"
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)  # Every entry's, so the same project always bundles to the same bytes
+
+
+def pyc_data(code, source: bytes):
+    """Get the .pyc file contents of a code object - unchecked hash-based, so zipimport uses it whatever the archive's dates
+    (and falls back to the source next to it if another Python version built it)"""
+    return importlib.util.MAGIC_NUMBER + (0b01).to_bytes(4, "little") + importlib.util.source_hash(source) + marshal.dumps(code)
+
+
+def bundle(lang_dir: str, project_dir: str, dest_file: str, main: str = None):
+    """Compile every translated file (*.py) in project_dir into the zipapp dest_file, returning the names of its programs
+    (paths in project_dir without .py, e.g. "juegos/serpiente"). Lines are preserved (see compile.compile), so debug maps stay small.
+    main is the program run when none is named - "main" if there is one, or the only program."""
+    import compile  # The parser is only needed to build bundles, not in them
+    import languages.language
+
+    sources = {}  # Name > translated source
+    for dir_path, dir_names, file_names in os.walk(project_dir):
+        dir_names[:] = sorted(name for name in dir_names if name != "__pycache__")
+        for file_name in sorted(file_names):
+            if (not file_name.endswith(".py")):
+                continue
+            path = os.path.join(dir_path, file_name)
+            with open(path, "r", encoding="utf8") as reader:
+                sources[os.path.relpath(path, project_dir)[:-len(".py")].replace(os.sep, "/")] = reader.read()
+
+    programs = {}  # Name > (translated source, compiled source, debug data)
+    with tempfile.TemporaryDirectory() as summary_dir:
+        # Programs import each other's interface summaries, so each one is compiled after those it imports - in rounds, until a round compiles nothing
+        pending = list(sources)
+        while (len(pending) > 0):
+            failed = []
+            for name in pending:
+                module_dirs = list(dict.fromkeys([os.path.join(summary_dir, os.path.dirname(name)), summary_dir]))  # Beside it, then the top
+                language = languages.language.LanguageEnv(lang_dir, module_dirs=module_dirs)
+                try:
+                    result = compile.compile_source(language, sources[name], lines=True)
+                except Exception as err:
+                    failed.append((name, err))  # May import one not compiled yet
+                    continue
+                os.makedirs(module_dirs[0], exist_ok=True)
+                compile.write_summary(language, result, os.path.join(summary_dir, name + ".py"))
+                debug_data = compile.get_debug_data(result, sources[name])
+                del debug_data["mappings"]  # Character mappings - tracebacks only need lines
+                programs[name] = (sources[name], str(result), debug_data)
+            if (len(failed) == len(pending)):
+                raise failed[0][1]
+            pending = [name for name, err in failed]
+    programs = {name: programs[name] for name in sources}
+
+    if (main is None):
+        main = "main" if "main" in programs else (next(iter(programs)) if len(programs) == 1 else None)
+    elif (main not in programs):
+        raise ValueError(f"No program {main} in {project_dir}")
+
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(dest_file, "w", zipfile.ZIP_DEFLATED) as archive:
+        def write(name: str, data: bytes):
+            digest.update(name.encode("utf8") + b"\0" + data)
+            archive.writestr(zipfile.ZipInfo(name, ZIP_DATE), data, zipfile.ZIP_DEFLATED)
+
+        write("__main__.py", BOOTSTRAP.encode("utf8"))
+        for package in sorted({os.path.dirname(module) for module in RUNTIME_MODULES} - {""}):
+            write(package + "/", b"")  # zipimport only finds namespace packages with an entry for their directory
+        for module in RUNTIME_MODULES:
+            with open(os.path.join(ROOT_DIR, module), "rb") as reader:
+                source = reader.read()
+            write(module, source)
+            write(module + "c", pyc_data(builtins.compile(source, module, "exec", dont_inherit=True), source))
+        layers = languages.language.LanguageEnv.layer_dirs(lang_dir)
+        if (len(layers) == 1):
+            for file_name in sorted(os.listdir(lang_dir)):
+                if (file_name.endswith(".json")):
+                    with open(os.path.join(lang_dir, file_name), "rb") as reader:
+                        write("language/" + file_name, reader.read())
+        else:
+            # Layered language - its files laid over the ones under it, so the bundle has one whole language
+            language = languages.language.LanguageEnv(lang_dir)
+            file_names = {file_name for layer in layers for file_name in os.listdir(layer) if file_name.endswith(".json")}
+            for file_name in sorted(file_names - {languages.language.LanguageEnv.LAYER_FILE}):
+                name = file_name[:-len(".json")]
+                data = language.load_lib(name) if name.startswith(".") else language.load_pack(name)
+                write("language/" + file_name, json.dumps(data, default=languages.language.LanguageNode.to_json, ensure_ascii=False).encode("utf8"))
+
+        for name, (src, compiled, debug_data) in programs.items():
+            compiled_data = compiled.encode("utf8")
+            write(f"sources/{name}.py", src.encode("utf8"))
+            # Compiled modules, so programs can import each other (from bytecode, or the compiled source for another Python version)
+            write(f"programs/{name}.py", compiled_data)
+            write(f"programs/{name}.pyc", pyc_data(builtins.compile(compiled, name + ".out.py", "exec", dont_inherit=True), compiled_data))
+            write(f"programs/{name}.json", json.dumps(debug_data).encode("utf8"))
+
+        write("bundle.json", json.dumps({"main": main, "programs": list(programs), "id": digest.hexdigest()[:16]}).encode("utf8"))
+
+    return list(programs)
+
+
+# Running bundles
+class BundleDebugger(debug.Debugger):
+    """Debugger for a program in a bundle, reading its source and debug map from the archive.
+    The language files are only extracted (to a temporary directory, once for each bundle) if an error needs translating."""
+
+    def __init__(self, archive: zipfile.ZipFile, manifest: dict, program: str):
+        self.archive = archive
+        self.program = program
+        language_path = os.path.join(tempfile.gettempdir(), f"globalpython-bundle-{manifest['id']}")
+        super().__init__(program + ".out.py", program + ".py", program + ".json", language_path, code=self.load_code())
+
+    def load_code(self):
+        """Get the program's code object - compiled from its compiled source if the bytecode is from another Python version"""
+        data = self.archive.read(f"programs/{self.program}.pyc")
+        if (data[:4] == importlib.util.MAGIC_NUMBER):
+            return marshal.loads(data[16:])
+        return builtins.compile(self.archive.read(f"programs/{self.program}.py"), self.program + ".out.py", "exec")
+
+    def load_debug_file(self, debug_file):
+        self._debug_info = json.loads(self.archive.read(f"programs/{self.program}.json"))
+        self.mappings = self._debug_info.get("mappings", [])
+
+    def get_line(self, filename: str, lineno: int):
+        lines = self.archive.read(f"sources/{self.program}.py").decode("utf8").split("\n")
+        return lines[min(lineno, len(lines)) - 1].strip()
+
+    def get_lang(self):
+        if (self._lang is None and not os.path.isdir(self.language_code)):
+            # Extract beside the final directory, then move it there whole - another run may be extracting too
+            extract_dir = tempfile.mkdtemp(prefix=os.path.basename(self.language_code) + "-", dir=os.path.dirname(self.language_code))
+            for name in self.archive.namelist():
+                if (name.startswith("language/")):
+                    with open(os.path.join(extract_dir, name[len("language/"):]), "wb") as writer:
+                        writer.write(self.archive.read(name))
+            try:
+                os.rename(extract_dir, self.language_code)
+            except OSError:
+                shutil.rmtree(extract_dir, ignore_errors=True)  # Already extracted
+        return super().get_lang()
+
+
+def main(argv: list = None):
+    """Run a program of the bundle this module is in with the debugger - the first argument if it names a program, otherwise the main one"""
+    argv = sys.argv[1:] if argv is None else argv
+    archive_path = os.path.dirname(os.path.abspath(__file__))
+    with zipfile.ZipFile(archive_path) as archive:
+        manifest = json.loads(archive.read("bundle.json"))
+        program = manifest["main"]
+        if (len(argv) > 0 and argv[0] in manifest["programs"]):
+            program = argv.pop(0)
+        if (program is None):
+            sys.exit(f"Choose a program: {', '.join(manifest['programs'])}")
+
+        sys.argv = [program + ".py"] + argv
+        # Other programs can be imported like modules beside a script - from the program's directory, then the top of the project
+        programs_dir = os.path.join(archive_path, "programs")
+        sys.path[:0] = list(dict.fromkeys([os.path.normpath(os.path.join(programs_dir, os.path.dirname(program))), programs_dir]))
+        BundleDebugger(archive, manifest, program)
+
+
+if __name__ == "__main__":
+    # bundle.py language_path project_dir dest_file [main] - e.g. bundle.py languages/es proyecto proyecto.pyz
+    print(", ".join(bundle(*sys.argv[1:5])))
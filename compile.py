@@ -1,7 +1,14 @@
+import ast
+import bisect
+import builtins
 import json
+import os
+import sys
 
+import compilers.fast
 import compilers.python
 import languages.language
+from log import set_verbosity_options
 import time
 from os import system
 
@@ -30,66 +37,195 @@ def annotate_mappings(new_struct, translated: str):
     return compiled_result
 
 
-def compile(lang_dir: str, source_file: str, dest_file: str, debug_file: str):
-    """Compile the code from the language in source to English Python in dest, saving the mappings in debug_file in JSON format if it's not None."""
-    # Get language files
-    language = languages.language.LanguageEnv(lang_dir)
-    # Build the lexer and parser
+def get_line_targets(result, src: str):
+    """Get the translated line (1-indexed) each compiled line of result starts at, from the first mapping on it.
+    Index 0 is unused; lines without mappings are None."""
+    translated_line_starts = [0]
+    for i, char in enumerate(src):
+        if (char == "\n"):
+            translated_line_starts.append(i + 1)
+
+    targets = [None]
+    line_start = 0
+    mapping_index = 0
+    for line in result.compiled.split("\n"):
+        line_end = line_start + len(line)
+        # Skip mappings from previous lines
+        while (mapping_index < len(result.mappings) and result.mappings[mapping_index][1] < line_start):
+            mapping_index += 1
+        if (mapping_index < len(result.mappings) and result.mappings[mapping_index][1] <= line_end):
+            targets.append(bisect.bisect_right(translated_line_starts, result.mappings[mapping_index][0]))
+        else:
+            targets.append(None)
+        line_start = line_end + 1
+
+    return targets
+
+
+def preserve_lines(result, src: str):
+    """Pad result with blank lines so compiled line numbers equal translated ones where possible.
+    Marks result.attr["lines_preserved"] if every line matches, otherwise saves exact line mappings in result.attr."""
+    targets = get_line_targets(result, src)
+    if (result.pad_lines(targets)):
+        result.attr["lines_preserved"] = True
+    else:
+        # Some lines couldn't move - map them all
+        line_mappings = [0]
+        for target in get_line_targets(result, src)[1:]:
+            line_mappings.append(target if target is not None else line_mappings[-1])  # Blank lines stay with the line before
+        result.attr["line_mappings"] = line_mappings
+
+
+def get_debug_data(result, src: str):
+    """Get the debug data (mappings, line mappings and imported modules) of a compiled result from its translated source src.
+    Format:
+    "mappings": [[translated_index,compiled_index],...]",
+    "line_mappings: [translated_line,...] or None if they are the same as compiled lines"""  # For each compiled line, 1-indexed
+    debug_data = {}
+
+    # Encode mappings
+    mappings = result.mappings
+    debug_data["mappings"] = mappings
+    # Imported modules
+    if("imported" in result.attr):
+        debug_data["imported"] = result.attr["imported"]  # [[translated_module_path, location_path]...]
+    else:
+        debug_data["imported"] = []
+
+    if (result.attr.get("lines_preserved")):
+        # Compiled line numbers are translated line numbers - no mapping needed
+        debug_data["line_mappings"] = None
+        return debug_data
+    if ("line_mappings" in result.attr):
+        debug_data["line_mappings"] = result.attr["line_mappings"]
+        return debug_data
+
+    # Get line mappings
+    lines = [None] + result.compiled.split("\n")
+    len_lines = len(lines)
+    next_i = 0
+    line = 1
+    translated_lines = [None] + src.split("\n")
+    len_translated_lines = len(translated_lines)
+    translated_line = 1  # 1-indexed
+    translated_i = 0
+    line_mappings = [0]  # Line 0 > 0
+    for mapping in result.mappings:
+        if (mapping[1] >= next_i):
+            # Update translated line
+            while (translated_i < mapping[0] and translated_line < len_translated_lines):
+                translated_line += 1
+                translated_i += len(translated_lines[translated_line - 1])
+            # Add mapping
+            line_mappings.append(translated_line - 1)  # Look for previous line
+            # Update next_i - only 1 for each compiled line
+            if (line < len_lines):
+                next_i += len(lines[line])
+                line += 1
+            else:
+                # End Of File
+                break
+
+    debug_data["line_mappings"] = line_mappings
+
+    return debug_data
+
+
+def build_parser(language):
+    """Build the lexer and parser for a LanguageEnv"""
     lexer = compilers.python.PythonLexer(language)
     lexer.build()
-    parser = compilers.python.PythonParser(language, lexer)
-    parser.build()
-    # Run lexer and parser on source file
+    return compilers.python.PythonParser(language, lexer)
+
+
+def compile_source(language, src: str, fast: bool = False, lines: bool = False, cancel_event=None, parser=None):
+    """Compile translated source text with a LanguageEnv, returning the parsed result (see compile for fast and lines).
+    Parsing stops with compilers._template.ParseCancelled once cancel_event (a threading.Event) is set.
+    parser can be one from build_parser for the same language, reused instead of building another."""
+    if (fast):
+        try:
+            return compilers.fast.FastTranslator(language).translate(src)
+        except compilers.fast.FallbackNeeded:
+            pass
+
+    if (parser is None):
+        parser = build_parser(language)
+    else:
+        parser.use_language(language)
+        parser.lexer.lexer.lineno = 1
+    parser.preserve_lines = lines
+    parser.lexer.cancel_event = cancel_event
+    # Run lexer and parser on source
+    result = parser.parse(src)
+    if (lines):
+        preserve_lines(result, src)
+    return result
+
+
+def compile(lang_dir: str, source_file: str, dest_file: str, debug_file: str, fast: bool = False, lines: bool = False, summary: bool = False):
+    """Compile the code from the language in source to English Python in dest, saving the mappings in debug_file in JSON format if it's not None.
+    If fast, only translate keywords and statically-known names in one pass, falling back to the full parser when the source needs type inference.
+    If lines, keep every compiled statement on the same line number as its translated source (fast translations always do).
+    Translated modules compiled beside dest with summaries can be imported. If summary, dest's interface summary is saved beside it too
+    (see languages.language.LanguageEnv.module_summary) - fast translations don't infer types, so the full parser is used."""
+    # Get language files
+    language = languages.language.LanguageEnv(lang_dir, module_dirs=[os.path.dirname(os.path.abspath(dest_file))])
     with open(source_file, "r", encoding='utf8') as reader:
         src = reader.read()
-    result = parser.parse(src)
+
+    result = compile_source(language, src, fast and not summary, lines)
     # Write compiled code
     with open(dest_file, "w", encoding='utf8') as writer:
         writer.write(str(result))
 
     # Write debug code
-    """Format:
-    "mappings": [[translated_index,compiled_index],...]",
-    "line_mappings: [translated_line,...] """  # For each compiled line, 1-indexed
     if (debug_file is not None):
-        debug_data = {}
-
-        # Encode mappings
-        mappings = result.mappings
-
-        # Get line mappings
-        lines = [None] + result.compiled.split("\n")
-        len_lines = len(lines)
-        next_i = 0
-        line = 1
-        translated_lines = [None] + src.split("\n")
-        len_translated_lines = len(translated_lines)
-        translated_line = 1  # 1-indexed
-        translated_i = 0
-        line_mappings = [0]  # Line 0 > 0
-        for mapping in result.mappings:
-            if (mapping[1] >= next_i):
-                # Update translated line
-                while (translated_i < mapping[0] and translated_line < len_translated_lines):
-                    translated_line += 1
-                    translated_i += len(translated_lines[translated_line - 1])
-                # Add mapping
-                line_mappings.append(translated_line - 1)  # Look for previous line
-                # Update next_i - only 1 for each compiled line
-                if (line < len_lines):
-                    next_i += len(lines[line])
-                    line += 1
-                else:
-                    # End Of File
-                    break
-
-        debug_data["mappings"] = mappings
-        debug_data["line_mappings"] = line_mappings
-        # Imported modules
-        if("imported" in result.attr):
-            debug_data["imported"] = result.attr["imported"]  # [[translated_module_path, location_path]...]
-        else:
-            debug_data["imported"] = []
+        debug_data = get_debug_data(result, src)
 
         with open(debug_file, "w", encoding='utf8') as writer:
-            json.dump(debug_data, writer)
\ No newline at end of file
+            json.dump(debug_data, writer)
+
+    # Write interface summary
+    if (summary):
+        write_summary(language, result, dest_file)
+
+
+def summary_path(dest_file: str):
+    """Get the interface summary path of a compiled module - beside it, like a .pyi"""
+    return os.path.splitext(dest_file)[0] + languages.language.LanguageEnv.SUMMARY_SUFFIX
+
+
+def write_summary(language, result, dest_file: str):
+    """Save the interface summary of a module compiled to dest_file from its parsed result, returning it"""
+    module = os.path.splitext(os.path.basename(dest_file))[0]
+    module_summary = language.module_summary(module, result.attr["module_scope"])
+    with open(summary_path(dest_file), "w", encoding='utf8') as writer:
+        json.dump(module_summary, writer, ensure_ascii=False)
+    return module_summary
+
+
+def compile_code(lang_dir: str, source_file: str, dest_file: str = None):
+    """Compile the code from the language in source straight to a Python code object, returning it and the parsed result.
+    The parser builds the ast with translated positions, so tracebacks need no mappings; the compiled text is still written to dest if it's not None."""
+    language = languages.language.LanguageEnv(lang_dir)
+    with open(source_file, "r", encoding='utf8') as reader:
+        src = reader.read()
+
+    parser = build_parser(language)
+    parser.emit_ast = True
+    result = parser.parse(src)
+
+    if (dest_file is not None):
+        # For inspection
+        with open(dest_file, "w", encoding='utf8') as writer:
+            writer.write(str(result))
+
+    code = builtins.compile(ast.fix_missing_locations(result.node), source_file, "exec")
+    return code, result
+
+
+if __name__ == "__main__":
+    # compile.py language_path source_file dest_file debug_file [--fast] [--lines] [--summary] [-v|-q] - e.g. compile.py languages/es programa.py out.py debug.json
+    options = sys.argv[5:]
+    set_verbosity_options(options)
+    compile(*sys.argv[1:5], fast="--fast" in options, lines="--lines" in options, summary="--summary" in options)
@@ -2,7 +2,32 @@ from ply import lex, yacc
 from ply.lex import Lexer
 
 from collections import deque
-from copy import deepcopy
+import copy
+import logging
+import re
+import threading
+
+from log import logger, ply_log
+
+yacc_lock = threading.Lock()  # yacc writes and imports the table module - one build at a time, so threads never read a half-written one
+
+class ParseCancelled(Exception):
+  """Parsing was stopped from another thread, through the lexer's cancel_event"""
+
+def positioned_syntax_error(lang, msg: str, data: str, pos: int, lineno: int):
+  """Get a SyntaxError at pos (on line lineno) of the translated source data, with its English message translated by lang"""
+  path = (".PKG", "builtins", "SyntaxError")
+  msg = lang.translate_err(msg, path, lang.raw_path_to_data(path))
+  line_start = data.rfind("\n", 0, pos) + 1
+  line_end = data.find("\n", pos)
+  text = data[line_start:line_end if line_end >= 0 else len(data)]
+  return SyntaxError(msg, (None, lineno, pos - line_start + 1, text))
+
+def syntax_errors(errors: list):
+  """Get one SyntaxError to raise for errors - the first one, with every one in its errors attribute"""
+  err = SyntaxError(*errors[0].args)
+  err.errors = errors
+  return err
 
 class PushableLexer(): # Supports pushing of tokens for a lexer
   lexer = None
@@ -10,6 +35,9 @@ class PushableLexer(): # Supports pushing of tokens for a lexer
   def __init__(self, lexer: Lexer, eof_function):
     self.lexer = lexer
     self.eof_function = eof_function  # For end-of-file
+    self.pushed_queue = deque()
+    self.queue_not_empty = False
+    self.cancel_event = None  # threading.Event - parsing stops at the next token once it's set
 
     # Add methods
     self.input = self.lexer.input
@@ -25,10 +53,10 @@ class PushableLexer(): # Supports pushing of tokens for a lexer
     self.lexer.lexpos = val
 
   """Pushable"""
-  pushed_queue = deque()
-  queue_not_empty = False
-
   def token(self):
+    if (self.cancel_event is not None and self.cancel_event.is_set()):
+      raise ParseCancelled()
+
     # Either get from queue or lexer
     if (self.queue_not_empty):
       # Get new token from queue
@@ -50,17 +78,30 @@ class PushableLexer(): # Supports pushing of tokens for a lexer
     self.pushed_queue.append(tok)
     self.queue_not_empty = True
 
+  def clear(self):
+    """Drop every pushed token"""
+    self.pushed_queue.clear()
+    self.queue_not_empty = False
+
 class Lexer:
   def __init__(self, lang):
     self.lang = lang # Language handler
+    self.errors = []  # SyntaxErrors found lexing - the parser's list while it parses, so they are reported with its own
 
   # Build the lexer
   def build(self, **kwargs):
+    kwargs.setdefault("errorlog", ply_log)
     self.lexer = PushableLexer(lex.lex(module=self, **kwargs), self.eof)
 
+  def reset(self):
+    """Clear the state a parse left, so the lexer can be reused"""
+    self.lexer.clear()
+
   # Test output
   def test(self, data):
+    """Log every token of data (at debug level)"""
     self.lexer.input(data)
+    tokens = []
     whitespace = ["INDENT", "DEDENT"]
     colors = {
       "ID": 96,
@@ -78,10 +119,12 @@ class Lexer:
         color = 94
       elif(tok.type in colors):
         color = colors[tok.type]
-      print(f"\033[{color}m" + tok.value + "\033[0m", end=" ")
+      tokens.append(f"\033[{color}m" + tok.value + "\033[0m ")
 
       if (tok.type in whitespace):
-        print(f"\033[90m[" + tok.type + "]\033[0m", end="")
+        tokens.append(f"\033[90m[" + tok.type + "]\033[0m")
+
+    logger.debug("%s", "".join(tokens))
 
   # Newlines
   def t_newline(self, t):
@@ -90,8 +133,12 @@ class Lexer:
     # t.lexer.lexpos = 0 # Start column
 
   # Error handling
+  def error(self, msg: str, t):
+    """Record a SyntaxError at token t, then carry on lexing"""
+    self.errors.append(positioned_syntax_error(self.lang, msg, t.lexer.lexdata, t.lexpos, t.lexer.lineno))
+
   def t_error(self, t):
-    print(f"Illegal char @ line {t.lexer.lineno}: '{t.value[0]}'")
+    self.error(f"invalid character '{t.value[0]}'", t)
     t.lexer.skip(1)
 
 
@@ -99,13 +146,15 @@ class Lexer:
 class ParsingStruct():
   """A structure to pass around possible types of expressions and hold the mappings between translated and compiled sources.
   Different types of structure will also use this to keep extra information."""
+  __slots__ = ("possible_paths", "_attr", "compiled", "node", "mappings")
 
   def __init__(self, compiled: str = "", translated_pos=None):
-    self.possible_paths = []  # List of pairs of (tuple path, list/tuple data from LanguageEnv)
-    self.attr = {}  # Extra attributes of this struct
+    self.possible_paths = []  # List of (tuple path, LanguageNode data) pairs
+    self._attr = None  # Extra attributes of this struct - most never have any, so allocated on first use
 
     # Add compiled value
     self.compiled = compiled
+    self.node = None  # Python ast node, when the parser emits an ast
     self.mappings = []  # Mappings of (non-compiled pointers, compiled pointers)
     if (translated_pos != None):
       self.mappings.append((translated_pos, len(compiled)))  # At the end
@@ -115,11 +164,29 @@ class ParsingStruct():
     # Compiled code
     return getattr(self, "compiled", "")
 
+  @property
+  def attr(self):
+    """Extra attributes of this struct"""
+    if (self._attr is None):
+      self._attr = {}
+    return self._attr
+
+  def copy(self):
+    """Get a copy to change. Its lists are new, but the types in possible_paths aren't copied: pack nodes are shared and never changed
+    (see LanguageEnv.writable), so a (path, node) pair is just a handle on the type. The ast node is shared too."""
+    result = ParsingStruct.__new__(ParsingStruct)
+    result.possible_paths = list(self.possible_paths)
+    result._attr = None if not self._attr else {key: (list(value) if type(value) is list else value) for key, value in self._attr.items()}
+    result.compiled = self.compiled
+    result.node = self.node
+    result.mappings = list(self.mappings)
+    return result
+
   """Concatenation"""
 
   def __add__(self, other):
     """Concatenation of ParsingStructs and strings"""
-    result = deepcopy(self)
+    result = self.copy()
     if (type(other) is str):
       # Add str value to result's compiled on right
       result.compiled += other
@@ -127,7 +194,11 @@ class ParsingStruct():
 
     elif (type(other) is ParsingStruct):
       result.compiled += other.compiled
-      result.attr.update(other.attr)
+      if (other._attr):
+        imported = result.attr.get("imported")
+        result.attr.update(other._attr)
+        if (imported is not None and "imported" in other._attr):
+          result.attr["imported"] = imported + other._attr["imported"]  # Imports of both sides (e.g. two statements)
 
       len_left = len(self.compiled)
       for i, mapping in enumerate(other.mappings):
@@ -140,7 +211,7 @@ class ParsingStruct():
 
   def __radd__(self, other):
     """Concatenation of string on left to PStruct"""
-    result = deepcopy(self)
+    result = self.copy()
 
     if (type(other) is str):
       # Add str value to result's compiled on left
@@ -196,6 +267,39 @@ class ParsingStruct():
 
     return mapping_index
 
+  """Line alignment"""
+
+  def pad_lines(self, targets):
+    """Insert blank lines so each compiled line (1-indexed, targets[0] unused) sits on its target line if possible.
+    Return True if every line reached its target."""
+    lines = self.compiled.split("\n")
+    result_lines = []
+    line_offsets = []  # Newlines inserted before each compiled line
+    inserted = 0
+    exact = True
+    for i, line in enumerate(lines):
+      target = targets[i + 1] if i + 1 < len(targets) else None
+      current = len(result_lines) + 1
+      if (target is not None and target > current):
+        result_lines += [""] * (target - current)
+        inserted += target - current
+      elif (target is not None and target < current):
+        exact = False  # Line was already passed - e.g. two statements on one translated line
+      line_offsets.append(inserted)
+      result_lines.append(line)
+
+    # Move mappings down with their lines
+    line = 0
+    line_end = len(lines[0])
+    for i, mapping in enumerate(self.mappings):
+      while (mapping[1] > line_end and line + 1 < len(lines)):
+        line += 1
+        line_end += 1 + len(lines[line])
+      self.mappings[i] = (mapping[0], mapping[1] + line_offsets[line])
+
+    self.compiled = "\n".join(result_lines)
+    return exact
+
   @staticmethod
   def join(delimiter, structs):
     """Like str.join, but for non-string objects like ParsingStructs"""
@@ -215,18 +319,101 @@ class Parser:
     self.lexer = lexer.lexer
     self.lexerclass = lexer
 
-    self.parser = yacc.yacc(module=self)
+    self.build()
+
+  table_options = {}  # Extra yacc options - e.g. for grammars which shouldn't share the table file
 
   def build(self, **kwargs):
-    self.parser = yacc.yacc(module=self, **kwargs)
+    """(Re)build the parsing tables - done on init, only needed again for other yacc options"""
+    kwargs.setdefault("errorlog", ply_log)
+    with yacc_lock:
+      self.parser = yacc.yacc(module=self, **{**self.table_options, **kwargs})
+
+  tracking = False  # Track positions of whole rules, not just tokens
 
   def parse(self, src):
-    self.lexerclass.test(src)
-    return self.parser.parse(src, self.lexer)
+    """Parse src, raising SyntaxError once at the end if it has any - its errors attribute has every one found (see p_error)"""
+    if (logger.isEnabledFor(logging.DEBUG)):
+      self.lexerclass.test(src)  # Lexes everything an extra time
+    self.lexerclass.reset()  # Nothing left over from the last parse (or the test above)
+    self.errors = self.lexerclass.errors = []
+    self.last_resync = None
+    try:
+      # Track positions of whole rules when statements need mapping to their start
+      result = self.parser.parse(src, self.lexer, tracking=self.tracking)
+    except SyntaxError as err:
+      if (len(self.errors) == 0):
+        raise
+      self.errors.append(err)  # Raised by a rule, which stops the parse - reported after the others
+    if (len(self.errors) > 0):
+      raise syntax_errors(sorted(self.errors, key=lambda error: (error.lineno, error.offset)))  # The lexer reads ahead of the parser
+    return result
 
   # Error handling
+  error_messages = {  # English messages for the tokens parsing can't continue at, translated with the language's SyntaxError messages
+    None: "unexpected end of file",
+    "INDENT": "unexpected indent",
+    "DEDENT": "unexpected end of block",
+  }
+
   def p_error(self, p):
-    raise SyntaxError(f"Syntax Error @ {p}")
+    """Record the error, then skip to where the next statement starts - the grammar's error productions carry on from there.
+    A line the lexer already found an error on isn't reported again - its error is the cause."""
+    error = self.syntax_error(p)
+    if (not any(found.lineno == error.lineno for found in self.errors)):
+      self.errors.append(error)
+    if (p is not None):
+      self.resynchronise(p)
+
+  def syntax_error(self, p):
+    """Get the SyntaxError for a bad token (None at end of file), with its message translated and its position in the translated source"""
+    data = self.lexer.lexer.lexdata
+    msg = self.error_messages.get(None if p is None else p.type)
+    if (msg is None):
+      value = p.value
+      if (not data.startswith(value, p.lexpos)):
+        value = re.match(r"\w*", data[p.lexpos:]).group() or value  # Keywords' values are compiled - show them as written
+      msg = f"invalid syntax at '{value}'"
+
+    if (p is None):
+      pos = len(data.rstrip())  # End of the last line
+      lineno = self.lexer.lexer.lineno - data.count("\n", pos)
+    else:
+      pos, lineno = p.lexpos, p.lineno
+      if (p.type in ("INDENT", "DEDENT") and p.value.startswith("\n")):
+        # Start of the line after the newline
+        pos += len(p.value)
+        lineno += 1
+    return positioned_syntax_error(self.lang, msg, data, pos, lineno)
+
+  def resynchronise(self, p):
+    """Turn the bad token into RECOVER (which PLY reads again after the error symbol), then drop tokens to where a statement can start:
+    the next line, or the INDENT or DEDENT before it. Statements aren't separated by tokens, so line starts are the boundaries.
+    An unexpected INDENT drops its whole block; an unexpected DEDENT still ends its block."""
+    resume = None
+    if (p.type == "INDENT"):
+      depth = 1
+      while (depth > 0):
+        tok = self.lexer.token()
+        if (tok is None):
+          break
+        depth += {"INDENT": 1, "DEDENT": -1}.get(tok.type, 0)
+    elif (p.type == "DEDENT"):
+      if (self.last_resync != (p.lineno, p.lexpos)):  # Not the DEDENT given back last time - the block can't end there either
+        resume = copy.copy(p)
+    else:
+      while True:
+        resume = self.lexer.token()
+        if (resume is None or resume.type in ("INDENT", "DEDENT") or resume.lineno > p.lineno):
+          break
+    self.last_resync = (p.lineno, p.lexpos)
+
+    p.type = "RECOVER"
+    p.value = ""
+    if (resume is not None):
+      # Before anything already pushed, e.g. the DEDENTs after it
+      self.lexer.pushed_queue.appendleft(resume)
+      self.lexer.queue_not_empty = True
 
   # Get position of lexer
   def p_getpos(self, p):
@@ -0,0 +1,156 @@
+"""Fast keyword-only translation - one linear pass over a streaming tokenizer, without parsing"""
+import io
+import tokenize
+
+from languages.language import LanguageEnv, LanguageNode
+from ._template import ParsingStruct
+
+
+class FallbackNeeded(Exception):
+    """The source needs the full parser (e.g. it uses attribute access on inferred types)"""
+
+
+class FastTranslator:
+    """Translate keywords and statically-known names token-by-token, keeping the translated file's layout.
+    Only attribute access on names whose type comes straight from the language pack (packages, builtins) is
+    translated; anything needing type inference raises FallbackNeeded."""
+
+    skipped_tokens = (tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING)
+    end_tokens = (tokenize.NEWLINE, tokenize.ENDMARKER)
+
+    def __init__(self, lang: LanguageEnv):
+        self.lang = lang
+        self.keywords = lang.kw
+
+    def translate(self, src: str):
+        """Translate src, returning a ParsingStruct like PythonParser.parse"""
+        self.lang.scope_push("Fast")
+        try:
+            return self.translate_tokens(src)
+        finally:
+            self.lang.scope_pop()
+
+    def tokens(self, src: str):
+        """Stream the significant tokens of src as (token, absolute start, absolute end)"""
+        line_starts = [0, 0]  # Absolute index of each 1-indexed row
+        lines = io.StringIO(src)
+
+        def readline():
+            line = lines.readline()
+            line_starts.append(line_starts[-1] + len(line))
+            return line
+
+        try:
+            for tok in tokenize.generate_tokens(readline):
+                if (tok.type not in self.skipped_tokens):
+                    yield tok, line_starts[tok.start[0]] + tok.start[1], line_starts[tok.end[0]] + tok.end[1]
+        except (tokenize.TokenError, SyntaxError) as err:  # Includes IndentationError
+            raise FallbackNeeded(f"Could not tokenize: {err}")
+
+    def translate_tokens(self, src: str):
+        result = ParsingStruct()
+        compiled = []  # Pieces of compiled text
+        self.compiled_len = 0
+        self.last = 0  # End of last translated token copied to compiled
+
+        def emit(start, end, text):
+            """Replace src[start:end] with text in the compiled output"""
+            compiled.append(src[self.last:start] + text)
+            self.compiled_len += start - self.last + len(text)
+            result.mappings.append((end, self.compiled_len))
+            self.last = end
+
+        prev = None  # Previous significant token in this logical line
+        chain = None  # Possible paths of the static attribute chain being read, if any
+        tokens = self.tokens(src)
+        for tok, start, end in tokens:
+            if (tok.type in self.end_tokens):
+                prev = None
+                chain = None
+                continue
+
+            if (tok.type == tokenize.OP):
+                if (tok.string == "."):
+                    if (prev is None or prev.type != tokenize.NAME or chain is None):
+                        # Attribute of an expression whose type must be inferred
+                        raise FallbackNeeded(f"Attribute access needs type inference @ {tok.start}")
+                else:
+                    chain = None
+                    if (tok.string == "=" and prev is None):
+                        # Parser test statement (=expression=) only exists in the full parser
+                        raise FallbackNeeded(f"Parser test statement @ {tok.start}")
+                prev = tok
+                continue
+
+            if (tok.type != tokenize.NAME):
+                chain = None
+                prev = tok
+                continue
+
+            after_dot = (prev is not None and prev.type == tokenize.OP and prev.string == ".")
+            keyword = self.keywords.get(tok.string) if not after_dot else None
+            if (keyword is not None):
+                chain = None
+                emit(start, end, keyword.lower())
+                if (keyword == "IMPORT"):
+                    # Rest of the statement is the library path
+                    self.import_statement(tokens, emit, result)
+                    prev = None
+                    continue
+                elif (keyword == "FROM"):
+                    raise FallbackNeeded(f"From-import @ {tok.start}")
+            elif (after_dot):
+                # Property of a static chain
+                chain = self.lang.get_properties(tok.string, chain)
+                if (len(chain) == 0):
+                    # Not defined - pass through unchanged anyway, like the full parser
+                    chain = [((tok.string,), LanguageNode(tok.string, None, None, list(self.lang.literals["_UNKNOWN"])))]
+                emit(start, end, chain[0][0][-1])
+            else:
+                # Top-level name
+                chain = self.lang.get_properties(tok.string)
+                if (len(chain) == 0):
+                    chain = None  # Variable - type would need inferring
+                else:
+                    emit(start, end, chain[0][0][-1])
+            prev = tok
+
+        compiled.append(src[self.last:])
+        result.compiled = "".join(compiled)
+        result.attr["lines_preserved"] = True  # Layout is copied
+        return result
+
+    def import_statement(self, tokens, emit, result):
+        """Translate the rest of an import statement from tokens (`path` or `path AS alias`)"""
+        library = []
+        path_start = path_end = None
+        alias = None
+        for tok, start, end in tokens:
+            if (tok.type in self.end_tokens):
+                break
+            if (tok.type == tokenize.NAME and self.keywords.get(tok.string) == "AS"):
+                # Alias - kept as written
+                alias_tok = next(tokens)
+                if (alias_tok[0].type != tokenize.NAME):
+                    raise FallbackNeeded(f"Import alias expected @ {alias_tok[0].start}")
+                alias = (alias_tok[0].string,)
+                as_tok = (tok, start, end)
+                break
+            if (tok.type == tokenize.NAME):
+                library.append(tok.string)
+            elif (tok.type != tokenize.OP or tok.string != "."):
+                raise FallbackNeeded(f"Unsupported import syntax @ {tok.start}")
+            if (path_start is None):
+                path_start = start
+            path_end = end
+
+        if (path_start is None):
+            raise FallbackNeeded("Import without a library")
+
+        compiled_pkg = self.lang.import_lib(tuple(library), alias)
+        emit(path_start, path_end, ".".join(compiled_pkg))
+        if (alias is not None):
+            emit(as_tok[1], as_tok[2], self.keywords[as_tok[0].string].lower())
+
+        # Add to imported libraries
+        result.attr.setdefault("imported", []).append([compiled_pkg, compiled_pkg if alias is None else alias])
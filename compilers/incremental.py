@@ -0,0 +1,287 @@
+"""Incremental compiling - reparse only the top-level statements of a translated file which changed since the last compile"""
+import copy
+import hashlib
+import inspect
+import json
+import re
+
+from languages.language import LanguageEnv, LanguageNode
+from ._template import ParsingStruct, syntax_errors
+from .python import PythonLexer, PythonParser
+
+
+class CodeblockParser(PythonParser):
+    """Parser for statements in a module scope kept by the caller, rather than a whole module"""
+    start = "codeblock"
+    table_options = {"tabmodule": "codeblock_parsetab", "write_tables": False, "debug": False}  # Don't replace the module parser's tables
+
+
+class IncrementalCompiler:
+    """Compile successive versions of a translated file, reparsing only its changed top-level statements (regions).
+    Each region's lasting effects on the LanguageEnv (assignments in the module scope, imports, hidden types) are recorded, so unchanged
+    regions are replayed instead of parsed. A region's cached result is only reused if the names it mentions were defined the same way
+    before it - so an edit only reparses the regions which (directly or through other names) depend on what it changed."""
+
+    continuation_keywords = ("ELIF", "ELSE", "EXCEPT", "FINALLY")  # Start lines which continue the statement before
+    recorded_methods = ("assign", "import_lib", "hiddentype_save")
+
+    line_start = re.compile(r"(?![ \t\r\n#])(\w*)")  # Unindented code line and its first word
+    # What can hold a line break that doesn't end a statement - skipped whole - then brackets and line breaks
+    structure = re.compile(r"""#[^\n]*|\\\r?\n|("{3}|'{3})(?:\\.|.)*?(?:\1|\Z)|"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?|[\[\](){}\n]""", re.DOTALL)
+    indented_line = re.compile(r"[ \t]+[^ \t\r\n#]")
+    name = re.compile(r"\w+")
+
+    def __init__(self, lang_dir: str, parser: CodeblockParser = None, module_dirs: list = ()):
+        """parser - a CodeblockParser (with its lexer) to share, e.g. between the compilers of a project's files; a new one if None.
+        module_dirs - directories of translated modules which can be imported (see LanguageEnv)"""
+        self.lang_dir = lang_dir
+        self.module_dirs = module_dirs
+        self.lang = LanguageEnv(lang_dir, module_dirs=module_dirs)
+        if (parser is None):
+            lexer = PythonLexer(self.lang)
+            lexer.build()
+            parser = CodeblockParser(self.lang, lexer)
+        self.lexer = parser.lexerclass
+        self.parser = parser
+
+        self.cache = {}  # (region text, hash of the names it mentions) > (struct, effects, name > signature of its effects on it)
+        self.words = {}  # Region text > names mentioned
+        self.first_tokens = {}  # Region text > length of its first token
+        self.effects = None  # Effects of the region being parsed, if recording
+        self.record_depth = 0
+        self.joined = ([], [], None)  # Last join - parts, (mappings, compiled length) before each, result
+        self.module_effects = []  # Effects of every region of the last compile, in order
+
+    def regions(self, src: str):
+        """Split src into top-level statement regions, as (start, text, whether it ends in a block) - a region starts at an unindented line
+        outside brackets and strings"""
+        starts = [0]
+        blocks = [False]  # Whether the last line started in each region is indented
+        depth = 0  # Open brackets
+        for match in self.structure.finditer(src):
+            token = match.group()
+            if (token == "\n"):
+                if (depth == 0):
+                    line = self.line_start.match(src, match.end())
+                    if (line is not None and line.end() < len(src) and self.lang.kw.get(line.group(1)) not in self.continuation_keywords):
+                        starts.append(match.end())
+                        blocks.append(False)
+                    elif (self.indented_line.match(src, match.end())):
+                        blocks[-1] = True
+                    elif (line is not None):
+                        blocks[-1] = False  # Continues the statement before, e.g. else
+            elif (token in "([{"):
+                depth += 1
+            elif (token in ")]}"):
+                depth = max(depth - 1, 0)  # Unmatched - the parser reports it
+
+        ends = starts[1:] + [len(src)]
+        return [(start, src[start:end], block) for start, end, block in zip(starts, ends, blocks)]
+
+    def compile(self, src: str):
+        """Compile src, returning a ParsingStruct like PythonParser.parse"""
+        env = None  # Fresh environment, made once a region needs parsing
+        pending = []  # Effects of reused regions, to replay before parsing
+        states = {}  # Name > hash of how the regions so far defined it
+        cache = {}
+        parts = []
+        module_effects = []
+        errors = []  # Syntax errors of every region
+        lineno = 1
+        last_start = 0
+        for start, text, block in self.regions(src):
+            lineno += src.count("\n", last_start, start)
+            last_start = start
+            if (len(errors) > 0):
+                # Only checked for errors, in a fresh environment - what the failed regions would define isn't known
+                try:
+                    self.parse_region(self.new_env(), (text, ""), lineno)
+                except SyntaxError as err:
+                    errors += getattr(err, "errors", [err])
+                continue
+
+            # Same text after the same definitions of the names it mentions compiles the same
+            mentioned = sorted(name for name in self.mentions(text) if name in states)
+            depends = hashlib.sha1("".join(name + ":" + states[name] + "\n" for name in mentioned).encode("utf8")).hexdigest() if len(mentioned) > 0 else ""
+            key = (text, depends)
+            cached = self.cache.get(key)
+            if (cached is None):
+                if (env is None):
+                    env = self.new_env()
+                self.replay(env, pending)
+                pending = []
+                try:
+                    cached = self.parse_region(env, key, lineno)
+                except SyntaxError as err:
+                    errors += getattr(err, "errors", [err])
+                    continue
+            else:
+                pending += cached[1]
+            cache[key] = cached
+            parts.append((start, cached[0], start + len(text), block))
+            module_effects += cached[1]
+
+            for name, signature in cached[2].items():
+                # Depends on what the region used too, so names defined from a changed one change with it
+                states[name] = hashlib.sha1((states.get(name, "") + signature + depends).encode("utf8")).hexdigest()
+
+        if (len(errors) > 0):
+            raise syntax_errors(errors)
+        self.cache = cache  # Drop regions no longer in the file
+        self.words = {text: self.words[text] for text, depends in cache}
+        self.first_tokens = {text: length for text, length in self.first_tokens.items() if text in self.words}
+        self.module_effects = module_effects
+        # What the parser reads past the end of each region in the whole file - the next region's first token, or nothing after a block
+        lookaheads = [0 if block else self.first_token(src[end:next_end]) for (start, struct, end, block), (next_start, next_struct, next_end, next_block)
+                      in zip(parts, parts[1:])]
+        return self.join([(start, struct, end, lookahead) for (start, struct, end, block), lookahead in zip(parts, lookaheads + [None])])
+
+    def mentions(self, text: str):
+        """Get the set of words in a region's text - every name it could look up"""
+        words = self.words.get(text)
+        if (words is None):
+            words = self.words[text] = frozenset(self.name.findall(text))
+        return words
+
+    def first_token(self, text: str):
+        """Get the length of a region's first token"""
+        length = self.first_tokens.get(text)
+        if (length is None):
+            lexer = self.lexer.lexer.lexer.clone()
+            lexer.input(text)
+            lexer.token()
+            length = self.first_tokens[text] = lexer.lexpos
+        return length
+
+    def new_env(self):
+        """Get a new environment in a module scope, recording the effects of parsing"""
+        env = LanguageEnv(self.lang_dir, module_dirs=self.module_dirs)
+        env.scope_push("Pushed")  # Module scope, like the module rule
+        for name in self.recorded_methods:
+            setattr(env, name, self.recorder(env, name, getattr(env, name)))
+        self.parser.use_language(env)
+        return env
+
+    def module_summary(self, module: str):
+        """Get the interface summary of the last compiled version (see LanguageEnv.module_summary), from its effects replayed in a new environment"""
+        env = LanguageEnv(self.lang_dir, module_dirs=self.module_dirs)
+        env.scope_push("Pushed")
+        self.replay(env, self.module_effects)
+        return env.module_summary(module, env.scope_stack[-1])
+
+    def recorder(self, env: LanguageEnv, name: str, method):
+        """Wrap an environment's method to record calls with lasting effects - made from the module scope (or global hidden types), not nested"""
+        signature = inspect.signature(method)
+
+        def record(*args, **kwargs):
+            if (self.effects is None or self.record_depth > 0 or (len(env.scope_stack) > 2 and name != "hiddentype_save")):
+                # Not recording, inside a recorded call or temporary
+                self.record_depth += 1
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.record_depth -= 1
+
+            arguments = signature.bind(*args, **kwargs).arguments
+            if (name == "assign"):
+                # Resolve types now, as the data will change
+                if (arguments.get("simplify", True)):
+                    arguments["src"] = env.simplify(arguments["src"])
+                arguments["simplify"] = False
+                arguments["src"] = [(tuple(path), None) for path, data in arguments["src"]]  # Only paths are kept if not simplifying
+            elif (name == "hiddentype_save"):
+                arguments["data"] = copy.deepcopy(arguments["data"])
+            self.effects.append((name, dict(arguments)))
+
+            self.record_depth += 1
+            try:
+                return method(**arguments)
+            finally:
+                self.record_depth -= 1
+
+        return record
+
+    def replay(self, env: LanguageEnv, effects: list):
+        """Apply recorded effects to env"""
+        for name, arguments in effects:
+            if (name == "hiddentype_save"):
+                arguments = dict(arguments, data=copy.deepcopy(arguments["data"]))  # Env may change it
+            getattr(env, name)(**arguments)
+
+    def parse_region(self, env: LanguageEnv, key, lineno: int):
+        """Parse a region (key of text, state of the names it mentions) in env, returning its struct, effects and the signature of its effects
+        on each name it defines"""
+        text, state = key
+        env.hiddentype_IDs = {}
+        env.hiddentype_namespace = hashlib.sha1((text + state).encode("utf8")).hexdigest()[:12] + "/"  # Same IDs each time this key is parsed
+        self.lexer.lexer.lexer.lineno = lineno
+
+        self.effects = []
+        try:
+            struct = self.parser.parse(text)
+            effects = self.effects
+        finally:
+            self.effects = None
+
+        defined = {}
+        for name, arguments in effects:
+            for defined_name in self.defined_names(name, arguments):
+                defined.setdefault(defined_name, []).append((name, arguments))
+        return struct, effects, {name: json.dumps(name_effects, default=LanguageNode.to_json) for name, name_effects in defined.items()}
+
+    @staticmethod
+    def defined_names(name: str, arguments: dict):
+        """Get the names in the module scope a recorded effect defines - by key and translated name (hidden types start with .)"""
+        if (name == "assign"):
+            path = arguments["iden_path"]
+            translated = arguments.get("translated")
+        elif (name == "import_lib"):
+            path = arguments["alias"] or ()
+            translated = arguments["library"][0]
+        else:
+            path = arguments["id"]
+            translated = None
+        return {path_name for path_name in (path[0] if len(path) > 0 else None, translated) if path_name is not None}
+
+    def join(self, parts: list):
+        """Join the regions' structs (start, struct, end, lookahead), moving their mappings to their place in the file.
+        The joined text and mappings of regions unchanged since the last join (same struct, place and lookahead, and all before too) are kept."""
+        last_parts, last_offsets, last_result = self.joined
+        kept = 0
+        while (kept < len(parts) and kept < len(last_parts) and parts[kept][1] is last_parts[kept][1] and
+               (parts[kept][0], parts[kept][2], parts[kept][3]) == (last_parts[kept][0], last_parts[kept][2], last_parts[kept][3])):
+            kept += 1
+
+        result = ParsingStruct()
+        offsets = last_offsets[:kept]
+        if (kept > 0):
+            mappings_len, compiled_len = last_offsets[kept]
+            result.mappings = last_result.mappings[:mappings_len]
+            compiled = [last_result.compiled[:compiled_len]]
+        else:
+            compiled_len = 0
+            compiled = []
+
+        for start, struct, end, lookahead in parts[kept:]:
+            offsets.append((len(result.mappings), compiled_len))
+            if (struct is None):
+                continue  # No statements
+            if (compiled_len > 0):
+                compiled.append("\n")
+                compiled_len += 1
+            compiled.append(struct.compiled)
+            for translated, compiled_pos in struct.mappings:
+                translated += start
+                if (translated > end and lookahead is not None):
+                    translated = end + lookahead  # Read at the region's end of file - where the parser is there in the whole file
+                result.mappings.append((translated, compiled_pos + compiled_len))
+            compiled_len += len(struct.compiled)
+        offsets.append((len(result.mappings), compiled_len))
+        result.compiled = "".join(compiled)
+
+        for start, struct, end, lookahead in parts:
+            if (struct is not None and "imported" in struct.attr):
+                result.attr.setdefault("imported", []).extend(struct.attr["imported"])
+
+        self.joined = (parts, offsets, result)
+        return result
@@ -1,10 +1,13 @@
+import ast
+import bisect
 import copy
 from typing import List
 
 from ply import lex, yacc
 from ply.lex import LexToken
 
-from languages.language import LanguageEnv
+from languages.language import LanguageEnv, LanguageNode
+from log import logger
 from ._template import Lexer, Parser, ParsingStruct
 
 
@@ -14,14 +17,20 @@ class PythonLexer(Lexer):
         super().__init__(lang)
         # Register keywords
         self.keywords = lang.kw
-        self.tokens += list(self.keywords.values())
+        self.tokens = self.tokens + list(self.keywords.values()) # Not += - the class list is shared by every lexer
         self.tokens += list(set(self.operators.values())) # Remove duplicates
         # print(self.tokens)
 
-    attributes = {
-        # Knowing current pos in translated code
-        "indentation": 0,
-    }
+        self.attributes = {
+            # Knowing current pos in translated code
+            "indentation": 0,
+        }
+        self.indent_stack = [0]
+
+    def reset(self):
+        super().reset()
+        self.attributes["indentation"] = 0
+        self.indent_stack = [0]
 
     # Literals
     literals = "()[]{}:,.="
@@ -30,6 +39,7 @@ class PythonLexer(Lexer):
     tokens = [
         # Special
         "_GETPOS",
+        "RECOVER",  # A bad token after its error - never lexed, see Parser.resynchronise
         # Structure
         "INDENT",
         "DEDENT",
@@ -42,6 +52,61 @@ class PythonLexer(Lexer):
         "OP"
     ]
 
+    # Literals - Simple Datatypes
+    # (Before identifiers so string prefixes like f"..." aren't read as IDs)
+
+    # String
+    string_prefixes = "rRbBfFuU"
+
+    def t_STRING(self, t):
+        r'(?:[rR][bBfF]?|[bBfF][rR]?|[uU])?(?:"""|\'\'\'|"|\')'
+        # Only the opening delimiter is matched by regex - the closing one is found by a linear scan
+        data = t.lexer.lexdata
+        quote = t.value.lstrip(self.string_prefixes)
+        content_start = t.lexer.lexpos
+        end = self.find_closing_quote(data, quote, content_start, single_line=(len(quote) == 1))
+        if (end == -1):
+            self.error("unterminated string", t)
+            # The rest of the line (or file) is the string, so the parse carries on after it
+            end = data.find("\n", content_start) if len(quote) == 1 else -1
+            end = len(data) if end == -1 else end
+            quote = ""
+
+        t.value = data[t.lexpos:end + len(quote)]
+        t.lexer.lexpos = end + len(quote)
+        t.lexer.lineno += t.value.count("\n")
+        return t
+
+    @staticmethod
+    def is_escaped(data: str, index: int, start: int):
+        """Whether the character at index is escaped by an odd number of backslashes after start"""
+        backslashes = 0
+        while (index - backslashes - 1 >= start and data[index - backslashes - 1] == "\\"):
+            backslashes += 1
+        return backslashes % 2 == 1
+
+    def find_closing_quote(self, data: str, quote: str, start: int, single_line: bool):
+        """Find the index of the closing quote of a string whose contents start at start, or -1 if unterminated."""
+        pos = start
+        end = -1
+        while True:
+            if (end < pos):
+                end = data.find(quote, pos)
+            if (single_line):
+                # Unescaped newline before the closing quote ends the line first
+                newline = data.find("\n", pos, len(data) if end == -1 else end)
+                if (newline != -1):
+                    if (not self.is_escaped(data, newline, start)):
+                        return -1
+                    pos = newline + 1
+                    continue
+            if (end == -1):
+                return -1
+            if (self.is_escaped(data, end, start)):
+                pos = end + 1
+                continue
+            return end
+
     # Keywords
     def t_ID(self, t):
         r'(?!\d)(\w)(\w)*'  # Using \w allows accents, characters, etc. - not starting w/ digit
@@ -91,8 +156,6 @@ class PythonLexer(Lexer):
         return t
 
     # Indentation
-    indent_stack = [0]
-
     def indent_type(self, ind_size):
         last_indent = self.indent_stack[-1]
         if (ind_size > last_indent):
@@ -150,6 +213,8 @@ class PythonLexer(Lexer):
             tok = LexToken()
             tok.value = ""
             tok.type = "DEDENT"
+            tok.lineno = self.lexer.lexer.lineno
+            tok.lexpos = self.lexer.lexpos
 
             # Indent type is now dedent count
             if (num_dedents > 1):
@@ -168,40 +233,74 @@ class PythonLexer(Lexer):
         LexToken
         # Don't return to parser
 
-    # Literals - Simple Datatypes
-
-    # Booleans in identifiers
-    # String
-    def t_STRING(self, t):
-        r'("""((.|\n))*?""")|(\'\'\'(.|\n)*?\'\'\')|(".*?")|(\'.*?\')'  # Non-greedy - find shortest possible outcome
-        return t
-
     # Number
     def t_NUMBER(self, t):
-        r'\d+(\.\d*)?j?'
+        r'0[xX](?:_?[0-9a-fA-F])+|0[oO](?:_?[0-7])+|0[bB](?:_?[01])+|(?:[0-9](?:_?[0-9])*(?:\.(?:[0-9](?:_?[0-9])*)?)?|\.[0-9](?:_?[0-9])*)(?:[eE][+-]?[0-9](?:_?[0-9])*)?[jJ]?'
+        # Hexadecimal / octal / binary, or decimal with optional fraction, exponent and imaginary suffix
         return t
 
 
 class PythonParser(Parser):
+    start = "module"  # Otherwise PLY starts at whichever rule is defined first
 
     def __init__(self, lang, lexer):
         super().__init__(lang, lexer)
         # Register keywords
         self.literal_paths = lang.literals
 
+    def use_language(self, lang: LanguageEnv):
+        """Parse with another LanguageEnv from the same language (the tables are built from its keywords), so the parser can be reused"""
+        self.lang = lang
+        self.lexerclass.lang = lang
+        self.literal_paths = lang.literals
+
+    preserve_lines = False  # Mark where each statement starts so compiled lines can be aligned with translated ones
+    emit_ast = False  # Also build a Python ast (struct.node) with translated source positions, for compiling without text
+
+    @property
+    def tracking(self):
+        """Whether the positions of whole rules are needed"""
+        return self.preserve_lines or self.emit_ast
+
+    def parse(self, src):
+        if (self.emit_ast):
+            # Line starts for ast positions
+            self.src = src
+            self.line_starts = [0]
+            for i, char in enumerate(src):
+                if (char == "\n"):
+                    self.line_starts.append(i + 1)
+        return super().parse(src)
+
     # Main structure
     def p_module(self, p):
         '''module : scope_push codeblock scope_pop'''
         # With scope
         p[0] = p[2]
+        if (p[0] is None):
+            p[0] = ParsingStruct()  # Empty file
+        p[0].attr["module_scope"] = p[3]  # Names the module defines - see LanguageEnv.module_summary
+        if (self.emit_ast):
+            p[0].node = ast.Module(body=p[2].node if p[2] is not None else [], type_ignores=[])
 
     def p_codeblock(self, p):
         '''codeblock : statement
                 | codeblock statement
                 | empty'''
         result = p[1]
+        last = len(p) - 1  # Statement (or empty)
+        statement = p[last]
+        if (self.preserve_lines and p.slice[last].type == "statement"):
+            # Map the start of the statement to the start of its compiled line
+            statement = ParsingStruct("", p.lexpos(last)) + statement
+            if (last == 1):
+                result = statement
         if (len(p) > 2):
-            result += "\n" + p[2]
+            result += "\n" + statement
+        if (self.emit_ast and result is not None):
+            # Statement nodes
+            body = p[1].node if len(p) > 2 else []
+            result.node = self.ast_append(body, p[last].node if p[last] is not None else None)
         p[0] = result
 
     # Statement syntaxes
@@ -238,6 +337,15 @@ class PythonParser(Parser):
         p[5].indent()
         p[0] += "\n" + p[5]
 
+        if (self.emit_ast):
+            keyword = p[1].compiled
+            if (keyword == "while"):
+                p[0].node = self.ast_locate(ast.While(test=p[2].node, body=p[5].node, orelse=[]), p, 1)
+            else:
+                p[0].node = self.ast_locate(ast.If(test=p[2].node, body=p[5].node, orelse=[]), p, 1)
+                if (keyword == "elif"):
+                    p[0].node = ("elif", p[0].node)  # Joined to the if before it by the codeblock
+
     def p_statement_noexpression(self, p):
         """statement : noexpkw ':' INDENT codeblock DEDENT"""
         # Block statement which does not need expression
@@ -248,6 +356,9 @@ class PythonParser(Parser):
         p[4].indent()
         p[0] += "\n" + p[4]
 
+        if (self.emit_ast):
+            p[0].node = ("else", p[4].node)  # Joined to the statement before it by the codeblock
+
 
     def p_statement_for(self, p):
         """statement : start_for INDENT codeblock DEDENT"""
@@ -258,6 +369,10 @@ class PythonParser(Parser):
         p[3].indent()
         p[0] += "\n" + p[3]
 
+        if (self.emit_ast):
+            target, iterable = p[1].node
+            p[0].node = self.ast_locate(ast.For(target=target, iter=iterable, body=p[3].node, orelse=[]), p, 1)
+
     def p_start_for(self, p):
         """start_for : FOR path IN expression ':'"""
         p[0] = ParsingStruct()
@@ -269,6 +384,8 @@ class PythonParser(Parser):
         # print(f"[For - Assign] {item_path} = {item_type}")
 
         p[0] = ParsingStruct.join(" ", p[1:])
+        if (self.emit_ast):
+            p[0].node = (self.ast_store(p[2].node), p[4].node)  # Target, iterable
 
 
     def p_statement_def(self, p):
@@ -302,12 +419,22 @@ class PythonParser(Parser):
         if(function_yields[1] != None):
             self.lang.assign(function_path + (".item",), [function_yields], None, True, False)  # Simplify; don't override
 
+        if (self.emit_ast):
+            args = [self.ast_locate(ast.arg(arg=param), p, 4) for param in params]
+            node = ast.FunctionDef(name=p[2].node.id, args=ast.arguments(posonlyargs=[], args=args, kwonlyargs=[], kw_defaults=[], defaults=[]),
+                                   body=p[9].node, decorator_list=[], returns=None)
+            if ("type_params" in ast.FunctionDef._fields):
+                node.type_params = []
+            p[0].node = self.ast_locate(node, p, 1)
+
         # print(self.lang.raw_path_to_data(function_path))
 
     def p_statement_return(self, p):
         '''statement : RETURN expression'''
         p[0] = ParsingStruct()  # No expression data kept as structure, not expression
         p[0] = ParsingStruct.join(" ", p[1:])
+        if (self.emit_ast):
+            p[0].node = self.ast_locate(ast.Return(value=p[2].node), p, 1)
 
         self.lang.assign((".returns",), p[2].possible_paths, None, True)
 
@@ -315,6 +442,8 @@ class PythonParser(Parser):
         '''statement : YIELD expression'''  # For generator functions
         p[0] = ParsingStruct()  # No expression data kept as structure, not expression
         p[0] = ParsingStruct.join(" ", p[1:])
+        if (self.emit_ast):
+            p[0].node = self.ast_locate(ast.Expr(value=self.ast_locate(ast.Yield(value=p[2].node), p, 1)), p, 1)
 
         self.lang.assign((".yields",), p[2].possible_paths, None, True)
 
@@ -326,7 +455,8 @@ class PythonParser(Parser):
 
     def p_scope_pop(self, p):
         """scope_pop :"""
-        p[0] = "# Popped Scope(" + str(self.lang.scope_stack[-1]) + ")"
+        logger.debug("Popped scope %s", self.lang.scope_stack[-1].translated)
+        p[0] = self.lang.scope_stack[-1]
         self.lang.scope_pop()
 
     # Small
@@ -355,6 +485,10 @@ class PythonParser(Parser):
         else:
             p[0].attr["imported"] = [imported_data]
 
+        if (self.emit_ast):
+            name = self.ast_locate(ast.alias(name=p[2].compiled, asname=p[4].compiled if len(p) >= 5 else None), p, 2)
+            p[0].node = self.ast_locate(ast.Import(names=[name]), p, 1)
+
     def p_statement_assignment(self, p):
         '''statement : path '=' expression'''
 
@@ -365,16 +499,28 @@ class PythonParser(Parser):
         # Save variable name and type
         self.lang.assign(p[1].possible_paths[0][0], p[3].possible_paths)  # Path of variable then dest
 
+        if (self.emit_ast):
+            p[0].node = self.ast_locate(ast.Assign(targets=[self.ast_store(p[1].node)], value=p[3].node), p, 1)
+
     def p_statement_expression(self, p):
         '''statement : expression'''
         p[0] = p[1]
+        if (self.emit_ast):
+            p[0].node = self.ast_locate(ast.Expr(value=p[1].node), p, 1)
 
     def p_statement_parsertest(self, p):
         '''statement : '=' expression '=' '''
-        print(f"\033[95mTesting on line {self.lexer.lineno}: {p[2]} is of type {p[2].possible_paths}\033[0m")
+        logger.info("\033[95mTesting on line %d: %s is of type %s\033[0m", self.lexer.lineno, p[2], p[2].possible_paths)
 
         p[0] = ParsingStruct()
 
+    def p_statement_error(self, p):
+        """statement : error RECOVER
+                | error RECOVER INDENT codeblock DEDENT"""
+        # Skipped bad statement (and its block) - its error is already recorded, so the next one can be too
+        p.parser.errok()
+        p[0] = ParsingStruct()
+
     """Expressions - `data` means w/o operations, whereas `expression` means with"""
 
     # Primitive Literals
@@ -383,7 +529,7 @@ class PythonParser(Parser):
         result = []
         paths = self.literal_paths[lit_name]
         for path in paths:
-            result.append([tuple(path), self.lang.raw_path_to_data(path)])
+            result.append((tuple(path), self.lang.raw_path_to_data(path)))
         return result
 
     def p_data_literal_string(self, p):
@@ -392,6 +538,11 @@ class PythonParser(Parser):
         # Terminal node of data start (but literal) - new data struct
         result = ParsingStruct(p[1], self.lexer.lexpos)
         result.possible_paths = self.get_literal("STRING")  # Turn lists into tuples and format
+        if (self.emit_ast):
+            # Parse the token itself, so prefixes, escapes and f-strings are handled like Python
+            result.node = ast.parse(p[1], mode="eval").body
+            for node in ast.walk(result.node):
+                self.ast_locate(node, p, 1)
         p[0] = result
 
     def p_data_literal_number(self, p):
@@ -400,6 +551,8 @@ class PythonParser(Parser):
         # Terminal node of data start (but literal) - new data struct
         result = ParsingStruct(p[1], self.lexer.lexpos)
         result.possible_paths = self.get_literal("NUMBER")  # Turn lists into tuples and format
+        if (self.emit_ast):
+            result.node = self.ast_locate(ast.Constant(value=ast.literal_eval(p[1])), p, 1)
         p[0] = result
 
     # Main property hierarchy for linking to language env
@@ -414,10 +567,17 @@ class PythonParser(Parser):
         if (len(result.possible_paths) == 0):
             # Not defined - pass through unchanged anyway (in case is unindexed module var)
             # Add unchanged - Translated name, properties, args (None if not callable), (Inherits from / returns)?
-            result.possible_paths.append(((p[1],), [p[1], None, None, self.literal_paths["_UNKNOWN"]]))
+            result.possible_paths.append(((p[1],), LanguageNode(p[1], None, None, list(self.literal_paths["_UNKNOWN"]))))
 
         # Add path node
         result += result.possible_paths[0][0][-1]  # Last part
+        if (self.emit_ast):
+            name = result.possible_paths[0][0][-1]
+            if (name in self.ast_constants):
+                node = ast.Constant(value=self.ast_constants[name])
+            else:
+                node = ast.Name(id=name, ctx=ast.Load())
+            result.node = self.ast_locate(node, p, 1)
 
         p[0] = result
 
@@ -439,13 +599,15 @@ class PythonParser(Parser):
 
         if (len(result.possible_paths) == 0):
             # Not defined - pass through unchanged anyway (in case is unindexed module var)
-            print(f"⚠️{p[1]}.{(p[3],)} not defined.")
+            logger.warning("⚠️%s.%s not defined.", p[1], p[3])
             for path in old_poss_paths:
                 # Add unchanged - Translated name, properties, args (None if not callable), (Inherits from / returns)?
-                result.possible_paths.append((path[0] + (p[3],), [p[3], None, None, self.literal_paths["_UNKNOWN"]]))
+                result.possible_paths.append((path[0] + (p[3],), LanguageNode(p[3], None, None, list(self.literal_paths["_UNKNOWN"]))))
 
         # Add path node
         result += "." + ParsingStruct(result.possible_paths[0][0][-1], self.lexer.lexpos)  # Last part
+        if (self.emit_ast):
+            result.node = self.ast_locate(ast.Attribute(value=p[1].node, attr=result.possible_paths[0][0][-1], ctx=ast.Load()), p, 1)
 
         p[0] = result
 
@@ -475,11 +637,13 @@ class PythonParser(Parser):
         # Call data (e.g. str(3.14))
         result = p[1]
 
-        # Remove parameters from paths as no need to call
-        for poss_path in result.possible_paths:
-            poss_path[1][2] = None  # Data > params
+        # Remove parameters from paths as no need to call - in new nodes, as the data may be shared by other paths or packs
+        result.possible_paths = [(path, LanguageNode(data.translated, data.props, None, data.bases))  # Data > params
+                                 for path, data in result.possible_paths]
 
         result += ParsingStruct.join("", p[2:])
+        if (self.emit_ast):
+            result.node = self.ast_locate(ast.Call(func=p[1].node, args=self.ast_items(p[3]), keywords=[]), p, 1)
         p[0] = result
 
     # Operators
@@ -518,6 +682,11 @@ class PythonParser(Parser):
         """data : '(' expression ')' """
         result = p[2]
         result = "(" + result + ")"
+        if (self.emit_ast):
+            result.node = p[2].node
+            if (getattr(result.node, "power_chain", False)):
+                result.node = copy.copy(result.node)  # Bracketed - a whole operand of any ** around it
+                result.node.power_chain = False
         p[0] = result
 
     """Processing operators"""
@@ -536,6 +705,8 @@ class PythonParser(Parser):
 
         # Add to compiled result
         p[0] = ParsingStruct.join(" ", p[1:])
+        if (self.emit_ast and len(p) > 2):
+            p[0].node = self.ast_op(p, type)
 
 
     def op_unary(self, operator, operand, type):
@@ -584,8 +755,8 @@ class PythonParser(Parser):
 
         # Add hiddentype to extend from
         this_id = self.lang.hiddentype_request_ID(structure_type)
-        this_type = (this_id[-1], {}, None, self.literal_paths[structure_type])  # Dynamic
-        this_type[1][".item"] = [".item", {}, None, item_poss_paths]  # Inner > Hidden local item
+        this_type = LanguageNode(this_id[-1], {}, None, list(self.literal_paths[structure_type]))  # Dynamic
+        this_type.props[".item"] = LanguageNode(".item", {}, None, item_poss_paths)  # Inner > Hidden local item
 
         self.lang.hiddentype_save(this_id, this_type)
 
@@ -593,7 +764,11 @@ class PythonParser(Parser):
         result = ParsingStruct.join("", syntax_structs)
 
         # Extend from hiddentype
-        result.possible_paths = [[this_id, this_type]]  # 1 possible path - path then data
+        result.possible_paths = [(this_id, this_type)]  # 1 possible path - path then data
+
+        if (self.emit_ast):
+            node_type = ast.List if structure_type == "LIST" else ast.Tuple
+            result.node = node_type(elts=self.ast_items(item_struct), ctx=ast.Load())
 
         return result
 
@@ -601,11 +776,15 @@ class PythonParser(Parser):
         """data : '[' commaseparated ']' """
 
         p[0] = self.process_iterable(p[1:], p[2], "LIST")
+        if (self.emit_ast):
+            self.ast_locate(p[0].node, p, 1)
 
     def p_data_literal_tuple(self, p):
         """data : '(' commaseparated ')' """
 
         p[0] = self.process_iterable(p[1:], p[2], "TUPLE")
+        if (self.emit_ast):
+            self.ast_locate(p[0].node, p, 1)
 
     # Common syntax structures
     def p_commaseparated(self, p):
@@ -615,7 +794,7 @@ class PythonParser(Parser):
                       | empty"""  # (Left)>Right
 
         # Create result from first
-        if (len(p) < 4):
+        if (len(p) == 2):
             # From expression
             if (p[1] is None):
                 result = ParsingStruct()
@@ -623,12 +802,100 @@ class PythonParser(Parser):
                 result = ParsingStruct.join("", p[1:])
             result.attr["commaseparated_items"] = [p[1]]
         else:
-            # Adding on to prev.
+            # Adding on to prev. - items saved first as joining merges the items' attributes
+            items = p[1].attr["commaseparated_items"] + p[3:4]
             result = ParsingStruct.join("", p[1:])
-            result.attr["commaseparated_items"].append(p[3])
+            result.attr["commaseparated_items"] = items
 
         p[0] = result
 
     def p_empty(self, p):
         """empty :"""
         pass
+
+    """Direct AST emission"""
+    ast_constants = {"True": True, "False": False, "None": None}  # Names that are keywords in Python
+
+    ast_operators = {
+        "OP_BOOL": {"and": ast.And, "or": ast.Or},
+        "OP_COMP": {"<": ast.Lt, "<=": ast.LtE, "==": ast.Eq, ">=": ast.GtE, ">": ast.Gt, "is": ast.Is, "in": ast.In},
+        "OP_ADD": {"+": ast.Add, "-": ast.Sub},
+        "OP_MUL": {"*": ast.Mult, "/": ast.Div, "%": ast.Mod, "//": ast.FloorDiv},
+        "OP_IND": {"**": ast.Pow},
+    }
+    ast_unary_operators = {"not": ast.Not, "+": ast.UAdd, "-": ast.USub}
+
+    def ast_locate(self, node, p, n):
+        """Give an ast node the translated line and column of symbol n in production p, returning it"""
+        pos = p.lexpos(n)
+        line = bisect.bisect_right(self.line_starts, pos)
+        node.lineno = line
+        node.col_offset = len(self.src[self.line_starts[line - 1]:pos].encode("utf8"))  # Columns are UTF-8 bytes
+        # Only starts are known - end at the start so ranges are never inverted
+        node.end_lineno = node.lineno
+        node.end_col_offset = node.col_offset
+        return node
+
+    def ast_store(self, node):
+        """Get a copy of a name/attribute ast node being assigned to"""
+        node = copy.copy(node)
+        node.ctx = ast.Store()
+        return node
+
+    def ast_items(self, item_struct: ParsingStruct):
+        """Get the ast nodes of a commaseparated struct's items"""
+        return [item.node for item in item_struct.attr["commaseparated_items"] if item is not None]
+
+    def ast_op(self, p, type):
+        """Get the ast node of a unary or binary operation"""
+        if (len(p) == 3):
+            node = ast.UnaryOp(op=self.ast_unary_operators[p[1]](), operand=p[2].node)
+        else:
+            operator = self.ast_operators[type][p[2]]()
+            if (type == "OP_BOOL"):
+                node = ast.BoolOp(op=operator, values=[p[1].node, p[3].node])
+            elif (type == "OP_COMP"):
+                node = ast.Compare(left=p[1].node, ops=[operator], comparators=[p[3].node])
+            elif (type == "OP_IND"):
+                return self.ast_locate(self.ast_power(p[1].node, p[3].node), p, 1)
+            else:
+                node = ast.BinOp(left=p[1].node, op=operator, right=p[3].node)
+        node.power_chain = (type == "OP_IND")
+        return self.ast_locate(node, p, 1)
+
+    def ast_power(self, base, exponent):
+        """Get the ast node of base ** exponent. The grammar reads factors from the left (-a ** b ** c as ((-a) ** b) ** c),
+        but Python binds ** tighter than unary +/- and from the right, like the compiled text - so the exponent goes to the
+        innermost right operand of an unbracketed chain (-(a ** (b ** c)))."""
+        if (getattr(base, "power_chain", False)):
+            if (isinstance(base, ast.UnaryOp)):
+                node = ast.UnaryOp(op=base.op, operand=self.ast_power(base.operand, exponent))
+            else:
+                node = ast.BinOp(left=base.left, op=ast.Pow(), right=self.ast_power(base.right, exponent))
+            ast.copy_location(node, base)
+        else:
+            node = ast.copy_location(ast.BinOp(left=base, op=ast.Pow(), right=exponent), base)
+        node.power_chain = True
+        return node
+
+    def ast_append(self, body: list, statement):
+        """Add a statement node to a codeblock's body, joining elif/else blocks onto the statement before. Return the body."""
+        if (statement is None):
+            return body  # e.g. parser test
+        if (type(statement) is not tuple):
+            body.append(statement)
+            return body
+
+        kind, node = statement
+        before = body[-1] if len(body) > 0 else None
+        # Follow if/elif chain to the last one
+        while (isinstance(before, ast.If) and len(before.orelse) == 1 and getattr(before.orelse[0], "is_elif", False)):
+            before = before.orelse[0]
+        if (kind == "elif" and isinstance(before, ast.If) and len(before.orelse) == 0):
+            node.is_elif = True
+            before.orelse = [node]
+        elif (kind == "else" and isinstance(before, (ast.If, ast.For, ast.While)) and len(before.orelse) == 0):
+            before.orelse = node
+        else:
+            raise SyntaxError(f"'{kind}' without a matching block before it")
+        return body
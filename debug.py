@@ -1,6 +1,10 @@
 """Debug running programs"""
+import cProfile
 import inspect
 import json, os
+import linecache
+import pstats
+import re
 
 import traceback
 
@@ -9,47 +13,114 @@ import importlib.util
 
 from _io import TextIOWrapper
 import sys
+import types
 
+from heatmap import LineHeatmap
 from languages.language import LanguageEnv
+from log import logger, set_verbosity_options
 
 
 # TODO: Add support for many files
 class Debugger:
-    def __init__(self, compiled_file: str, source_file:str, debug_file: str, language_path:str):
+    def __init__(self, compiled_file: str, source_file:str, debug_file: str, language_path:str, code=None, clock=None, profile=False,
+                 heatmap=False, namespace: dict = None):
+        """Run a compiled file, translating any error. If a code object compiled straight from the translated source
+        (compile.compile_code) is given, run that instead - its positions are already translated so no debug file is needed.
+        It runs in namespace if given (e.g. to keep an interactive session's variables), otherwise as a new module.
+        If a clock (virtual_clock.VirtualClock) is given, the program runs on its simulated time.
+        If profile, the program runs under cProfile and self.stats holds the translated pstats.Stats (see translate_stats).
+        If heatmap, lines run and their times are counted in self.heatmap (see heatmap_json)."""
         self.language_code = language_path
         self._lang = None # Lazily-loaded LanguageEnv
+        self.debug_file = None if debug_file is None else os.path.abspath(debug_file) # In case the program changes directory
+        self._debug_info = None # Lazily loaded too - only translating errors (and reports) needs it, so successful runs never read it
 
         self.source_file = source_file
         self.compiled_file = compiled_file
+        self.mappings = None
+        self.profiler = cProfile.Profile() if profile else None
+        # Under the profiler, lines are timed rather than sampled, or the SIGPROF handler would be profiled with the program
+        self.heatmap = LineHeatmap.for_file(source_file if code is not None else compiled_file, sample=not profile) if heatmap else None
+        self.stats = None
 
-        # Read debug file
-        self.load_debug_file(debug_file)
         # print(self.get_translated_pos(100))  # on line: frase_para_escribir = nombre + ", Tienes un" - around 77
         # print(self.get_translated_pos(0))  # on line: frase_para_escribir = nombre + ", Tienes un" - around 77
 
-        print(f"GlobalPython ({language_path})")
+        logger.info("GlobalPython (%s)", language_path)
+
+        if (clock is not None):
+            clock.install()
+        try:
+            self.run(compiled_file, source_file, code, namespace)
+            if (self.profiler is not None):
+                self.stats = self.translate_stats(self.profiler)
+        finally:
+            if (clock is not None):
+                clock.uninstall()
+
+    def run(self, compiled_file: str, source_file: str, code=None, namespace: dict = None):
+        """Run the program (see __init__)"""
+        if (code is not None):
+            if (namespace is None):
+                # Run code object as a module
+                module = types.ModuleType("__main__")
+                module.__file__ = source_file
+                namespace = module.__dict__
+            try:
+                self.execute(exec, code, namespace)
+            except:
+                # Get error info (type, value, traceback) and handle
+                err = sys.exc_info()
+                self.process_error(err)
+            return
 
         # Import file by filename - https://csatlas.com/python-import-file-module/
         loader = importlib.machinery.SourceFileLoader(compiled_file.split("/")[-1].split(".")[0], compiled_file)
         spec = importlib.util.spec_from_loader(compiled_file.split("/")[-1].split(".")[0], loader)
         module = importlib.util.module_from_spec(spec)
         try:
-            loader.exec_module(module)
+            self.execute(loader.exec_module, module)
         except:
             # Get error info (type, value, traceback) and handle
             err = sys.exc_info()
             self.process_error(err)
 
+    def execute(self, function, *args):
+        """Call function to run the program - under the profiler and heatmap if used, so translating errors isn't measured"""
+        if (self.heatmap is not None):
+            self.heatmap.start()
+        try:
+            if (self.profiler is None):
+                return function(*args)
+            return self.profiler.runcall(function, *args)
+        finally:
+            if (self.heatmap is not None):
+                self.heatmap.stop()
+
+    def heatmap_json(self):
+        """Get the heatmap of the translated source's lines - see LineHeatmap.to_json"""
+        line_mappings = None
+        if (self.heatmap.filename == self.compiled_file and self.get_debug_info() is not None):
+            line_mappings = self.get_debug_info()["line_mappings"]
+        return self.heatmap.to_json(self.source_file, line_mappings)
+
     def get_lang(self):
         """lazily load a LanguageEnv"""
         if(self._lang is None):
             self._lang = LanguageEnv(self.language_code)
         return self._lang
 
+    def get_debug_info(self):
+        """lazily load the debug file - None if there is none"""
+        if (self._debug_info is None and self.debug_file is not None):
+            self.load_debug_file(self.debug_file)
+        return self._debug_info
+
     def get_translated_pos(self, compiled_pos: int):
         """Get the next character-number position from a compiled-file position"""
         # BFS - find next (all at end of kws)
         # Choose when >=
+        self.get_debug_info()
         start = 0
         end = len(self.mappings)
         while (end - start > 1):
@@ -65,8 +136,8 @@ class Debugger:
     def load_debug_file(self, debug_file):
         """Load a debug file by path into the debugger"""
         with open(debug_file, "r", encoding='utf8') as reader:
-            self.debug_info = json.load(reader)
-            self.mappings = self.debug_info["mappings"]
+            self._debug_info = json.load(reader)
+            self.mappings = self._debug_info["mappings"]
 
     def process_error(self, err):
         """Return the translated error from the error info (type, value, traceback)."""
@@ -77,14 +148,18 @@ class Debugger:
         # Error type
         path = [".PKG", err[0].__module__] + err[0].__qualname__.split(".")
         translated_data = lang.raw_path_to_data(path)
-        translated_type = translated_data[0]
+        translated_type = translated_data.translated
         if(translated_type == "<name>"): translated_type = f"!{err[0]}"
 
         # Translate message
         translated_msg = lang.translate_err(err[1], path, translated_data)
 
         # Get traceback + lineno
-        tb = err[2].tb_next.tb_next.tb_next # Skip 3 levels of importing
+        tb = err[2]
+        while (tb is not None and tb.tb_frame.f_code.co_filename not in (self.compiled_file, self.source_file)):
+            tb = tb.tb_next # Skip levels of importing/running
+        if (tb is None):
+            tb = err[2] # Not from the program itself
         translated_tb = ""
 
         while tb is not None:
@@ -93,9 +168,17 @@ class Debugger:
             frame_info = inspect.getframeinfo(tb.tb_frame)
 
             if (frame_info.filename == self.compiled_file):
-                translated_lineno = int(self.debug_info["line_mappings"][lineno]) # 1-indexed
+                line_mappings = self.get_debug_info()["line_mappings"]
+                if (line_mappings is None):
+                    translated_lineno = lineno # Compiled with lines preserved
+                else:
+                    translated_lineno = int(line_mappings[lineno]) # 1-indexed
+                filename = self.source_file
+            elif (frame_info.filename == self.source_file):
+                translated_lineno = lineno # Compiled straight from translated source
                 filename = self.source_file
             else:
+                translated_lineno = lineno
                 filename = frame_info.filename
 
             if frame_info.function == "<module>":
@@ -104,7 +187,7 @@ class Debugger:
                 loc_name = f"({frame_info.function}) {filename}, línea {translated_lineno}"
             loc_link = "file:///" + os.path.join(os.getcwd(), filename).replace("\\", "/") + ":" + str(translated_lineno)
 
-            if (frame_info.filename == self.compiled_file):
+            if (frame_info.filename in (self.compiled_file, self.source_file)):
                 line = self.get_line(self.source_file, translated_lineno)
                 translated_tb += f"\n\t{loc_name} | {line} [{loc_link}]"
             else:
@@ -116,12 +199,126 @@ class Debugger:
         # Write as error
         sys.stderr.write(f"{translated_type}: {translated_msg} {translated_tb}\n")
 
+    """Profiling"""
+    def translate_stats(self, profiler: cProfile.Profile):
+        """Get a profiler's stats as pstats.Stats with translated positions and names - lines of the compiled file become
+        source lines, and functions of packaged modules get their translated names (e.g. TNavigator.avanzar)"""
+        # Qualified names aren't in pstats keys, so get them from the raw entries
+        qualnames = {}
+        for entry in profiler.getstats():
+            for code in [entry.code] + [sub_entry.code for sub_entry in (entry.calls or [])]:
+                if (not isinstance(code, str)):
+                    qualnames[(code.co_filename, code.co_firstlineno, code.co_name)] = code.co_qualname
+
+        modules = {} # Filename > module name, preferring names with a pack (e.g. turtle for a module installed as turtle)
+        packages = set(self.get_lang().pkgs.values())
+        for name, module in list(sys.modules.items()):
+            filename = getattr(module, "__file__", None)
+            if (filename is not None and (filename not in modules or name in packages)):
+                modules[filename] = name
+
+        translated_keys = {}
+        def translate_key(key):
+            if (key not in translated_keys):
+                translated_keys[key] = self.translate_function(key, qualnames.get(key), modules)
+            return translated_keys[key]
+
+        profiler.create_stats()
+        translated = {}
+        for key, (cc, nc, tt, ct, callers) in profiler.stats.items():
+            translated_callers = {}
+            for caller, caller_stats in callers.items():
+                caller = translate_key(caller)
+                if (caller in translated_callers):
+                    # Two callers became one (e.g. compiled lines of one source line)
+                    caller_stats = tuple(old + new for old, new in zip(translated_callers[caller], caller_stats))
+                translated_callers[caller] = caller_stats
+
+            key = translate_key(key)
+            func_stats = (cc, nc, tt, ct, translated_callers)
+            if (key in translated):
+                func_stats = pstats.add_func_stats(translated[key], func_stats)
+            translated[key] = func_stats
+
+        return pstats.Stats(_TranslatedProfile(translated))
+
+    def translate_function(self, key: tuple, qualname: str, modules: dict):
+        """Translate a pstats function key (filename, line, name) - see translate_stats"""
+        filename, lineno, name = key
+        if (filename == self.compiled_file):
+            line_mappings = None if self.get_debug_info() is None else self.get_debug_info()["line_mappings"]
+            if (line_mappings is not None and lineno < len(line_mappings)):
+                lineno = int(line_mappings[lineno])
+            return (self.source_file, lineno, name) # Names in the program are already translated
+        if (filename == self.source_file):
+            return key
+
+        if (filename == "~"):
+            # Built-in - "<built-in method module.name>" or "<method 'name' of 'type' objects>"
+            match = re.fullmatch(r"<built-in method ([\w.]+)\.(\w+)>", name)
+            if (match):
+                module, function = match.groups()
+                translated = self.translate_raw_path(module, (function,))
+                if (module != "builtins"):
+                    translated_module = [name for name, package in self.get_lang().pkgs.items() if package == module]
+                    translated = (translated_module[0] if len(translated_module) > 0 else module) + "." + translated
+                return (filename, lineno, f"<built-in method {translated}>")
+            match = re.fullmatch(r"<method '(\w+)' of '([\w.]+)' objects>", name)
+            if (match):
+                path = match.group(2).split(".")
+                module, path = ("builtins", path) if len(path) == 1 else (".".join(path[:-1]), path[-1:])
+                translated = self.translate_raw_path(module, tuple(path) + (match.group(1),)).split(".")
+                return (filename, lineno, f"<method '{translated[-1]}' of '{'.'.join(translated[:-1])}' objects>")
+            return key
+
+        module = modules.get(filename)
+        if (module is None or qualname is None or "<" in qualname):
+            return key
+        return (filename, lineno, self.translate_raw_path(module, tuple(qualname.split("."))))
+
+    def translate_raw_path(self, module: str, path: tuple):
+        """Get the translated dotted name of path in a module, keeping English parts which aren't translated (or not in a pack)"""
+        if (not LanguageEnv.has_lib(self.language_code, module)):
+            return ".".join(path)
+        lang = self.get_lang()
+        translated = []
+        for i in range(len(path)):
+            data = lang.raw_path_to_data((".PKG", module) + path[:i + 1])
+            translated.append(path[i] if data is None or data.translated == "<name>" else data.translated)
+        return ".".join(translated)
+
     def get_line(self, filename:str, lineno:int):
-        """Get the line in a Python file at the 1-indexed lineno"""
-        with open(filename, "r", encoding="utf8") as reader:
-            lines = reader.readlines()
-            if(lineno <= len(lines)):
-                line = lines[lineno-1].strip() # Remove whitespace
-            else:
-                line = lines[-1].strip() # Last line
-        return line
\ No newline at end of file
+        """Get the line in a Python file at the 1-indexed lineno - or in text put in linecache under filename (e.g. an interactive entry)"""
+        lines = linecache.getlines(filename)
+        if (len(lines) == 0):
+            return ""
+        if(lineno <= len(lines)):
+            line = lines[lineno-1].strip() # Remove whitespace
+        else:
+            line = lines[-1].strip() # Last line
+        return line
+
+
+class _TranslatedProfile:
+    """Translated stats in the form pstats.Stats loads from a profiler"""
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+if __name__ == "__main__":
+    # debug.py compiled_file source_file debug_file language_path [--profile] [--heatmap heatmap_file] [-v|-q] - e.g. to run a program in its own process
+    # With --profile, the translated profile (by cumulative time) is written to stderr after the program
+    # With --heatmap, the heatmap of translated lines is saved as JSON to heatmap_file
+    options = sys.argv[5:]
+    set_verbosity_options(options)
+    heatmap_file = options[options.index("--heatmap") + 1] if "--heatmap" in options else None
+    debugger = Debugger(*sys.argv[1:5], profile="--profile" in options, heatmap=heatmap_file is not None)
+    if (debugger.stats is not None):
+        debugger.stats.stream = sys.stderr
+        debugger.stats.sort_stats("cumulative").print_stats(30)
+    if (heatmap_file is not None):
+        with open(heatmap_file, "w", encoding="utf8") as writer:
+            json.dump(debugger.heatmap_json(), writer)
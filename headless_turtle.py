@@ -0,0 +1,844 @@
+"""Headless turtle - the turtle module's surface without Tk, for running drawing programs on machines without a display.
+Drawing operations are recorded in a Drawing (one flat array of numbers) instead of animated, so programs run at full speed;
+the final image can be rasterised once at the end (Drawing.render). install() makes `import turtle` load this module."""
+import array
+import inspect
+import math
+import pickle
+import struct
+import sys
+import time
+import types
+import zlib
+from copy import deepcopy
+from os.path import isfile, join, split  # Like turtle's own imports, which its language pack translates too
+
+# Drawing records - opcode, turtle number, then the opcode's values
+LINE = 1  # x1, y1, x2, y2, width, color
+FILL = 2  # color, n, x1, y1 ... xn, yn
+DOT = 3  # x, y, diameter, color
+TEXT = 4  # x, y, text, color
+CLEAR = 5  # (turtle number -1 = whole screen)
+BGCOLOR = 6  # color
+RECORD_SIZES = {LINE: 6, DOT: 4, TEXT: 4, CLEAR: 0, BGCOLOR: 1}  # Values after the turtle number, FILL varies
+
+COLOR_NAMES = {
+    "black": (0, 0, 0), "white": (255, 255, 255), "red": (255, 0, 0), "green": (0, 128, 0), "blue": (0, 0, 255),
+    "yellow": (255, 255, 0), "orange": (255, 165, 0), "purple": (160, 32, 240), "pink": (255, 192, 203),
+    "brown": (165, 42, 42), "gray": (190, 190, 190), "grey": (190, 190, 190), "cyan": (0, 255, 255),
+    "magenta": (255, 0, 255), "violet": (238, 130, 238), "gold": (255, 215, 0), "navy": (0, 0, 128),
+    "lime": (0, 255, 0), "darkgreen": (0, 100, 0), "lightblue": (173, 216, 230), "darkblue": (0, 0, 139),
+    "turquoise": (64, 224, 208), "salmon": (250, 128, 114), "maroon": (176, 48, 96), "beige": (245, 245, 220),
+}  # Common Tk colour names - others are drawn black
+
+
+class Terminator(Exception):
+    """The screen was closed (bye)"""
+
+
+class TurtleGraphicsError(Exception):
+    """Invalid turtle graphics arguments"""
+
+
+class Vec2D(tuple):
+    """2D vector, like turtle.Vec2D"""
+
+    def __new__(cls, x, y):
+        return tuple.__new__(cls, (x, y))
+
+    def __add__(self, other):
+        return Vec2D(self[0] + other[0], self[1] + other[1])
+
+    def __sub__(self, other):
+        return Vec2D(self[0] - other[0], self[1] - other[1])
+
+    def __mul__(self, other):
+        if (isinstance(other, Vec2D)):
+            return self[0] * other[0] + self[1] * other[1]
+        return Vec2D(self[0] * other, self[1] * other)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Vec2D(-self[0], -self[1])
+
+    def __abs__(self):
+        return math.hypot(*self)
+
+    def rotate(self, angle):
+        """Rotate counterclockwise by angle degrees"""
+        c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        return Vec2D(self[0] * c - self[1] * s, self[0] * s + self[1] * c)
+
+    def __repr__(self):
+        return "(%.2f,%.2f)" % self
+
+
+class Drawing:
+    """Every drawing operation of a screen, as records in one array of doubles - colours and texts are indexes into lists"""
+
+    def __init__(self, width: int = 800, height: int = 600):
+        self.width = width
+        self.height = height
+        self.log = array.array("d")
+        self.colors = []
+        self.color_indexes = {}
+        self.texts = []
+
+    def color_index(self, color):
+        index = self.color_indexes.get(color)
+        if (index is None):
+            index = self.color_indexes[color] = len(self.colors)
+            self.colors.append(color)
+        return index
+
+    def add(self, opcode: int, turtle: int, *values):
+        self.log.extend((opcode, turtle) + values)
+
+    def records(self):
+        """Decode the log as (opcode, turtle number, values) - colours and texts looked up"""
+        log = self.log
+        i = 0
+        while (i < len(log)):
+            opcode, turtle = int(log[i]), int(log[i + 1])
+            size = 2 + int(log[i + 3]) * 2 if opcode == FILL else RECORD_SIZES[opcode]
+            values = list(log[i + 2:i + 2 + size])
+            if (opcode in (LINE, DOT, TEXT, BGCOLOR)):
+                values[-1] = self.colors[int(values[-1])]
+            elif (opcode == FILL):
+                values[0] = self.colors[int(values[0])]
+            if (opcode == TEXT):
+                values[2] = self.texts[int(values[2])]
+            yield opcode, turtle, values
+            i += 2 + size
+
+    def save(self, path: str):
+        with open(path, "wb") as writer:
+            pickle.dump((self.width, self.height, self.log.tobytes(), self.colors, self.texts), writer, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as reader:
+            width, height, log, colors, texts = pickle.load(reader)
+        drawing = cls(width, height)
+        drawing.log.frombytes(log)
+        drawing.colors = colors
+        drawing.color_indexes = {color: i for i, color in enumerate(colors)}
+        drawing.texts = texts
+        return drawing
+
+    """Rasterising"""
+    def render(self):
+        """Rasterise the drawing, returning PNG bytes. Texts and turtle shapes aren't drawn."""
+        records = list(self.records())
+        # Only records after the last clear of their turtle are visible
+        cleared = {}
+        for i, (opcode, turtle, values) in enumerate(records):
+            if (opcode == CLEAR):
+                cleared[turtle] = i
+        background = "white"
+        pixels = Raster(self.width, self.height)
+        for i, (opcode, turtle, values) in enumerate(records):
+            if (i < cleared.get(turtle, -1) or i < cleared.get(-1, -1)):
+                continue
+            if (opcode == BGCOLOR):
+                background = values[0]
+        pixels.fill(rgb(background))
+
+        for i, (opcode, turtle, values) in enumerate(records):
+            if (i < cleared.get(turtle, -1) or i < cleared.get(-1, -1)):
+                continue
+            if (opcode == LINE):
+                pixels.line(values[0], values[1], values[2], values[3], values[4], rgb(values[5]))
+            elif (opcode == FILL):
+                pixels.polygon(list(zip(values[2::2], values[3::2])), rgb(values[0]))
+            elif (opcode == DOT):
+                pixels.disc(values[0], values[1], values[2] / 2, rgb(values[3]))
+        return pixels.png()
+
+
+def rgb(color):
+    """Get the (r, g, b) bytes of a recorded colour - a name, "#rrggbb" or a 0-255 tuple"""
+    if (type(color) is tuple):
+        return color
+    if (color.startswith("#") and len(color) == 7):
+        return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return COLOR_NAMES.get(color.lower().replace(" ", ""), (0, 0, 0))
+
+
+class Raster:
+    """RGB pixels in turtle coordinates (origin at the centre, y up)"""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height * 3)
+
+    def fill(self, color):
+        self.pixels[:] = bytes(color) * (self.width * self.height)
+
+    def set_span(self, x1: int, x2: int, y: int, color):
+        """Colour pixels x1 to x2 (inclusive) of pixel row y, clipped"""
+        x1, x2 = max(x1, 0), min(x2, self.width - 1)
+        if (0 <= y < self.height and x1 <= x2):
+            start = (y * self.width + x1) * 3
+            self.pixels[start:start + (x2 - x1 + 1) * 3] = bytes(color) * (x2 - x1 + 1)
+
+    def to_pixel(self, x: float, y: float):
+        return self.width / 2 + x, self.height / 2 - y
+
+    def line(self, x1, y1, x2, y2, width, color):
+        px1, py1 = self.to_pixel(x1, y1)
+        px2, py2 = self.to_pixel(x2, y2)
+        steps = max(int(max(abs(px2 - px1), abs(py2 - py1))), 1)
+        half = max(int(width) // 2, 0)
+        for i in range(steps + 1):
+            x = round(px1 + (px2 - px1) * i / steps)
+            y = round(py1 + (py2 - py1) * i / steps)
+            for row in range(y - half, y + half + 1):
+                self.set_span(x - half, x + half, row, color)
+
+    def disc(self, x, y, radius, color):
+        px, py = self.to_pixel(x, y)
+        for row in range(int(py - radius), int(py + radius) + 1):
+            half = math.sqrt(max(radius * radius - (row - py) ** 2, 0))
+            self.set_span(round(px - half), round(px + half), row, color)
+
+    def polygon(self, points, color):
+        """Fill a polygon of turtle points (even-odd rule)"""
+        points = [self.to_pixel(x, y) for x, y in points]
+        if (len(points) < 3):
+            return
+        for row in range(max(int(min(y for x, y in points)), 0), min(int(max(y for x, y in points)) + 1, self.height)):
+            centre = row + 0.5
+            crossings = []
+            for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]):
+                if ((ya <= centre) != (yb <= centre)):
+                    crossings.append(xa + (centre - ya) * (xb - xa) / (yb - ya))
+            crossings.sort()
+            for start, end in zip(crossings[::2], crossings[1::2]):
+                self.set_span(round(start), round(end) - 1, row, color)
+
+    def png(self):
+        rows = b"".join(b"\0" + bytes(self.pixels[y * self.width * 3:(y + 1) * self.width * 3]) for y in range(self.height))
+
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+class Shape:
+    """A compound or polygon shape, like turtle.Shape - registered, but never drawn"""
+
+    def __init__(self, type_, data=None):
+        self._type = type_
+        self._data = [] if type_ == "compound" and data is None else data
+
+    def addcomponent(self, poly, fill, outline=None):
+        if (self._type != "compound"):
+            raise TurtleGraphicsError(f"Cannot add a component to a {self._type} shape")
+        self._data.append((poly, fill, outline))
+
+
+class Canvas:
+    """Stand-in for Tk's canvas (turtle.Canvas, and what getcanvas returns) - there is none, so its methods do nothing"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+ScrolledCanvas = Canvas
+TK = None  # No Tk
+
+
+class simpledialog:
+    """tkinter.simpledialog's questions - read from input, like textinput"""
+
+    @staticmethod
+    def askstring(title, prompt, **options):
+        return input(prompt)
+
+    @staticmethod
+    def askinteger(title, prompt, **options):
+        return int(input(prompt))
+
+    @staticmethod
+    def askfloat(title, prompt, **options):
+        return float(input(prompt))
+
+
+class Tbuffer:
+    """turtle's undo buffer - kept, though undo does nothing here"""
+
+    def __init__(self, bufsize=10):
+        self.bufsize = bufsize
+        self.reset()
+
+    def reset(self, bufsize=None):
+        if (bufsize is not None):
+            self.bufsize = bufsize
+        self.buffer = []
+
+    def push(self, item):
+        if (self.bufsize > 0):
+            self.buffer = (self.buffer + [item])[-self.bufsize:]
+
+    def pop(self):
+        return self.buffer.pop() if len(self.buffer) > 0 else None
+
+    def nr_of_items(self):
+        return len(self.buffer)
+
+
+def config_dict(filename):
+    return {}  # No turtle.cfg is read
+
+
+def readconfig(cfgdict):
+    pass
+
+
+def read_docstrings(lang):
+    pass
+
+
+def write_docstringdict(filename="turtle_docstringdict"):
+    pass
+
+
+def getmethparlist(ob):
+    """Get the parameters of a method (without self) as definition and call text, like turtle's"""
+    parameters = list(inspect.signature(ob).parameters.values())[1:]
+    definition = ", ".join(str(parameter) for parameter in parameters)
+    call = ", ".join(("*" if parameter.kind == parameter.VAR_POSITIONAL else "**" if parameter.kind == parameter.VAR_KEYWORD else "") + parameter.name
+                     for parameter in parameters)
+    return f"({definition})", f"({call})"
+
+
+class _Screen:
+    """The one screen - recording, with timers run instantly in order (fast-forwarded) by mainloop"""
+
+    def __init__(self):
+        self.drawing = Drawing()
+        self._turtles = []
+        self._turtle_count = 0  # Numbers given to turtles - never reused, so records of cleared turtles stay apart
+        self._shapes = {"arrow", "blank", "circle", "classic", "square", "triangle", "turtle"}
+        self._colormode = 1.0
+        self._bgcolor = "white"
+        self._timers = []  # (virtual due ms, order, function)
+        self._timer_clock = 0
+
+    def turtles(self):
+        return list(self._turtles)
+
+    def _add_turtle(self, turtle):
+        """Register a new turtle, returning its number"""
+        self._turtles.append(turtle)
+        self._turtle_count += 1
+        return self._turtle_count - 1
+
+    def register_shape(self, name, shape=None):
+        self._shapes.add(name)
+
+    addshape = register_shape
+
+    def getshapes(self):
+        return sorted(self._shapes)
+
+    def getcanvas(self):
+        return Canvas()  # No Tk canvas
+
+    def bgcolor(self, *color):
+        if (len(color) == 0):
+            return self._bgcolor
+        self._bgcolor = color_arg(color)
+        self.drawing.add(BGCOLOR, -1, self.drawing.color_index(recorded_color(self, self._bgcolor)))
+
+    def colormode(self, mode=None):
+        if (mode is None):
+            return self._colormode
+        if (mode not in (1.0, 255)):
+            raise TurtleGraphicsError(f"No colormode {mode}")
+        self._colormode = 255 if mode == 255 else 1.0
+
+    def setup(self, width=None, height=None, startx=None, starty=None):
+        # Only pixel sizes - fractions of the (nonexistent) monitor keep the default
+        if (isinstance(width, int)):
+            self.drawing.width = width
+        if (isinstance(height, int)):
+            self.drawing.height = height
+
+    def screensize(self, canvwidth=None, canvheight=None, bg=None):
+        if (canvwidth is None and canvheight is None and bg is None):
+            return self.drawing.width, self.drawing.height
+        self.setup(canvwidth, canvheight)
+        if (bg is not None):
+            self.bgcolor(bg)
+
+    def window_width(self):
+        return self.drawing.width
+
+    def window_height(self):
+        return self.drawing.height
+
+    def clear(self):
+        self.drawing.add(CLEAR, -1)
+        self._turtles = []
+        self._bgcolor = "white"
+
+    clearscreen = clear
+
+    def reset(self):
+        for turtle in self._turtles:
+            turtle.reset()
+
+    resetscreen = reset
+
+    def ontimer(self, fun, t=0):
+        self._timers.append((self._timer_clock + t, len(self._timers), fun))
+
+    def mainloop(self):
+        """Run the timers in order of when they are due, without waiting - input events never happen"""
+        while (len(self._timers) > 0):
+            self._timers.sort(key=lambda timer: timer[:2])
+            due, order, fun = self._timers.pop(0)
+            self._timer_clock = due
+            fun()
+
+    done = mainloop
+
+    def exitonclick(self):
+        self.mainloop()
+
+    def bye(self):
+        pass
+
+    def textinput(self, title, prompt):
+        return input(prompt)
+
+    def numinput(self, title, prompt, default=None, minval=None, maxval=None):
+        return float(input(prompt))
+
+    def _nothing(self, *args, **kwargs):
+        """Display settings and input events, which do nothing without a display"""
+
+    title = tracer = update = delay = listen = onkey = onkeypress = onkeyrelease = onclick = onscreenclick = mode = _nothing
+    bgpic = setworldcoordinates = _nothing
+
+
+TurtleScreen = TurtleScreenBase = _Screen
+
+_screen = None
+
+
+def Screen():
+    """Get the screen, making it the first time"""
+    global _screen
+    if (_screen is None):
+        _screen = _Screen()
+        Turtle.screens.append(_screen)
+    return _screen
+
+
+def color_arg(args: tuple):
+    """Get a colour from its arguments - name, (r, g, b) or r, g, b"""
+    if (len(args) == 1):
+        args = args[0]
+    if (type(args) is str):
+        return args
+    if (len(args) == 3):
+        return tuple(args)
+    raise TurtleGraphicsError(f"Bad color arguments: {args}")
+
+
+def recorded_color(screen: _Screen, color):
+    """Get a colour as recorded - names stay, tuples become 0-255 ints"""
+    if (type(color) is str):
+        return color
+    if (screen._colormode == 1.0):
+        return tuple(round(part * 255) for part in color)
+    return tuple(int(part) for part in color)
+
+
+class Turtle:
+    """A turtle drawing on the screen"""
+
+    screens = []  # Every screen made, like RawTurtle.screens
+    DEFAULT_MODE = "standard"
+    DEFAULT_ANGLEOFFSET = 0
+    DEFAULT_ANGLEORIENT = 1
+    START_ORIENTATION = {"standard": Vec2D(1.0, 0.0), "world": Vec2D(1.0, 0.0), "logo": Vec2D(0.0, 1.0)}
+
+    def __init__(self, shape="classic", undobuffersize=1000, visible=True):
+        self.screen = Screen()
+        self.number = self.screen._add_turtle(self)
+        self.drawing = self.screen.drawing
+        self._fullcircle = 360.0
+        self._reset_state()
+        self._visible = visible
+        self._shape = shape
+
+    def reset(self):
+        self._reset_state()
+        self.clear()
+
+    def _reset_state(self):
+        self._position = Vec2D(0.0, 0.0)
+        self._angle = 0.0  # Degrees, counterclockwise from east
+        self._down = True
+        self._pensize = 1
+        self._pencolor = "black"
+        self._fillcolor = "black"
+        self._fill_start = None  # (log length, points) while filling
+        self._poly = None  # Points while recording a polygon
+        self._last_poly = None
+        self._stretch = (1, 1, 1)
+        self._resizemode = "noresize"
+        self._tilt = 0.0
+        self._shear = 0.0
+        self._shapetransform = (1.0, 0.0, 0.0, 1.0)
+
+    """Moving"""
+    def _goto(self, x, y):
+        end = Vec2D(float(x), float(y))
+        if (self._down):
+            self.drawing.add(LINE, self.number, self._position[0], self._position[1], end[0], end[1], self._pensize,
+                             self.drawing.color_index(recorded_color(self.screen, self._pencolor)))
+        if (self._fill_start is not None):
+            self._fill_start[1].append(end)
+        if (self._poly is not None):
+            self._poly.append(end)
+        self._position = end
+
+    def forward(self, distance):
+        radians = math.radians(self._angle)
+        self._goto(self._position[0] + distance * math.cos(radians), self._position[1] + distance * math.sin(radians))
+
+    fd = forward
+
+    def back(self, distance):
+        self.forward(-distance)
+
+    bk = backward = back
+
+    def left(self, angle):
+        self._angle = (self._angle + angle * 360.0 / self._fullcircle) % 360.0
+
+    lt = left
+
+    def right(self, angle):
+        self.left(-angle)
+
+    rt = right
+
+    def goto(self, x, y=None):
+        if (y is None):
+            x, y = x
+        self._goto(x, y)
+
+    setpos = setposition = goto
+
+    def setx(self, x):
+        self._goto(x, self._position[1])
+
+    def sety(self, y):
+        self._goto(self._position[0], y)
+
+    def setheading(self, to_angle):
+        self._angle = (to_angle * 360.0 / self._fullcircle) % 360.0
+
+    seth = setheading
+
+    def home(self):
+        self._goto(0, 0)
+        self.setheading(0)
+
+    def circle(self, radius, extent=None, steps=None):
+        """Draw a circle (or arc of extent) as straight steps, exactly like turtle.circle"""
+        if (extent is None):
+            extent = self._fullcircle
+        if (steps is None):
+            frac = abs(extent) / self._fullcircle
+            steps = 1 + int(min(11 + abs(radius) / 6.0, 59.0) * frac)
+        w = 1.0 * extent / steps
+        w2 = 0.5 * w
+        length = 2.0 * radius * math.sin(math.radians(w2 * 360.0 / self._fullcircle))
+        if (radius < 0):
+            length, w, w2 = -length, -w, -w2
+        self.left(w2)
+        for i in range(steps):
+            self.forward(length)
+            self.left(w)
+        self.left(-w2)
+
+    """State"""
+    def position(self):
+        return self._position
+
+    pos = position
+
+    def xcor(self):
+        return self._position[0]
+
+    def ycor(self):
+        return self._position[1]
+
+    def heading(self):
+        return self._angle * self._fullcircle / 360.0
+
+    def towards(self, x, y=None):
+        if (y is None):
+            x, y = x
+        return (math.degrees(math.atan2(y - self._position[1], x - self._position[0])) % 360.0) * self._fullcircle / 360.0
+
+    def distance(self, x, y=None):
+        if (y is None):
+            x, y = x
+        return math.hypot(x - self._position[0], y - self._position[1])
+
+    def degrees(self, fullcircle=360.0):
+        self._fullcircle = fullcircle
+
+    def radians(self):
+        self._fullcircle = 2 * math.pi
+
+    """Pen"""
+    def penup(self):
+        self._down = False
+
+    pu = up = penup
+
+    def pendown(self):
+        self._down = True
+
+    pd = down = pendown
+
+    def isdown(self):
+        return self._down
+
+    def pensize(self, width=None):
+        if (width is None):
+            return self._pensize
+        self._pensize = width
+
+    width = pensize
+
+    def pencolor(self, *color):
+        if (len(color) == 0):
+            return self._pencolor
+        self._pencolor = color_arg(color)
+
+    def fillcolor(self, *color):
+        if (len(color) == 0):
+            return self._fillcolor
+        self._fillcolor = color_arg(color)
+
+    def color(self, *colors):
+        if (len(colors) == 0):
+            return self._pencolor, self._fillcolor
+        if (len(colors) == 2):
+            self.pencolor(colors[0])
+            self.fillcolor(colors[1])
+        else:
+            self.pencolor(*colors)
+            self.fillcolor(*colors)
+
+    def begin_fill(self):
+        self._fill_start = (len(self.drawing.log), [self._position])
+
+    def end_fill(self):
+        if (self._fill_start is None):
+            return
+        start, points = self._fill_start
+        self._fill_start = None
+        record = [FILL, self.number, self.drawing.color_index(recorded_color(self.screen, self._fillcolor)), len(points)]
+        for point in points:
+            record.extend(point)
+        self.drawing.log[start:start] = array.array("d", record)  # Under the lines drawn while filling
+
+    def filling(self):
+        return self._fill_start is not None
+
+    def dot(self, size=None, *color):
+        if (size is None):
+            size = max(self._pensize + 4, 2 * self._pensize)
+        color = self._pencolor if len(color) == 0 else color_arg(color)
+        self.drawing.add(DOT, self.number, self._position[0], self._position[1], size,
+                         self.drawing.color_index(recorded_color(self.screen, color)))
+
+    def write(self, arg, move=False, align="left", font=("Arial", 8, "normal")):
+        self.drawing.texts.append(str(arg))
+        self.drawing.add(TEXT, self.number, self._position[0], self._position[1], len(self.drawing.texts) - 1,
+                         self.drawing.color_index(recorded_color(self.screen, self._pencolor)))
+
+    def clear(self):
+        self.drawing.add(CLEAR, self.number)
+
+    def stamp(self):
+        return 0  # Shapes aren't drawn
+
+    def begin_poly(self):
+        self._poly = [self._position]
+
+    def end_poly(self):
+        if (self._poly is not None):
+            self._last_poly = tuple(self._poly)
+            self._poly = None
+
+    def get_poly(self):
+        return self._last_poly
+
+    def clone(self):
+        """Get a new turtle in the same state"""
+        turtle = Turtle.__new__(Turtle)
+        turtle.__dict__.update(self.__dict__)
+        turtle.number = self.screen._add_turtle(turtle)
+        turtle._fill_start = None if self._fill_start is None else (self._fill_start[0], list(self._fill_start[1]))
+        turtle._poly = None if self._poly is None else list(self._poly)
+        return turtle
+
+    def pen(self, pen=None, **pendict):
+        """Get the pen's attributes as a dictionary, or set them from one (and/or keywords)"""
+        attributes = {"shown": self._visible, "pendown": self._down, "pencolor": self._pencolor, "fillcolor": self._fillcolor,
+                      "pensize": self._pensize, "speed": 0, "resizemode": self._resizemode, "stretchfactor": self._stretch[:2],
+                      "outline": self._stretch[2], "tilt": self._tilt}
+        if (pen is None and len(pendict) == 0):
+            return attributes
+        changes = dict(pen or {}, **pendict)
+        for key, value in changes.items():
+            if (key not in attributes):
+                raise TurtleGraphicsError(f"No pen attribute {key}")
+        self._visible = changes.get("shown", self._visible)
+        self._down = changes.get("pendown", self._down)
+        self._pencolor = changes.get("pencolor", self._pencolor)
+        self._fillcolor = changes.get("fillcolor", self._fillcolor)
+        self._pensize = changes.get("pensize", self._pensize)
+        self._resizemode = changes.get("resizemode", self._resizemode)
+        stretch = changes.get("stretchfactor", self._stretch[:2])
+        self._stretch = (stretch[0], stretch[1], changes.get("outline", self._stretch[2]))
+        self._tilt = changes.get("tilt", self._tilt)
+
+    """Display"""
+    def hideturtle(self):
+        self._visible = False
+
+    ht = hideturtle
+
+    def showturtle(self):
+        self._visible = True
+
+    st = showturtle
+
+    def isvisible(self):
+        return self._visible
+
+    def shape(self, name=None):
+        if (name is None):
+            return self._shape
+        self._shape = name
+
+    def shapesize(self, stretch_wid=None, stretch_len=None, outline=None):
+        if (stretch_wid is None and stretch_len is None and outline is None):
+            return self._stretch
+        self._stretch = (stretch_wid or self._stretch[0], stretch_len or stretch_wid or self._stretch[1], outline or self._stretch[2])
+
+    turtlesize = shapesize
+
+    def resizemode(self, rmode=None):
+        if (rmode is None):
+            return self._resizemode
+        if (rmode in ("auto", "user", "noresize")):
+            self._resizemode = rmode
+
+    def tilt(self, angle):
+        self._tilt = (self._tilt + angle * 360.0 / self._fullcircle) % 360.0
+
+    def tiltangle(self, angle=None):
+        if (angle is None):
+            return self._tilt * self._fullcircle / 360.0
+        self._tilt = (angle * 360.0 / self._fullcircle) % 360.0
+
+    settiltangle = tiltangle
+
+    def shearfactor(self, shear=None):
+        if (shear is None):
+            return self._shear
+        self._shear = shear
+
+    def shapetransform(self, t11=None, t12=None, t21=None, t22=None):
+        if (t11 is None and t12 is None and t21 is None and t22 is None):
+            return self._shapetransform
+        matrix = [t11, t12, t21, t22]
+        self._shapetransform = tuple(value if value is not None else old for value, old in zip(matrix, self._shapetransform))
+
+    def get_shapepoly(self):
+        return None  # Shapes aren't drawn
+
+    def undobufferentries(self):
+        return 0  # Nothing can be undone
+
+    def speed(self, speed=None):
+        return 0 if speed is None else None  # Never animated
+
+    def getscreen(self):
+        return self.screen
+
+    def getturtle(self):
+        return self
+
+    getpen = getturtle
+
+    def _nothing(self, *args, **kwargs):
+        """Undo buffer, shapes and input events, which do nothing here"""
+
+    undo = setundobuffer = onclick = onrelease = ondrag = clearstamp = clearstamps = _nothing
+
+
+Pen = RawTurtle = RawPen = TNavigator = TPen = Turtle  # One class has what turtle's base classes do
+
+_turtle = None
+
+
+def getturtle():
+    """Get the turtle used by the module-level functions, making it the first time"""
+    global _turtle
+    if (_turtle is None):
+        _turtle = Turtle()
+    return _turtle
+
+
+getpen = getturtle
+
+
+def _module_function(cls, name: str):
+    if (cls is Turtle):
+        function = lambda *args, **kwargs: getattr(getturtle(), name)(*args, **kwargs)
+    else:
+        function = lambda *args, **kwargs: getattr(Screen(), name)(*args, **kwargs)
+    function.__name__ = name
+    return function
+
+
+# Module-level functions on the default turtle and screen, like turtle's (the turtle's if both have one)
+for _cls in (Turtle, _Screen):
+    for _name in dir(_cls):
+        if (not _name.startswith("_") and _name not in globals() and callable(getattr(_cls, _name))):
+            globals()[_name] = _module_function(_cls, _name)
+del _cls, _name
+
+
+def drawing():
+    """Get the screen's drawing so far"""
+    return Screen().drawing
+
+
+def install():
+    """Make `import turtle` load this module - named turtle, so errors name the module programs imported"""
+    module = sys.modules[__name__]
+    module.__name__ = "turtle"
+    sys.modules["turtle"] = module
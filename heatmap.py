@@ -0,0 +1,166 @@
+"""Line heatmaps - how often each line of a program ran and how long it took, cheap enough to leave on for graded runs"""
+import signal
+import sys
+import threading
+from time import perf_counter  # The real clock, even under a virtual_clock.VirtualClock
+
+
+class LineHeatmap:
+    """Count line runs and time in one file, in lists preallocated for every line and indexed by line number
+    (not array.array, which boxes a new int on every increment).
+    Lines are counted with sys.monitoring (Python 3.12+) LINE events switched on only for the file's code objects, as each first starts,
+    under a tool id no other tool (like coverage.py) holds - otherwise with a settrace tracer which only traces the file's frames.
+    The callbacks just count, as they run for every line: times are sampled every interval seconds of CPU time (SIGPROF), adding to
+    the file's innermost running line - so a line's time includes calls into other code. Without a timer (not the main thread,
+    or no setitimer) or if not sample (under cProfile, which would profile the SIGPROF handler), each line is timed until the next."""
+
+    TOOL_NAME = "globalpython-heatmap"
+
+    def __init__(self, filename: str, num_lines: int, interval: float = 0.001, sample: bool = True):
+        self.filename = filename
+        self.interval = interval
+        self.sample_times = sample
+        self.hits = [0] * (num_lines + 1)  # Index 0 unused, like line numbers
+        self.times = [0.0] * (num_lines + 1)
+        self.sampling = False
+        self.previous_handler = None
+        self.last = [0, 0.0]  # Line running and when it started, if timing each line
+        self.tool = None
+        self.codes = []  # Code objects with LINE events on
+        self.previous_tracer = None  # settrace function running before (e.g. a debugger's), put back after
+
+    @classmethod
+    def for_file(cls, filename: str, interval: float = 0.001, sample: bool = True):
+        """Heatmap sized for a source file"""
+        with open(filename, "r", encoding="utf8") as reader:
+            return cls(filename, sum(1 for line in reader) + 1, interval, sample)
+
+    def start(self):
+        self.sampling = self.sample_times and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+        if (self.sampling):
+            self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.last[:] = [0, perf_counter()]
+
+        line = self.counter()
+        self.tool = self.free_tool()
+        if (self.tool is not None):
+            sys.monitoring.use_tool_id(self.tool, self.TOOL_NAME)
+            sys.monitoring.register_callback(self.tool, sys.monitoring.events.PY_START, self.code_start)
+            sys.monitoring.register_callback(self.tool, sys.monitoring.events.LINE, line)
+            sys.monitoring.set_events(self.tool, sys.monitoring.events.PY_START)
+        else:
+            self.previous_tracer = sys.gettrace()
+            sys.settrace(self.tracer(line))
+
+    def stop(self):
+        if (self.sampling):
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler)
+        else:
+            self.times[self.last[0]] += perf_counter() - self.last[1]  # Time of the last line
+
+        if (self.tool is not None):
+            sys.monitoring.set_events(self.tool, 0)
+            for code in self.codes:
+                sys.monitoring.set_local_events(self.tool, code, 0)
+            for event in (sys.monitoring.events.PY_START, sys.monitoring.events.LINE):
+                sys.monitoring.register_callback(self.tool, event, None)
+            sys.monitoring.free_tool_id(self.tool)
+            sys.monitoring.restart_events()  # Code starts switched off for this tool
+            self.tool = None
+            self.codes = []
+        else:
+            sys.settrace(self.previous_tracer)
+            self.previous_tracer = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @staticmethod
+    def free_tool():
+        """Get a sys.monitoring tool id no tool holds (the coverage id first, as the heatmap is a kind of coverage) - None if there is
+        none, or no sys.monitoring"""
+        if (not hasattr(sys, "monitoring")):
+            return None
+        candidates = [sys.monitoring.COVERAGE_ID] + [tool for tool in range(6) if tool != sys.monitoring.COVERAGE_ID]
+        for tool in candidates:
+            if (sys.monitoring.get_tool(tool) is None):
+                return tool
+        return None
+
+    def counter(self):
+        """Get line(code, lineno) - counts a line starting (timing the last one until it, if not sampling)"""
+        hits, times, last = self.hits, self.times, self.last
+        num_lines = len(hits)
+
+        if (self.sampling):
+            def line(code, lineno: int):
+                if (lineno < num_lines):
+                    hits[lineno] += 1
+            return line
+
+        def timed_line(code, lineno: int):
+            now = perf_counter()
+            times[last[0]] += now - last[1]
+            if (lineno >= num_lines):
+                lineno = 0
+            hits[lineno] += 1
+            last[0] = lineno
+            last[1] = now
+        return timed_line
+
+    def code_start(self, code, offset: int):
+        """sys.monitoring PY_START callback - switches lines on for the file's code, then never runs again for that code"""
+        if (code.co_filename == self.filename):
+            self.codes.append(code)
+            sys.monitoring.set_local_events(self.tool, code, sys.monitoring.events.LINE)
+        return sys.monitoring.DISABLE
+
+    def tracer(self, line):
+        """Get the settrace function"""
+        filename = self.filename
+
+        def trace_line(frame, event, arg):
+            if (event == "line"):
+                line(None, frame.f_lineno)
+            return trace_line
+
+        def trace_call(frame, event, arg):
+            if (frame.f_code.co_filename == filename):
+                return trace_line
+            return None  # Other files aren't traced
+        return trace_call
+
+    def sample(self, signum, frame):
+        """SIGPROF handler - adds the interval to the file's innermost running line"""
+        while (frame is not None and frame.f_code.co_filename != self.filename):
+            frame = frame.f_back
+        if (frame is not None and frame.f_lineno is not None and frame.f_lineno < len(self.times)):
+            self.times[frame.f_lineno] += self.interval
+
+    def project(self, line_mappings: list = None):
+        """Get (hits, times) lists for translated lines (index 0 unused) through a debug file's line_mappings - None if lines are the same.
+        Times of compiled lines on one translated line add up; hits are the most of any of them, so a statement split over lines counts once."""
+        if (line_mappings is None):
+            hits, times = self.hits.copy(), self.times.copy()
+        else:
+            num_lines = max([int(line) for line in line_mappings] + [0]) + 1
+            hits = [0] * num_lines
+            times = [0.0] * num_lines
+            for lineno in range(1, min(len(self.hits), len(line_mappings))):
+                target = int(line_mappings[lineno])
+                hits[target] = max(hits[target], self.hits[lineno])
+                times[target] += self.times[lineno]
+        hits[0] = 0
+        times[0] = 0.0
+        return hits, times
+
+    def to_json(self, source_file: str, line_mappings: list = None):
+        """Get the heatmap of translated lines for export - {"file": source_file, "hits": [...], "times": [...]}, indexed by line"""
+        hits, times = self.project(line_mappings)
+        return {"file": source_file, "hits": hits, "times": times}
@@ -1,37 +1,122 @@
-import json, os, time
+import bisect
+import hashlib
+import json, os, pickle, sys, time
 import re
 from collections import deque
 
+from log import logger
+
+def overlay_dict(data: dict, layer: dict):
+    """Get a dict with a layer's entries laid over data's - a null entry removes it"""
+    result = dict(data)
+    for key, value in layer.items():
+        if (value is None):
+            result.pop(key, None)
+        else:
+            result[key] = value
+    return result
+
+
+class LanguageNode:
+    """A node of language data - translated name, properties (raw name > node), parameters (None if not callable) and base classes (raw paths)"""
+    __slots__ = ("translated", "props", "params", "bases")
+
+    def __init__(self, translated: str, props: dict = None, params: list = None, bases: list = None):
+        self.translated = translated
+        self.props = props
+        self.params = params
+        self.bases = bases if bases is not None else []
+
+    @classmethod
+    def from_json(cls, data):
+        """Build a node tree from its JSON list format, leaving special properties (like .messages) as they are.
+        Names are interned, as the same few ("<name>", "self", "builtins"...) repeat across the whole tree."""
+        props = data[1] if len(data) > 1 else None
+        if (props is not None):
+            props = {sys.intern(key): (cls.from_json(value) if type(value) is list else value) for key, value in props.items()}
+        params = [sys.intern(param) for param in data[2]] if len(data) > 2 and data[2] is not None else None
+        bases = [tuple(map(sys.intern, base)) for base in data[3]] if len(data) > 3 else []
+        return cls(sys.intern(data[0]), props, params, bases)
+
+    def to_json(self):
+        """Get the JSON list format of this node (inner nodes are converted by json's default hook)"""
+        return [self.translated, self.props, self.params, [list(base) for base in self.bases]]
+
+    def overlay(self, layer):
+        """Get this node with a layer laid over it - a node in the JSON list format with only what differs (see languages-README.md).
+        Parts the layer leaves out (or null) are kept; a null property is removed. Nodes the layer doesn't reach are this node's own,
+        so a layered pack shares the rest of its tree (and its indexes) with the pack under it."""
+        translated = layer[0] if len(layer) > 0 and layer[0] is not None else self.translated
+        props = self.props
+        if (len(layer) > 1 and layer[1] is not None):
+            props = dict(props) if props is not None else {}
+            for key, value in layer[1].items():
+                key = sys.intern(key)
+                if (value is None):
+                    props.pop(key, None)
+                elif (type(value) is list):
+                    props[key] = props[key].overlay(value) if type(props.get(key)) is LanguageNode else LanguageNode.from_json(value)
+                elif (type(value) is dict and type(props.get(key)) is dict):
+                    props[key] = overlay_dict(props[key], value)  # Special properties, e.g. .messages
+                else:
+                    props[key] = value
+        params = [sys.intern(param) for param in layer[2]] if len(layer) > 2 and layer[2] is not None else self.params
+        bases = [tuple(map(sys.intern, base)) for base in layer[3]] if len(layer) > 3 and layer[3] is not None else self.bases
+        return LanguageNode(sys.intern(translated), props, params, bases)
+
+    def copy(self):
+        """Get a copy which can be changed without changing this node - its properties and base classes are copied one level deep"""
+        return LanguageNode(self.translated, dict(self.props) if self.props is not None else None, self.params, list(self.bases))
+
+    def __reduce__(self):
+        # Pickle as constructor arguments - smaller and faster to load than slot state
+        return (LanguageNode, (self.translated, self.props, self.params, self.bases))
+
+    def __repr__(self):
+        return f"LanguageNode({self.translated!r}, {self.props!r}, {self.params!r}, {self.bases!r})"
+
+
 class LanguageEnv:
     """Class for loading language files into an environment and keeping variable names"""
 
+    # Packages are loaded once per process and shared (read-only) by every environment
+    packs = {}  # (data dir, package) > LanguageNode
+    frozen_ids = set()  # ids of every shared node and properties dict - the packs keep them alive, so ids aren't reused
+    pack_indexes = {}  # (kind, id(shared properties dict)) > index, like indexes
+    summaries = {}  # Summary path > ((modification time, size), interface hash, LanguageNode) - shared like packs, replaced when the file changes
+
+    SNAPSHOT_VERSION = 3
+    SUMMARY_VERSION = 1
+    SUMMARY_SUFFIX = ".pyi.json"  # Interface summary of a compiled module, beside it - e.g. utilidades.pyi.json for utilidades.py
+    LAYER_FILE = ".layer.json"  # In a layered language's folder - {"parent": folder of the language it is laid over, relative to it}
+
     def print_data(self, path, data):
         """Get documentation data to display about an object"""
         # Translated name, properties, args (None if not callable), Inherits from / returns
         # Details
 
         # Translated Name
-        translated_name = data[0]
+        translated_name = data.translated
         # Properties
         property_names = []
-        if(len(data) > 1 and type(data[1]) is dict):
-            for key in data[1]:
-                prop = data[1][key]
-                property_names.append(prop[0])
+        if(data.props is not None):
+            for key in data.props:
+                prop = data.props[key]
+                if(type(prop) is LanguageNode): # Not special properties
+                    property_names.append(prop.translated)
 
         # Arguments
         callable = False
         call_syntax = ""
-        if (len(data) > 2 and type(data[2]) is list):
+        if (data.params is not None):
             callable = True
-            params = data[2]
+            params = data.params
             call_syntax = f'({",".join(params)})'
 
         # Base classes / Inheritance
         inherits_from = []
-        if (len(data) > 3 and type(data[3]) is list):
-            for base_path in data[3]:
-                inherits_from.append(".".join(base_path))
+        for base_path in data.bases:
+            inherits_from.append(".".join(base_path))
 
 
         return f"""
@@ -44,36 +129,203 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
 [Compiled Path (English): {" > ".join(path)}]
 """
 
-    def __init__(self, data_dir):  # Language, e.g. es
+    def __init__(self, data_dir, snapshot: str = None, module_dirs: list = ()):  # Language, e.g. es
         """Initialise environment for language files and load builtins
-@param data_dir path identifier language files are stored in"""
+@param data_dir path identifier language files are stored in
+@param snapshot path of a snapshot from save_snapshot to start from instead of the language files, if not None (and not stale)
+@param module_dirs directories of compiled translated modules, whose interface summaries (see module_summary) can be imported"""
         # Initialise root directory and saved translation strings
         self.data_dir = data_dir
+        self.layers = self.layer_dirs(data_dir)  # Folders of this language, then of those it is laid over
+        self.module_dirs = list(module_dirs)
+        self.indexes = {}  # (kind, id(properties dict)) > (properties, index, size) - see props_index
 
         # Load built-in files and keywords
 
         # Globals
-        self.scope_stack[0] = ["heap", {}, None, [[".PKG", "builtins"]]]  # No args; no base classes
+        # Specific scopes identified via names
+        self.scope_stack = [LanguageNode("heap", {}, None, [(".PKG", "builtins")])]  # Global scope contains builtins and imported packages; no args
+        self.hiddentype_IDs = {}
+        self.hiddentype_namespace = "" # Prefix of IDs, so separately-numbered parts of a file don't clash
 
         # print(f"Globals: {self.scope_stack[0]}")
-        self.kw = self.load_lib(".kw")  # Keywords
-        self.pkgs = self.load_lib(".pkgs")  # Package names
-        self.literals = self.load_lib(".literals")  # Literals
+        if (snapshot is None or not self.load_snapshot(snapshot)):
+            self.kw = self.load_lib(".kw")  # Keywords
+            self.pkgs = self.load_lib(".pkgs")  # Package names
+            self.literals = {name: [tuple(path) for path in paths] for name, paths in self.load_lib(".literals").items()}  # Literals
 
         # Builtins > Globals
         self.import_pkg_raw("builtins") # Reference in base
 
-    def load_lib(self, filename):
-        """Get the parsed JSON data from the language folder with the specific filename (don't include the .json)."""
-        # Find data file
-        data_file = os.path.join(self.data_dir, filename + ".json")
-
-        # Load as JSON
+    @classmethod
+    def layer_dirs(cls, data_dir):
+        """Get the folders of a language - its own, then (if it is layered) those of the languages under it, down to a whole one"""
+        layers = [data_dir]
+        while (os.path.exists(os.path.join(layers[-1], cls.LAYER_FILE))):
+            with open(os.path.join(layers[-1], cls.LAYER_FILE), encoding='utf8') as reader:
+                parent = os.path.normpath(os.path.join(layers[-1], json.load(reader)["parent"]))
+            if (parent in layers):
+                raise ValueError(f"Language {data_dir} is laid over itself")
+            layers.append(parent)
+        return layers
+
+    @classmethod
+    def has_lib(cls, data_dir, filename):
+        """Whether a language (or one under it) has a language file - e.g. a package's"""
+        return any(os.path.exists(os.path.join(layer, filename + ".json")) for layer in cls.layer_dirs(data_dir))
+
+    @staticmethod
+    def read_layer(data_dir, filename):
+        """Get the parsed JSON data of one folder's language file, or None if it has none"""
+        data_file = os.path.join(data_dir, filename + ".json")
+        if (not os.path.exists(data_file)):
+            return None
         with open(data_file, encoding='utf8') as reader:
-            data = json.load(reader)
+            return json.load(reader)
 
+    def load_lib(self, filename):
+        """Get the parsed JSON data from the language folder with the specific filename (don't include the .json).
+        A layered language's file is laid over the one under it, entry by entry (see overlay_dict) - it only needs what differs."""
+        # The deepest layer's file (e.g. the whole language's), then each one's above it
+        data = None
+        for data_dir in self.layers[::-1]:
+            layer = self.read_layer(data_dir, filename)
+            if (layer is not None):
+                data = layer if data is None else overlay_dict(data, layer)
+
+        if (data is None):
+            raise FileNotFoundError(f"No language file {filename}.json in {self.data_dir}")
         return data
 
+    def load_pack(self, package):
+        """Get the shared node tree of a package by its English name, loading it the first time it is needed in this process.
+        The tree must not be changed - environments copy nodes on write (see writable).
+        A layered language's pack is the pack under it with the layer's pack file laid over (see LanguageNode.overlay), sharing its unchanged nodes."""
+        pack = self.packs.get((os.path.abspath(self.data_dir), package))
+        if (pack is not None):
+            return pack
+
+        for data_dir in self.layers[::-1]:
+            key = (os.path.abspath(data_dir), package)
+            layer_pack = self.packs.get(key)
+            if (layer_pack is None):
+                layer = self.read_layer(data_dir, package)
+                if (pack is None):
+                    if (layer is None):
+                        continue  # Starts in a layer above
+                    layer_pack = LanguageNode.from_json(layer)
+                else:
+                    layer_pack = pack if layer is None else pack.overlay(layer)
+                self.share_pack(key, layer_pack)
+            pack = layer_pack
+
+        if (pack is None):
+            raise FileNotFoundError(f"No language file {package}.json in {self.data_dir}")
+        return pack
+
+    def share_pack(self, key, pack:LanguageNode):
+        """Add a loaded pack to the packs shared by every environment, freezing each of its nodes"""
+        self.freeze(pack)
+        self.packs[key] = pack
+
+    def freeze(self, pack:LanguageNode):
+        """Mark each node of a shared tree, so environments copy it before changing it"""
+        node_queue = deque([pack])
+        while (len(node_queue) > 0):
+            node = node_queue.popleft()
+            if (id(node) in self.frozen_ids):
+                continue  # Shared already, with everything under it - e.g. the nodes a layer doesn't change
+            self.frozen_ids.add(id(node))
+            if (node.props is not None):
+                self.frozen_ids.add(id(node.props))
+                node_queue.extend(prop for prop in node.props.values() if type(prop) is LanguageNode)
+
+    def drop_pack_indexes(self, tree:LanguageNode):
+        """Forget the shared indexes of a tree that is no longer shared (e.g. an old summary) - they would keep it alive.
+        Its ids stay frozen, as environments may still be using it."""
+        node_queue = deque([tree])
+        while (len(node_queue) > 0):
+            node = node_queue.popleft()
+            if (node.props is not None):
+                for kind in self.index_builders:
+                    cached = self.pack_indexes.get((kind, id(node.props)))
+                    if (cached is not None and cached[0] is node.props):
+                        del self.pack_indexes[(kind, id(node.props))]
+                node_queue.extend(prop for prop in node.props.values() if type(prop) is LanguageNode)
+
+    """Snapshots"""
+    def save_snapshot(self, path:str):
+        """Save the language files, imported packages and their indexes to path, so environments can start from it
+        (LanguageEnv(data_dir, snapshot=path)) without parsing JSON or building indexes"""
+        packages = list(self.scope_stack[0].props[".PKG"].props.keys())
+        packs = {package: self.load_pack(package) for package in packages} # Shared originals, not this environment's changes
+
+        # Build every index now
+        indexes = []
+        node_queue = deque(packs.values())
+        while (len(node_queue) > 0):
+            node = node_queue.popleft()
+            if (node.props is not None):
+                for kind in self.index_builders:
+                    indexes.append((kind, node.props, self.props_index(node.props, kind)))
+                node_queue.extend(prop for prop in node.props.values() if type(prop) is LanguageNode)
+
+        snapshot = {"version": self.SNAPSHOT_VERSION, "sources": self.source_stats([".kw", ".pkgs", ".literals"] + packages),
+                    "kw": self.kw, "pkgs": self.pkgs, "literals": self.literals, "packs": packs, "indexes": indexes}
+        with open(path, "wb") as writer:
+            pickle.dump(snapshot, writer, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def source_stats(self, filenames:list):
+        """Get file_stat of each layer's language file of filenames, by (folder, filename)"""
+        return {(os.path.abspath(data_dir), filename): self.file_stat(os.path.join(data_dir, filename + ".json"))
+                for data_dir in self.layers for filename in filenames}
+
+    @staticmethod
+    def file_stat(path:str):
+        """Get (modification time, size) of a file, or None if there is none"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load_snapshot(self, path:str):
+        """Load the language files and packages saved by save_snapshot, sharing the packs (if not loaded already) and importing them.
+        Returns False, loading nothing, if a language file has changed (or appeared) since it was saved - the snapshot is stale."""
+        with open(path, "rb") as reader:
+            snapshot = pickle.load(reader)
+        if (snapshot.get("version") != self.SNAPSHOT_VERSION):
+            raise ValueError(f"Snapshot {path} is version {snapshot.get('version')}, not {self.SNAPSHOT_VERSION} - save it again")
+        sources = snapshot["sources"]
+        if (sources != self.source_stats(list(dict.fromkeys(filename for data_dir, filename in sources)))):
+            logger.warning("Snapshot %s doesn't match the language files - loading them instead", path)
+            return False
+
+        self.kw = snapshot["kw"]
+        self.pkgs = snapshot["pkgs"]
+        self.literals = snapshot["literals"]
+
+        for package, pack in snapshot["packs"].items():
+            key = (os.path.abspath(self.data_dir), package)
+            if (key not in self.packs): # Otherwise already shared - snapshot copy unused
+                self.share_pack(key, pack)
+        for kind, props, index in snapshot["indexes"]:
+            if (id(props) in self.frozen_ids and (kind, id(props)) not in self.pack_indexes):
+                self.pack_indexes[(kind, id(props))] = (props, index, len(props))
+
+        for package in snapshot["packs"]:
+            self.import_pkg_raw(package)
+        return True
+
+    def writable(self, properties:dict, key:str):
+        """Get the node properties[key] to change, first replacing it with a copy if it belongs to a shared pack.
+        properties must be writable itself, so changes stay in this environment's scopes."""
+        node = properties[key]
+        if (id(node) in self.frozen_ids):
+            node = node.copy()
+            properties[key] = node
+        return node
+
     """Getting properties"""
 
     def raw_path_to_data(self, path:tuple):
@@ -124,7 +376,7 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
             # Parent = reference to object
             if (parent != None):
                 # Append the property data associated w/ it
-                props = parent[1] if len(parent) >= 2 and (not parent[1] is None) else []
+                props = parent.props if parent.props is not None else {}
 
                 # Get property
                 if(raw):
@@ -132,22 +384,55 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
                         # Found raw property - by key
                         results.append((tuple(p_path) + (property,), props[property]))
                 else:
-                    for key in props:
-                        if (props[key][0] == property):
-                            # Found property
-                            results.append((tuple(p_path) + (key,), props[key]))
-                            break
+                    key = self.reverse_index(props).get(property)
+                    if (key is not None):
+                        # Found property
+                        results.append((tuple(p_path) + (key,), props[key]))
 
                 # Add base classes to queue
-                if(len(parent) >= 4):
-                    for base_class in parent[3]:
-                        parent_queue.append((p_path, self.raw_path_to_data(base_class))) # From base class, but compiled w/ parent path
+                for base_class in parent.bases:
+                    parent_queue.append((p_path, self.raw_path_to_data(base_class))) # From base class, but compiled w/ parent path
 
             else:
                 # Not in parent
                 continue
         return results
 
+    def reverse_index(self, props:dict):
+        """Get the index of translated name > raw name for a properties dict"""
+        return self.props_index(props, "reverse")
+
+    def props_index(self, props:dict, kind:str):
+        """Get an index of a properties dict (kind from index_builders), (re)building it when the dict has changed"""
+        indexes = self.pack_indexes if id(props) in self.frozen_ids else self.indexes # Shared packs' indexes are kept for every environment
+        cached = indexes.get((kind, id(props)))
+        if (cached is None or cached[0] is not props or cached[2] != len(props)):
+            cached = (props, self.index_builders[kind](props), len(props)) # Keep props so its id can't be reused
+            indexes[(kind, id(props))] = cached
+        return cached[1]
+
+    @staticmethod
+    def build_reverse_index(props:dict):
+        """Translated name > raw name"""
+        index = {}
+        for key in props:
+            if (type(props[key]) is LanguageNode): # Not special properties like .messages
+                index.setdefault(props[key].translated, key) # First one found, like a linear search
+        return index
+
+    @staticmethod
+    def build_completion_index(props:dict):
+        """Sorted (name, raw name) of the properties that can be written - the translated name, or the raw one if untranslated"""
+        index = []
+        for key in props:
+            if (type(props[key]) is LanguageNode and key[0] != "."): # Not special or hidden properties
+                translated = props[key].translated
+                index.append((key if translated == "<name>" else translated, key))
+        index.sort()
+        return index
+
+    index_builders = {"reverse": build_reverse_index, "completion": build_completion_index}
+
     def get_properties_raw(self, property:str, parents:list=None, max_num:int=float("inf")):  # Automatically scope for parents = root
         """Get possible values of a property from a raw (compiled) name and list of possible parents"""
 
@@ -167,7 +452,7 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
             if (parent != None):
 
                 # Append the property data associated w/ it
-                props = parent[1] if len(parent) >= 2 and (not parent[1] is None) else []
+                props = parent.props if parent.props is not None else {}
 
                 # Get property
                 if (property in props):
@@ -179,9 +464,8 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
                     break
 
                 # Add base classes to queue
-                if(len(parent) >= 4):
-                    for base_class in parent[3]:
-                        parent_queue.append((p_path, self.raw_path_to_data(base_class))) # From base class, but compiled w/ parent path
+                for base_class in parent.bases:
+                    parent_queue.append((p_path, self.raw_path_to_data(base_class))) # From base class, but compiled w/ parent path
 
             else:
                 # Not in parent
@@ -189,83 +473,61 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
         return results
 
     """Variables and Scoping"""
-    # Specific scopes identified via names
-    scope_stack = [["", {}, None, []]]  # Global scope contains builtins and imported packages
-
     def scope_push(self, msg):
         """Add one more to stack"""
-        self.scope_stack.append((msg, {}, None, []))
+        self.scope_stack.append(LanguageNode(msg, {}))
         # print("Scope push: ", msg, ">", self.scope_stack)
     def scope_pop(self):
         """Remove one from stack"""
-        if(len(self.scope_stack) == 2):
-            # Closed module
-            with open(f"compilation_dump.json", "w", encoding="utf8") as writer:
-                print("Dumping Data")
-                json.dump({"module": self.scope_stack[1], "packages": list(self.scope_stack[0][1][".PKG"][1].keys())}, writer, indent=2)
         self.scope_stack.pop()
 
     def assign(self, iden_path, src, translated=None, simplify=True, override=True, params=None, scope=-1): # Local by default
         """Assign the value src to the destination iden_path, in the local scope"""
         # print(f"[Assign] {iden_path} = {src}")
         if(simplify):
-            # Keep simplifying by adding all terminal type nodes to one level
-            new_src = []
-            src_queue = deque(src)
-
-            while(len(src_queue) > 0):
-                source = src_queue.popleft()
-                if(source != None):
-                    source_data = source[1]
-                    if(source_data != None):
-                        if(len(source_data) >= 4) and (source_data[1] is None or len(source_data[1]) == 0) and (len(source_data) < 3 or source_data[2] is None):
-                            # Can simplify - Simplify source_data
-                            for base in source_data[3]:
-                                src_queue.append([base, self.raw_path_to_data(base)])
-                        else:
-                            # Terminal - add to new_src
-                            new_src.append(source)
-
-            # print("\tSrc: ", src)
-            src = new_src
-            # print("\tNew Src: ", src)
+            src = self.simplify(src)
 
         # print("[Assign]", iden_path, "=", src)
         if (len(src) == 0 or iden_path != src[0][0]):
             # Assign a variable name (so type can be remembered)
 
             dest = self.scope_stack[scope]
+            properties = None
 
             # Handle package importing
             if len(iden_path) >= 1 and iden_path[0] == ".PKG":
                 self.import_pkg_raw(iden_path[1])
 
             for node in iden_path:
-                properties = dest[1]
+                if (dest.props is None):
+                    dest.props = {}
+                properties = dest.props
                 if (not node in properties):
-                    properties[node] = [node, {}, None, []] # Translated name; properties; parameters; base classes
-                dest = properties[node]
+                    properties[node] = LanguageNode(node, {}) # Translated name; properties; parameters; base classes
+                dest = self.writable(properties, node)
                 # print("\t", node, dest)
 
             if(override):
                 # New type
-                for type in dest[3]:
+                for type in dest.bases:
                     del type
 
             for src_type in src:
-                src_path = src_type[0]
-                src_path = list(src_path)
+                src_path = tuple(src_type[0])
 
-                if(not src_path in dest[3]):
+                if(not src_path in dest.bases):
                     # Add to types if not in already
-                    dest[3].append(src_path)
+                    dest.bases.append(src_path)
 
             if(translated != None):
-                dest[0] = translated # Add translated name
+                dest.translated = translated # Add translated name
+                if(properties is not None):
+                    for kind in self.index_builders:
+                        self.indexes.pop((kind, id(properties)), None) # Renamed
 
             if(params != None):
                 # Add parameters
-                dest[2] = params
+                dest.params = params
 
             # print(iden_path, dest)
 
@@ -273,7 +535,27 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
 
         # print(dest)
 
-    hiddentype_IDs = {}
+    def simplify(self, src):
+        """Get the terminal types of src (list of (path, data)), replacing types which only inherit from others by their bases"""
+        # Keep simplifying by adding all terminal type nodes to one level
+        new_src = []
+        src_queue = deque(src)
+
+        while(len(src_queue) > 0):
+            source = src_queue.popleft()
+            if(source != None):
+                source_data = source[1]
+                if(source_data != None):
+                    if (source_data.props is None or len(source_data.props) == 0) and (source_data.params is None):
+                        # Can simplify - Simplify source_data
+                        for base in source_data.bases:
+                            src_queue.append((base, self.raw_path_to_data(base)))
+                    else:
+                        # Terminal - add to new_src
+                        new_src.append(source)
+
+        return new_src
+
     def hiddentype_request_ID(self, prefix):
         """Get the next available ID number for the hidden global - used when wanting invisible types to inherit from"""
         if(not prefix in self.hiddentype_IDs):
@@ -283,34 +565,34 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
             id = self.hiddentype_IDs[prefix]
             self.hiddentype_IDs[prefix] += 1
 
-        return ["." + prefix, str(id)] # e.g. [".list", "0"]
+        return ("." + prefix, self.hiddentype_namespace + str(id)) # e.g. (".list", "0")
 
     def hiddentype_save(self, id, data, scope=0): # Global by default
         # Find node
-        dest = self.scope_stack[scope][1] # Save in module scope by default - inner
+        dest = self.scope_stack[scope].props # Save in module scope by default - inner
         for node in id[:-1]: # Excluding last
             if (not node in dest):
-                dest[node] = [node, {}, None, []]  # Create new
-            dest = dest[node]
+                dest[node] = LanguageNode(node, {})  # Create new
+            dest = self.writable(dest, node)
             # Each node in path
-            if(len(dest) < 2):
-                dest.append({})
-            dest = dest[1]
+            if(dest.props is None):
+                dest.props = {}
+            dest = dest.props
 
         # Save data
         dest[id[-1]] = data
 
     def hiddentype_exists(self, id, scope=0): # Global level by default
         # Find node
-        dest = self.scope_stack[scope][1] # Save in module scope by default - inner
+        dest = self.scope_stack[scope].props # Save in module scope by default - inner
         for node in id:
             if (not node in dest):
                 return False # Cannot exist
             dest = dest[node]
             # Each node in path
-            if(len(dest) < 2):
+            if(dest.props is None):
                 return False # Nothing inside
-            dest = dest[1]
+            dest = dest.props
 
         return True
 
@@ -327,33 +609,182 @@ Inherits from: {", ".join(inherits_from) if len(inherits_from) > 0 else None}
             if(alias == None):
                 auto_alias = True # Translate alias name
                 alias = (package,)
+        elif(self.find_summary(translated_package) is not None):
+            # Translated module - compiled with the same name
+            package = translated_package
+            if(alias == None):
+                alias = (package,)
         else:
-            print(self.pkgs)
+            logger.debug("Packages: %s", self.pkgs)
             raise Exception(f"Package {translated_package} could not be found.")
 
         package_location = self.import_pkg_raw(package)
 
         # Assign whole path to alias
         imported_location = package_location + library[1:]
-        self.assign(alias, [[imported_location, []]], translated_package if auto_alias else None, simplify=False, scope=-1)  # 1 possible path; no data needed; keep translated name if no alias
+        self.assign(alias, [(imported_location, None)], translated_package if auto_alias else None, simplify=False, scope=-1)  # 1 possible path; no data needed; keep translated name if no alias
 
         return (package,) + library[1:]
 
     def import_pkg_raw(self, package):
-        """Import a package as a hiddentype by its English name, returning its hiddentype path"""
+        """Import a package as a hiddentype by its English name (or a translated module by its interface summary), returning its hiddentype path"""
         package_location = (".PKG", package)
         if(not self.hiddentype_exists(package_location)): # Don't save twice
-            print("Importing package " + package)
+            logger.info("Importing package %s", package)
+            summary = self.find_summary(package) if package not in self.pkgs.values() else None
             # Add package (hidden with .) to global scope
-            self.hiddentype_save(package_location, self.load_lib(package))
+            self.hiddentype_save(package_location, self.load_pack(package) if summary is None else self.load_summary(summary)[1])
 
         return package_location
 
+    """Module interfaces"""
+    def module_summary(self, module:str, scope:LanguageNode):
+        """Get the interface summary of a compiled translated module from its module scope, to import it without compiling it again
+        (like a .pyi) - {"version", "module", "hash", "interface"}. The interface is the module's names (translated name, parameters,
+        inferred types) as a node in the packs' JSON format, and hash is a hash of it, so importers can tell when it changes.
+        Hidden types the names use (e.g. list items) are moved inside it, and paths to them or to the module's names become
+        paths through (".PKG", module), so they are found from whichever module imports it."""
+        interface = LanguageNode(module, {})
+        moved = {} # Path in the module > path in its interface
+        hidden_queue = deque()
+
+        def relocate(path):
+            if (path[0] == ".PKG"):
+                return path # Packages are found from anywhere
+            if (path[0].startswith(".")):
+                if (path not in moved):
+                    moved[path] = (".PKG", module) + path
+                    hidden_queue.append(path)
+                return moved[path]
+            if (scope.props is not None and path[0] in scope.props):
+                return (".PKG", module) + path # Another of the module's names
+            return path
+
+        def export(node):
+            props = None
+            if (node.props is not None):
+                props = {key: (export(prop) if type(prop) is LanguageNode else prop) for key, prop in node.props.items()}
+            return LanguageNode(node.translated, props, node.params, [relocate(tuple(base)) for base in node.bases])
+
+        for key, node in (scope.props or {}).items():
+            if (type(node) is LanguageNode and key[0] != "."): # Not hidden locals
+                interface.props[key] = export(node)
+
+        while (len(hidden_queue) > 0):
+            path = hidden_queue.popleft()
+            data = self.raw_path_to_data_scoped(path, scope) or self.raw_path_to_data_scoped(path, self.scope_stack[0])
+            if (data is None):
+                continue
+            dest = interface
+            for name in path[:-1]:
+                dest = dest.props.setdefault(name, LanguageNode(name, {}))
+            dest.props[path[-1]] = export(data)
+
+        interface_json = json.loads(json.dumps(interface, default=LanguageNode.to_json))
+        interface_hash = hashlib.sha1(json.dumps(interface_json, sort_keys=True, ensure_ascii=False).encode("utf8")).hexdigest()
+        return {"version": self.SUMMARY_VERSION, "module": module, "hash": interface_hash, "interface": interface_json}
+
+    def find_summary(self, module:str):
+        """Get the path of a translated module's interface summary in module_dirs, or None if it has none"""
+        for module_dir in self.module_dirs:
+            path = os.path.join(module_dir, module + self.SUMMARY_SUFFIX)
+            if (os.path.isfile(path)):
+                return path
+        return None
+
+    def load_summary(self, path:str):
+        """Get (interface hash, shared interface node) of a summary file, loading it again only if the file changed"""
+        key = os.path.abspath(path)
+        stat = self.file_stat(path)
+        cached = self.summaries.get(key)
+        if (cached is None or cached[0] != stat):
+            if (cached is not None):
+                self.drop_pack_indexes(cached[2])  # So the old version can be freed once no environment uses it
+            with open(path, encoding='utf8') as reader:
+                summary = json.load(reader)
+            if (summary.get("version") != self.SUMMARY_VERSION):
+                raise ValueError(f"Summary {path} is version {summary.get('version')}, not {self.SUMMARY_VERSION} - compile its module again")
+            cached = (stat, summary["hash"], LanguageNode.from_json(summary["interface"]))
+            self.freeze(cached[2])
+            self.summaries[key] = cached
+        return cached[1:]
+
+    """Completion"""
+    def complete(self, text:str, max_num:int=float("inf")):
+        """Get the completions of the expression ending text (e.g. "tortuga.Tortuga().av") as (name, params, docs), sorted by name.
+        Calls are followed like the parser does (to what was called), and packages can be completed without importing them."""
+        # Read the expression being written backwards, dropping call arguments (calls > what was called)
+        expression = []
+        depth = 0
+        for char in reversed(text):
+            if (char == ")"):
+                depth += 1
+            elif (char == "(" and depth > 0):
+                depth -= 1
+            elif (depth == 0):
+                if (not (char.isalnum() or char in "_.")):
+                    break # Start of expression
+                expression.append(char)
+        chain = "".join(reversed(expression)).split(".")
+
+        # Parents of the property being completed
+        parents = None
+        for name in chain[:-1]:
+            paths = self.get_properties(name, parents)
+            if (len(paths) == 0 and parents is None and name in self.pkgs):
+                # Unimported package
+                paths = [((self.pkgs[name],), self.load_pack(self.pkgs[name]))]
+            if (len(paths) == 0):
+                return [] # Unknown - can't complete
+            parents = paths
+
+        completions = self.completions(chain[-1], parents)
+        if (parents is None):
+            # Packages
+            for translated_pkg in self.pkgs:
+                if (translated_pkg.startswith(chain[-1]) and translated_pkg not in completions):
+                    completions[translated_pkg] = ((self.pkgs[translated_pkg],), self.load_pack(self.pkgs[translated_pkg]))
+
+        results = []
+        for name in sorted(completions):
+            if (len(results) >= max_num):
+                break
+            path, data = completions[name]
+            results.append((name, data.params, self.print_data(path, data)))
+        return results
+
+    def completions(self, prefix:str, parents:list=None):
+        """Get name > (path, data) of the properties starting with prefix from a list of possible parents (automatically scope for None),
+        including inherited ones - the first found for each name, like get_properties"""
+        if(parents == None):
+            parents = [("", parent) for parent in self.scope_stack[::-1]]  # All scopes, up tree
+
+        results = {}
+        parent_queue = deque(parents)
+        while(len(parent_queue) > 0):
+            p_path, parent = parent_queue.popleft()
+            if (parent is None):
+                continue
+
+            if (parent.props is not None):
+                index = self.props_index(parent.props, "completion")
+                for i in range(bisect.bisect_left(index, (prefix,)), len(index)):
+                    name, key = index[i]
+                    if (not name.startswith(prefix)):
+                        break # Past names with prefix
+                    if (name not in results):
+                        results[name] = (tuple(p_path) + (key,), parent.props[key])
+
+            # Add base classes to queue
+            for base_class in parent.bases:
+                parent_queue.append((p_path, self.raw_path_to_data(base_class)))
+        return results
+
     """Debugging and errors"""
     def translate_err(self, err, err_path, err_data):
         """Translate the error to this language"""
         msg = str(err) # English error
-        messages = self.get_properties(".messages", [[err_path, err_data]], raw=True) # data - regular expressions
+        messages = self.get_properties(".messages", [(err_path, err_data)], raw=True) # data - regular expressions
 
         for message_list in messages:
             # Different inherited message lists
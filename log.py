@@ -0,0 +1,64 @@
+"""Diagnostics for the compiler and debugger - one logger with a single verbosity setting.
+Messages use logging's lazy %-formatting, so disabled levels cost only the level check."""
+import logging
+import sys
+
+logger = logging.getLogger("globalpython")
+
+# Verbosity > level shown
+VERBOSITY_LEVELS = {
+    0: logging.ERROR,  # Errors only
+    1: logging.WARNING,  # + Warnings (e.g. undefined properties) - default
+    2: logging.INFO,  # + Progress (e.g. importing packages)
+    3: logging.DEBUG,  # + Compiler internals (e.g. every token)
+}
+
+
+def set_verbosity(verbosity: int):
+    """Show diagnostics up to verbosity (see VERBOSITY_LEVELS)"""
+    logger.setLevel(VERBOSITY_LEVELS[max(0, min(verbosity, 3))])
+
+
+def set_verbosity_options(options: list):
+    """Set the verbosity from command line options - each v of -v (or -vv...) shows one level more than the default, -q one less"""
+    verbosity = 1
+    for option in options:
+        if (len(option) > 1 and option.strip("v") == "-"):
+            verbosity += len(option) - 1
+        elif (option == "-q"):
+            verbosity -= 1
+    set_verbosity(verbosity)
+
+
+def verbosity_options():
+    """Get the command line options for the current verbosity, e.g. to pass it to a child process"""
+    verbosity = {level: verbosity for verbosity, level in VERBOSITY_LEVELS.items()}[logger.level]
+    return ["-q"] if verbosity == 0 else (["-" + "v" * (verbosity - 1)] if verbosity > 1 else [])
+
+
+class PlyLog:
+    """PLY's errorlog interface - its table-building warnings only matter when working on the grammar, so are debug level"""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def debug(self, msg, *args, **kwargs):
+        self.logger.debug(msg, *args)
+
+    info = warning = debug
+
+    def error(self, msg, *args, **kwargs):
+        self.logger.error(msg, *args)
+
+    critical = error
+
+
+ply_log = PlyLog(logger.getChild("ply"))
+
+
+# Plain messages to stderr, like the prints they replace
+_handler = logging.StreamHandler(sys.stderr)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+logger.addHandler(_handler)
+logger.propagate = False
+set_verbosity(1)
@@ -0,0 +1,117 @@
+"""Interactive sessions - translated statements entered one at a time, keeping their variables (and what the compiler knows of them)"""
+import ast
+import builtins
+import io
+import linecache
+import sys
+import tokenize
+import traceback
+
+import debug
+from compilers.incremental import CodeblockParser
+from compilers.python import PythonLexer
+from languages.language import LanguageEnv
+from log import set_verbosity_options
+
+
+class Repl:
+    """A translated interactive session. One lexer, parser and LanguageEnv last the whole session, so each entry is parsed in a
+    few milliseconds against the module scope left by the entries before it, then runs in one namespace with errors translated.
+    Entries compile straight to code objects (emit_ast) with their own positions, so there are no mappings to keep."""
+
+    prompts = (">>> ", "... ")
+
+    def __init__(self, lang_dir: str):
+        self.lang_dir = lang_dir
+        self.lang = LanguageEnv(lang_dir)
+        self.lang.scope_push("Pushed")  # Module scope, like the module rule
+        self.lexer = PythonLexer(self.lang)
+        self.lexer.build()
+        self.parser = CodeblockParser(self.lang, self.lexer)
+        self.parser.emit_ast = True
+
+        self.namespace = {"__name__": "__main__", "__builtins__": builtins}
+        self.num_entries = 0
+
+    def compile(self, text: str):
+        """Compile an entry to a code object which writes the values of its expressions, like Python's interactive mode - None if empty.
+        Raises SyntaxError if it doesn't parse, leaving the session as it was."""
+        self.num_entries += 1
+        filename = f"<entrada {self.num_entries}>"
+        linecache.cache[filename] = (len(text), None, text.splitlines(True), filename)  # For tracebacks
+
+        self.lexer.lexer.lexer.lineno = 1
+        try:
+            struct = self.parser.parse(text)
+        except BaseException:
+            self.reset()
+            raise
+        if (struct is None or len(struct.node) == 0):
+            return None
+        return builtins.compile(ast.fix_missing_locations(ast.Interactive(body=struct.node)), filename, "single")
+
+    def reset(self):
+        """Clear what a failed parse left in the lexer and scopes"""
+        del self.lang.scope_stack[2:]
+        self.lexer.reset()
+
+    def run(self, text: str):
+        """Compile and run an entry in the session's namespace, writing any error (translated) to stderr"""
+        try:
+            code = self.compile(text)
+        except SyntaxError as err:
+            for error in getattr(err, "errors", [err]):  # Every one in the entry
+                error.filename = f"<entrada {self.num_entries}>"
+                sys.stderr.write("".join(traceback.format_exception_only(SyntaxError, error)))
+            return
+        if (code is not None):
+            debug.Debugger(None, code.co_filename, None, self.lang_dir, code=code, namespace=self.namespace)
+
+    brackets = {"(": ")", "[": "]", "{": "}"}
+
+    @classmethod
+    def needs_more(cls, text: str):
+        """Whether an entry continues on the next line - it has an open bracket or string, or starts a block which hasn't ended with a blank line"""
+        tokens = []
+        brackets = []  # Open ones
+        try:
+            for token in tokenize.generate_tokens(io.StringIO(text + "\n").readline):
+                if (token.type == tokenize.OP and token.string in cls.brackets):
+                    brackets.append(cls.brackets[token.string])
+                elif (token.type == tokenize.OP and token.string in cls.brackets.values()):
+                    if (len(brackets) == 0 or brackets.pop() != token.string):
+                        return False  # Unmatched - let the parser report it
+                tokens.append(token)
+        except tokenize.TokenError as err:
+            # Open bracket, multi-line string or line continuation - anything else is an error for the parser
+            return len(brackets) > 0 or err.args[0] == "EOF in multi-line string" or text.endswith("\\")
+        except SyntaxError:
+            return False  # Let the parser report it
+
+        # Block - the first logical line ends with ":"
+        significant = [token for token in tokens if token.type not in (tokenize.COMMENT, tokenize.NL)]
+        for token, next_token in zip(significant, significant[1:]):
+            if (next_token.type == tokenize.NEWLINE):
+                return token.string == ":" and text.split("\n")[-1].strip() != ""
+        return False
+
+    def interact(self, read=input):
+        """Read entries with read(prompt) and run them until the end of input"""
+        while True:
+            try:
+                text = read(self.prompts[0])
+                while (self.needs_more(text)):
+                    text += "\n" + read(self.prompts[1])
+            except KeyboardInterrupt:
+                sys.stderr.write("\nKeyboardInterrupt\n")
+                continue
+            except EOFError:
+                sys.stdout.write("\n")
+                return
+            self.run(text + "\n")
+
+
+if __name__ == "__main__":
+    # repl.py language_path [-v|-q] - e.g. repl.py languages/es
+    set_verbosity_options(sys.argv[2:])
+    Repl(sys.argv[1]).interact()
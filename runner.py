@@ -0,0 +1,238 @@
+"""Run compiled programs in warm processes - a pool of zygote processes which import the language's runtime packages and the
+debugger once, then fork a fresh child for each program, so runs don't pay interpreter startup or imports"""
+import collections
+import importlib
+import json
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import headless_turtle
+import virtual_clock
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# drawing - headless_turtle.Drawing of a headless run, if it drew; image - its PNG, if rendering;
+# virtual_time - simulated seconds the program took, if run on a virtual clock
+RunResult = collections.namedtuple("RunResult", ["returncode", "stdout", "stderr", "timed_out", "drawing", "image", "virtual_time"],
+                                   defaults=(None, None, None))
+
+
+class RunnerError(Exception):
+    """A zygote process stopped answering"""
+
+
+class WarmRunner:
+    """One zygote process, running a program at a time in a forked child.
+    If headless, programs get headless_turtle as turtle, so drawing programs run without a display (and rendered if render).
+    If virtual_time, programs run on a virtual_clock.VirtualClock, so sleeping takes no time.
+    If snapshot is a path from LanguageEnv.save_snapshot, the zygote warms up from it instead of the language files."""
+
+    def __init__(self, lang_dir: str, headless: bool = False, render: bool = False, virtual_time: bool = False, snapshot: str = None):
+        self.lang_dir = os.path.abspath(lang_dir)
+        self.snapshot = None if snapshot is None else os.path.abspath(snapshot)
+        self.headless = headless
+        self.render = render
+        self.virtual_time = virtual_time
+        self.process = None
+        self.buffer = b""  # Unfinished reply
+        self.start()
+
+    def start(self):
+        """Start the zygote, waiting until it has warmed up"""
+        options = (["headless"] if self.headless else []) + (["--snapshot", self.snapshot] if self.snapshot is not None else [])
+        self.process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "runner.py"), self.lang_dir] + options,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self.buffer = b""
+        self.read_reply(None)  # Ready
+
+    def run(self, src: str, compiled: str, debug_data: dict, stdin: str = "", timeout: float = None, cancel_event=None):
+        """Run a compiled program with the debugger (so errors are translated), returning its RunResult.
+        The program is killed after timeout seconds, or once cancel_event (a threading.Event) is set."""
+        if (self.process.poll() is not None):
+            self.start()  # Zygote died - replace it
+
+        work_dir = tempfile.mkdtemp(prefix="globalpython-run-")
+        try:
+            for name, text in (("source.py", src), ("out.py", compiled), ("debug.json", json.dumps(debug_data)), ("stdin.txt", stdin)):
+                with open(os.path.join(work_dir, name), "w", encoding="utf8") as writer:
+                    writer.write(text)
+
+            self.process.stdin.write((json.dumps({"dir": work_dir, "render": self.render, "virtual_time": self.virtual_time}) + "\n").encode("utf8"))
+            pid = self.read_reply(None)["pid"]
+
+            deadline = None if timeout is None else time.monotonic() + timeout
+            timed_out = False
+            reply = None
+            while (reply is None):
+                # Check for cancelling between short waits
+                wait = 0.05 if deadline is None else max(0, min(0.05, deadline - time.monotonic()))
+                reply = self.read_reply(wait)
+                if (reply is None and ((deadline is not None and time.monotonic() >= deadline) or (cancel_event is not None and cancel_event.is_set()))):
+                    timed_out = (deadline is not None and time.monotonic() >= deadline)
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass  # Just finished
+                    reply = self.read_reply(None)
+
+            outputs = []
+            for name in ("stdout.txt", "stderr.txt"):
+                with open(os.path.join(work_dir, name), "r", encoding="utf8", errors="replace") as reader:
+                    outputs.append(reader.read())
+            drawing = image = virtual_time = None
+            if (os.path.exists(os.path.join(work_dir, "drawing.bin"))):
+                drawing = headless_turtle.Drawing.load(os.path.join(work_dir, "drawing.bin"))
+            if (os.path.exists(os.path.join(work_dir, "drawing.png"))):
+                with open(os.path.join(work_dir, "drawing.png"), "rb") as reader:
+                    image = reader.read()
+            if (os.path.exists(os.path.join(work_dir, "clock.txt"))):
+                with open(os.path.join(work_dir, "clock.txt"), "r", encoding="utf8") as reader:
+                    virtual_time = float(reader.read())
+            return RunResult(reply["returncode"], outputs[0], outputs[1], timed_out, drawing, image, virtual_time)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def read_reply(self, timeout: float = None):
+        """Read the zygote's next reply line, or None if there is none within timeout seconds (None waits forever)"""
+        while (b"\n" not in self.buffer):
+            if (timeout is not None and len(select.select([self.process.stdout], [], [], timeout)[0]) == 0):
+                return None
+            data = os.read(self.process.stdout.fileno(), 4096)
+            if (len(data) == 0):
+                raise RunnerError(f"Runner process exited ({self.process.wait()})")
+            self.buffer += data
+
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def close(self):
+        if (self.process.poll() is None):
+            self.process.stdin.close()  # Zygote exits at end of input
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class RunnerPool:
+    """Warm runners shared between threads - run() waits for a free one"""
+
+    def __init__(self, lang_dir: str, size: int = 2, timeout: float = 10.0, headless: bool = False, render: bool = False,
+                 virtual_time: bool = False, snapshot: str = None):
+        self.timeout = timeout  # Default seconds per run (real time)
+        self.runners = [WarmRunner(lang_dir, headless, render, virtual_time, snapshot) for i in range(size)]
+        self.idle = queue.Queue()
+        for runner in self.runners:
+            self.idle.put(runner)
+
+    def run(self, src: str, compiled: str, debug_data: dict, stdin: str = "", timeout: float = None, cancel_event=None):
+        """Run a compiled program on the next free runner - see WarmRunner.run. timeout defaults to the pool's."""
+        runner = self.idle.get()
+        try:
+            return runner.run(src, compiled, debug_data, stdin, self.timeout if timeout is None else timeout, cancel_event)
+        finally:
+            self.idle.put(runner)
+
+    def close(self):
+        for runner in self.runners:
+            runner.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Zygote process
+def warm_up(lang_dir: str, snapshot: str = None):
+    """Import the debugger and the language's runtime packages, and load their language data - from a snapshot
+    (see LanguageEnv.save_snapshot) if given, so the packs aren't parsed or indexed. The children share the loaded packs."""
+    import debug  # Imported for the children
+    from languages.language import LanguageEnv
+
+    lang = LanguageEnv(lang_dir, snapshot=snapshot)
+    for package in lang.pkgs.values():
+        try:
+            importlib.import_module(package)
+        except ImportError:
+            pass  # Not available here - the program will import it (and fail) itself
+        lang.load_pack(package)
+
+
+def run_child(work_dir: str, lang_dir: str, replies, render: bool, virtual_time: bool):
+    """Run the program in work_dir in this forked child, with its input and output files as the standard streams, then exit.
+    If turtle is headless, the drawing is saved after (and rendered once if render). If virtual_time, its simulated time is saved."""
+    import debug
+
+    returncode = 0
+    try:
+        replies.close()
+        os.chdir(work_dir)
+        for fd, name, flags in ((0, "stdin.txt", os.O_RDONLY), (1, "stdout.txt", os.O_WRONLY | os.O_CREAT), (2, "stderr.txt", os.O_WRONLY | os.O_CREAT)):
+            file_fd = os.open(name, flags, 0o600)
+            os.dup2(file_fd, fd)
+            os.close(file_fd)
+        # New stream objects - the zygote's have its commands buffered
+        sys.stdin = open(0, "r", encoding="utf8", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf8", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf8", closefd=False)
+
+        clock = virtual_clock.VirtualClock() if virtual_time else None
+        debug.Debugger("out.py", "source.py", "debug.json", lang_dir, clock=clock)
+        if (clock is not None):
+            with open("clock.txt", "w", encoding="utf8") as writer:
+                writer.write(repr(clock.elapsed))
+
+        turtle = sys.modules.get("turtle")
+        if (turtle is headless_turtle and turtle._screen is not None and len(turtle.drawing().log) > 0):
+            turtle.drawing().save("drawing.bin")
+            if (render):
+                with open("drawing.png", "wb") as writer:
+                    writer.write(turtle.drawing().render())
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(returncode)
+
+
+def serve(lang_dir: str, headless: bool, snapshot: str = None):
+    """Zygote loop - for each command line ({"dir": work_dir, "render": bool, "virtual_time": bool}) fork a child to run it, replying with its pid then return code"""
+    replies = os.fdopen(os.dup(1), "w", encoding="utf8")  # Program output never goes in the replies
+    os.dup2(2, 1)
+    if (headless):
+        headless_turtle.install()
+    warm_up(lang_dir, snapshot)
+
+    def reply(message: dict):
+        replies.write(json.dumps(message) + "\n")
+        replies.flush()
+
+    reply({"ready": True})
+    for line in sys.stdin:
+        job = json.loads(line)
+        pid = os.fork()
+        if (pid == 0):
+            run_child(job["dir"], lang_dir, replies, job["render"], job["virtual_time"])
+        reply({"pid": pid})
+        status = os.waitpid(pid, 0)[1]
+        reply({"returncode": os.waitstatus_to_exitcode(status)})
+
+
+if __name__ == "__main__":
+    # runner.py language_path [headless] [--snapshot path] - started by WarmRunner
+    options = sys.argv[2:]
+    serve(sys.argv[1], "headless" in options, options[options.index("--snapshot") + 1] if "--snapshot" in options else None)
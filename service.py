@@ -0,0 +1,134 @@
+"""Asynchronous compiling and running - for asyncio servers (e.g. an IDE backend) editing many documents at once"""
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import compile
+import languages.language
+from runner import RunResult
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ServiceBusy(Exception):
+    """Too many requests are already waiting for a worker"""
+
+
+class CompileService:
+    """Compile and run translated source on an executor, with at most max_workers jobs at once and max_waiting more queued.
+    A new request for a document cancels the document's previous one - its parse stops at the next token (and its program is
+    killed), so stale work gives its worker back straight away. Requests can also be cancelled like any task (e.g. asyncio.wait_for).
+    Programs run in a new process each, or on runners (a runner.RunnerPool) if given.
+    If snapshot is a path from LanguageEnv.save_snapshot, the language's packs are loaded from it once, already indexed, for every compile."""
+
+    def __init__(self, lang_dir: str, executor=None, max_workers: int = 4, max_waiting: int = 16, runners=None, snapshot: str = None):
+        self.lang_dir = os.path.abspath(lang_dir)
+        if (snapshot is not None):
+            languages.language.LanguageEnv(self.lang_dir, snapshot=snapshot)  # Shares its packs and indexes with the environments made later
+        self.executor = executor  # None for the event loop's default executor
+        self.runners = runners
+        self.max_waiting = max_waiting
+
+        self.parsers = threading.local()  # Each worker thread's parser, built on its first job
+        self.slots = asyncio.Semaphore(max_workers)
+        self.waiting = 0
+        self.latest = {}  # Document > its task being served
+
+    async def compile(self, document, src: str, fast: bool = False, lines: bool = False):
+        """Compile src for document, returning (compiled text, debug data) - see compile.compile"""
+        async with self.document(document):
+            return await self.run_job(self.compile_job, src, fast, lines)
+
+    async def run(self, document, src: str, stdin: str = "", timeout: float = None):
+        """Compile and run src for document, returning its runner.RunResult with errors translated.
+        The program is killed after timeout seconds (the runner pool's default, or none, if None)."""
+        async with self.document(document):
+            compiled, debug_data = await self.run_job(self.compile_job, src, False, False)
+            if (self.runners is not None):
+                return await self.run_job(self.runner_job, src, compiled, debug_data, stdin, timeout)
+            async with self.slot():
+                return await self.run_process(src, compiled, debug_data, stdin, timeout)
+
+    def compile_job(self, cancel_event: threading.Event, src: str, fast: bool, lines: bool):
+        """Compile in a worker thread"""
+        language = languages.language.LanguageEnv(self.lang_dir)
+        parser = getattr(self.parsers, "parser", None)
+        if (parser is None):
+            parser = self.parsers.parser = compile.build_parser(language)
+        result = compile.compile_source(language, src, fast, lines, cancel_event, parser)
+        return str(result), compile.get_debug_data(result, src)
+
+    def runner_job(self, cancel_event: threading.Event, src: str, compiled: str, debug_data: dict, stdin: str, timeout: float):
+        """Run on the runner pool in a worker thread"""
+        return self.runners.run(src, compiled, debug_data, stdin, timeout, cancel_event)
+
+    async def run_job(self, job, *args):
+        """Run job(cancel_event, *args) on the executor once a worker is free, setting cancel_event if cancelled"""
+        async with self.slot():
+            cancel_event = threading.Event()
+            future = asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(job, cancel_event, *args))
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancel_event.set()
+                # Keep the slot until the worker has really stopped
+                await asyncio.wait([future])
+                if (not future.cancelled()):
+                    future.exception()  # Retrieved (usually ParseCancelled), so it isn't logged as unhandled
+                raise
+
+    async def run_process(self, src: str, compiled: str, debug_data: dict, stdin: str, timeout: float):
+        """Run a compiled program with the debugger in its own process (so it can be killed), in a temporary directory"""
+        with tempfile.TemporaryDirectory() as work_dir:
+            for name, text in (("source.py", src), ("out.py", compiled), ("debug.json", json.dumps(debug_data))):
+                with open(os.path.join(work_dir, name), "w", encoding="utf8") as writer:
+                    writer.write(text)
+
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.join(ROOT_DIR, "debug.py"), "out.py", "source.py", "debug.json", self.lang_dir,
+                cwd=work_dir, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(stdin.encode("utf8")), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                return RunResult(process.returncode, "", "", True)
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+            return RunResult(process.returncode, stdout.decode("utf8"), stderr.decode("utf8"), False)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one of the worker slots - raises ServiceBusy if too many requests are waiting already (backpressure)"""
+        if (self.slots.locked() and self.waiting >= self.max_waiting):
+            raise ServiceBusy(f"{self.waiting} requests already waiting")
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+    @contextlib.asynccontextmanager
+    async def document(self, document):
+        """Make the current task the document's latest request, cancelling the one before it"""
+        task = asyncio.current_task()
+        previous = self.latest.get(document)
+        self.latest[document] = task
+        if (previous is not None):
+            previous.cancel()  # Superseded
+        try:
+            yield
+        finally:
+            if (self.latest.get(document) is task):
+                del self.latest[document]
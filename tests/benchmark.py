@@ -0,0 +1,217 @@
+# Benchmark the compiler on generated translated (es) programs of controlled size and shape.
+import gc
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout, redirect_stderr
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+# Allowed slowdown before a result counts as a regression
+TIME_TOLERANCE = 1.5  # x baseline time
+MEMORY_TOLERANCE = 1.25  # x baseline peak memory
+SCALING_TOLERANCE = 0.3  # + baseline growth exponent
+TIME_SLACK = 0.002  # Seconds ignored, so tiny phases don't flag on timer noise
+MEMORY_SLACK = 64 * 1024  # Bytes ignored
+
+PHASES = ["load", "lexer", "parser", "parse", "debug"]
+
+
+"""Synthetic program generators - each returns translated source of a size controlled by n"""
+
+def gen_statements(n: int):
+    """Many short top-level statements"""
+    lines = []
+    for i in range(n):
+        lines.append(f"x{i} = {i} * 2 + 1")
+        lines.append(f"escribir(texto(x{i}))")
+    return "\n".join(lines) + "\n"
+
+
+def gen_nesting(n: int):
+    """Blocks nested n levels deep"""
+    lines = []
+    for depth in range(n):
+        indent = "    " * depth
+        lines.append(f"{indent}nivel{depth} = {depth}")
+        lines.append(f"{indent}si nivel{depth} < {n}:")
+    lines.append("    " * n + "escribir(\"Fondo\")")
+    return "\n".join(lines) + "\n"
+
+
+def gen_expressions(n: int):
+    """One long arithmetic expression with n operands"""
+    operands = [f"({i} * 3)" for i in range(n)]
+    return "total = " + " + ".join(operands) + "\nescribir(total)\n"
+
+
+def gen_literals(n: int):
+    """Large list and string literals with n items"""
+    items = ", ".join(f'"palabra {i}"' for i in range(n))
+    text = "abc " * n
+    return f'palabras = [{items}]\nfrase = "{text}"\nescribir(frase.mayúsculo(), palabras)\n'
+
+
+def gen_tortuga(n: int):
+    """Heavy tortuga attribute chains"""
+    lines = ["importar tortuga", "t = tortuga.Tortuga()", "tiempo = tortuga.tiempo"]
+    for i in range(n):
+        lines.append(f"t.avanzar({i} + 10)")
+        lines.append(f"t.girar_derecha(360 / {n})")
+        lines.append("tiempo.esperar(0)")
+    return "\n".join(lines) + "\n"
+
+
+SHAPES = {
+    "statements": (gen_statements, [25, 50, 100]),
+    "nesting": (gen_nesting, [5, 10, 20]),
+    "expressions": (gen_expressions, [25, 50, 100]),
+    "literals": (gen_literals, [10, 20, 40]),
+    "tortuga": (gen_tortuga, [10, 20, 40]),
+}
+
+
+"""Measuring"""
+
+def compile_phases(lang_path: str, src: str):
+    """Run each compile phase on src in order, yielding (phase name, function to run it)"""
+    import compile
+    import compilers.python
+    import languages.language
+
+    state = {}
+
+    def load():
+        # packs are shared by every environment, so drop them to time a cold load rather than a cache hit
+        env = languages.language.LanguageEnv
+        env.packs.clear()
+        env.frozen_ids.clear()
+        env.pack_indexes.clear()
+        state["language"] = env(lang_path)
+
+    def lexer():
+        state["lexer"] = compilers.python.PythonLexer(state["language"])
+        state["lexer"].build()
+
+    def parser():
+        state["parser"] = compilers.python.PythonParser(state["language"], state["lexer"])
+
+    def parse():
+        state["result"] = state["parser"].parse(src)
+
+    def debug():
+        compile.get_debug_data(state["result"], src)
+
+    return [("load", load), ("lexer", lexer), ("parser", parser), ("parse", parse), ("debug", debug)]
+
+
+def measure(lang_path: str, src: str, repeat: int = 3):
+    """Get the best time (seconds) and peak traced memory (bytes) of each compile phase on src"""
+    times = {phase: float("inf") for phase in PHASES}
+    memory = {}
+
+    with open(os.devnull, "w", encoding="utf8") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):  # Compiler diagnostics
+        # Time - untraced
+        for i in range(repeat):
+            for phase, func in compile_phases(lang_path, src):
+                start = time.perf_counter()
+                func()
+                times[phase] = min(times[phase], time.perf_counter() - start)
+
+        # Peak memory - traced separately as tracing slows everything down
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for phase, func in compile_phases(lang_path, src):
+                tracemalloc.reset_peak()
+                baseline_size = tracemalloc.get_traced_memory()[0]
+                func()
+                memory[phase] = tracemalloc.get_traced_memory()[1] - baseline_size
+        finally:
+            tracemalloc.stop()
+
+    return times, memory
+
+
+def growth_exponent(scales: list, values: list):
+    """Get k from value ~ scale^k between the smallest and largest scale"""
+    if (values[0] <= 0 or values[-1] <= 0):
+        return 0.0
+    return math.log(values[-1] / values[0]) / math.log(scales[-1] / scales[0])
+
+
+def run_benchmarks(lang_path="languages/es", shapes=None, repeat: int = 3):
+    """Measure every shape at every scale, returning a JSON-serialisable results dict"""
+    results = {}
+    for shape in (shapes if shapes is not None else SHAPES):
+        generator, scales = SHAPES[shape]
+        shape_results = {"scales": scales, "runs": [], "parse_exponent": None}
+        for n in scales:
+            times, memory = measure(lang_path, generator(n), repeat)
+            shape_results["runs"].append({"n": n, "time": times, "memory": memory})
+            print(f"{shape:>12} n={n:<5} parse {times['parse'] * 1000:9.2f}ms  peak {memory['parse'] / 1024:9.1f}KiB")
+
+        shape_results["parse_exponent"] = growth_exponent(scales, [run["time"]["parse"] for run in shape_results["runs"]])
+        results[shape] = shape_results
+    return results
+
+
+def compare(results: dict, baseline: dict):
+    """Compare results against a baseline, returning a list of regression messages"""
+    regressions = []
+    for shape, shape_results in results.items():
+        if (shape not in baseline):
+            continue
+        base_runs = {run["n"]: run for run in baseline[shape]["runs"]}
+        for run in shape_results["runs"]:
+            base_run = base_runs.get(run["n"])
+            if (base_run is None):
+                continue
+            for phase in PHASES:
+                if (run["time"][phase] > base_run["time"][phase] * TIME_TOLERANCE + TIME_SLACK):
+                    regressions.append(f"{shape} n={run['n']} {phase}: time {run['time'][phase] * 1000:.2f}ms > baseline {base_run['time'][phase] * 1000:.2f}ms")
+                if (run["memory"][phase] > base_run["memory"][phase] * MEMORY_TOLERANCE + MEMORY_SLACK):
+                    regressions.append(f"{shape} n={run['n']} {phase}: peak memory {run['memory'][phase]}B > baseline {base_run['memory'][phase]}B")
+
+        # Scaling is machine-independent, so catches regressions like quadratic copying on any machine
+        base_exponent = baseline[shape]["parse_exponent"]
+        if (shape_results["parse_exponent"] > base_exponent + SCALING_TOLERANCE):
+            regressions.append(f"{shape}: parse time grows as n^{shape_results['parse_exponent']:.2f} > baseline n^{base_exponent:.2f}")
+
+    return regressions
+
+
+def run(lang_path="languages/es", save_baseline=False, shapes=None):
+    print("BENCHMARK Compile Phases")
+
+    results = run_benchmarks(lang_path, shapes)
+    print("---")
+    if (save_baseline):
+        with open(BASELINE_PATH, "w", encoding="utf8") as writer:
+            json.dump(results, writer, indent=2)
+        print(f"Saved baseline to {BASELINE_PATH}")
+        return []
+
+    if (not os.path.exists(BASELINE_PATH)):
+        print("No baseline saved - run with --save to create one")
+        return []
+
+    with open(BASELINE_PATH, "r", encoding="utf8") as reader:
+        baseline = json.load(reader)
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if (len(regressions) == 0):
+        print("No regressions")
+    return regressions
+
+
+if __name__ == "__main__":
+    # python -m tests.benchmark [--save] [shape ...]
+    args = sys.argv[1:]
+    save = "--save" in args
+    chosen_shapes = [arg for arg in args if arg != "--save"] or None
+    sys.exit(1 if run(save_baseline=save, shapes=chosen_shapes) else 0)
@@ -0,0 +1,29 @@
+# Shared fixtures for the behaviour tests - run from the repository root with python -m pytest tests
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LANG_PATH = os.path.join(ROOT, "languages", "es")
+
+import compile
+import languages.language
+
+
+@pytest.fixture
+def lang_path():
+    return LANG_PATH
+
+
+@pytest.fixture
+def language():
+    """A fresh Spanish LanguageEnv"""
+    return languages.language.LanguageEnv(LANG_PATH)
+
+
+def compile_text(src: str, **options):
+    """Compile translated source text with a fresh Spanish LanguageEnv, returning the compiled text"""
+    return str(compile.compile_source(languages.language.LanguageEnv(LANG_PATH), src, **options))
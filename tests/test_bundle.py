@@ -0,0 +1,54 @@
+# Bundled projects run from one file, with programs importing each other and errors translated
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bundle
+
+PROJECT = {
+    "main.py": "importar util\nescribir(util.saludo().mayúsculo())\n",
+    "util.py": 'función saludo():\n    devolver "hola"\n',
+    "sub/juego.py": "importar otro\nescribir(otro.doble(21))\n",
+    "sub/otro.py": "función doble(n):\n    devolver n * 2\n",
+    "sub/falla.py": "escribir(1)\nz = 1 / 0\n",
+}
+
+
+@pytest.fixture
+def archive(lang_path, tmp_path):
+    project_dir = tmp_path / "proyecto"
+    for name, src in PROJECT.items():
+        os.makedirs(project_dir / os.path.dirname(name), exist_ok=True)
+        (project_dir / name).write_text(src, encoding="utf8")
+    dest_file = tmp_path / "proyecto.pyz"
+    assert sorted(bundle.bundle(lang_path, str(project_dir), str(dest_file))) == ["main", "sub/falla", "sub/juego", "sub/otro", "util"]
+    return dest_file
+
+
+def run(archive, *args):
+    # From another directory, so nothing is found outside the bundle
+    return subprocess.run([sys.executable, str(archive), *args], capture_output=True, text=True, encoding="utf8", cwd=archive.parent,
+                          env={**os.environ, "PYTHONPATH": ""}, timeout=60)
+
+
+def test_main(archive):
+    assert run(archive).stdout == "HOLA\n"
+
+
+def test_program_importing_sibling(archive):
+    assert run(archive, "sub/juego").stdout == "42\n"
+
+
+def test_error_translated(archive):
+    process = run(archive, "sub/falla")
+    assert process.stdout == "1\n"
+    assert "ErrorDivisiónPorCero" in process.stderr
+    assert "línea 2 | z = 1 / 0" in process.stderr
+
+
+def test_reproducible(lang_path, archive, tmp_path):
+    again = tmp_path / "otra.pyz"
+    bundle.bundle(lang_path, str(tmp_path / "proyecto"), str(again))
+    assert again.read_bytes() == archive.read_bytes()
@@ -0,0 +1,66 @@
+# Compiling straight to a code object must match compiling the text, with translated positions
+import ast
+import contextlib
+import io
+import traceback
+
+import pytest
+
+import compile
+
+PROGRAM = """función suma(n):
+    total = 0
+    para i en rango(n):
+        total = total + i
+    devolver total
+
+escribir(suma(10))
+z = 1 / (suma(2) - 1)
+"""
+
+
+@pytest.fixture
+def program(tmp_path):
+    source_file = tmp_path / "programa.py"
+    source_file.write_text(PROGRAM, encoding="utf8")
+    return str(source_file)
+
+
+def test_same_program_as_text(lang_path, program, tmp_path):
+    code, result = compile.compile_code(lang_path, program, str(tmp_path / "out.py"))
+    text = (tmp_path / "out.py").read_text(encoding="utf8")
+    assert ast.dump(result.node) == ast.dump(ast.parse(text))
+
+    compile.compile(lang_path, program, str(tmp_path / "text.py"), None)
+    assert ast.dump(result.node) == ast.dump(ast.parse((tmp_path / "text.py").read_text(encoding="utf8")))
+
+
+def test_runs_with_translated_positions(lang_path, program):
+    code, result = compile.compile_code(lang_path, program)
+    output = io.StringIO()
+    with pytest.raises(ZeroDivisionError) as err:
+        with contextlib.redirect_stdout(output):
+            exec(code, {"__name__": "__main__"})
+    assert output.getvalue() == "45\n"
+    frame = traceback.extract_tb(err.value.__traceback__)[-1]
+    assert (frame.filename, frame.lineno, frame.line) == (program, 8, "z = 1 / (suma(2) - 1)")
+
+
+@pytest.mark.parametrize("src, output", [
+    ("escribir(2 ** 3 ** 2)\n", "512\n"),
+    ("x = 3\nescribir(- x ** 2)\n", "-9\n"),
+    ("escribir(-2 ** 2 ** 3)\n", "-256\n"),
+    ("escribir((2 ** 3) ** 2)\n", "64\n"),
+    ("escribir((-2) ** 2)\n", "4\n"),
+])
+def test_power_like_text(lang_path, tmp_path, src, output):
+    source_file = tmp_path / "potencia.py"
+    source_file.write_text(src, encoding="utf8")
+    code, result = compile.compile_code(lang_path, str(source_file), str(tmp_path / "out.py"))
+    outputs = []
+    for program in (code, (tmp_path / "out.py").read_text(encoding="utf8")):
+        written = io.StringIO()
+        with contextlib.redirect_stdout(written):
+            exec(program, {})
+        outputs.append(written.getvalue())
+    assert outputs == [output, output]
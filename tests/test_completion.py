@@ -0,0 +1,32 @@
+# Translated-name completion, as an editor asks for it
+
+
+def names(completions):
+    return [name for name, params, docs in completions]
+
+
+def test_scope_names_sorted(language):
+    completions = names(language.complete("e"))
+    assert completions == sorted(completions)
+    assert "escribir" in completions
+    assert names(language.complete("e", 2)) == completions[:2]
+
+
+def test_unimported_package(language):
+    assert names(language.complete("tort")) == ["tortuga"]
+    assert names(language.complete("x = tortuga.ava")) == ["avanzar"]
+
+
+def test_follows_calls(language):
+    (name, params, docs), = language.complete("tortuga.Tortuga().av")
+    assert name == "avanzar"
+    assert "turtle > Turtle > forward" in docs
+
+
+def test_assigned_names(language):
+    language.assign(["escribible"], [], "escribible")
+    assert names(language.complete("escri")) == ["escribible", "escribir"]
+
+
+def test_unknown_parent(language):
+    assert language.complete("nada.x") == []
@@ -0,0 +1,58 @@
+# Environments share loaded packs read-only - one compile's assignments never leak into another's
+import json
+
+import compile
+import languages.language
+from conftest import compile_text
+
+SHADOWING = "importar tortuga\ntortuga.avanzar = 3\nescribir = 4\ntortuga.Tortuga.avanzar = 5\n"
+PROGRAM = "importar tortuga\ntortuga.avanzar(3)\nescribir(1)\nt = tortuga.Tortuga()\nt.avanzar(2)\n"
+COMPILED = "import turtle\nturtle.forward(3)\nprint(1)\nt = turtle.Turtle()\nt.forward(2)"
+
+
+def pack_data():
+    return {key: json.dumps(pack, default=languages.language.LanguageNode.to_json, sort_keys=True)
+            for key, pack in languages.language.LanguageEnv.packs.items()}
+
+
+def test_shared_packs_unchanged():
+    assert compile_text(PROGRAM) == COMPILED
+    before = pack_data()
+    assert "print = 4" in compile_text(SHADOWING)
+    assert pack_data() == before
+    assert compile_text(PROGRAM) == COMPILED
+
+
+def test_live_environments_isolated(lang_path):
+    first = languages.language.LanguageEnv(lang_path)
+    second = languages.language.LanguageEnv(lang_path)
+    compile.compile_source(first, SHADOWING)
+    assert str(compile.compile_source(second, PROGRAM)) == COMPILED
+    assert first.packs is second.packs
+
+
+def test_writes_stay_in_their_environment(lang_path):
+    first = languages.language.LanguageEnv(lang_path)
+    second = languages.language.LanguageEnv(lang_path)
+    forward_path = (".PKG", "turtle", "forward")
+    for env in (first, second):
+        env.import_pkg_raw("turtle")
+    shared = first.raw_path_to_data((".PKG", "turtle"))
+    assert second.raw_path_to_data((".PKG", "turtle")) is shared
+    assert id(shared) in languages.language.LanguageEnv.frozen_ids
+    forward = shared.props["forward"]
+    before = pack_data()
+
+    first.assign(forward_path, [], translated="correr", params=["pasos"])
+    changed = first.raw_path_to_data(forward_path)
+    assert (changed.translated, changed.params) == ("correr", ["pasos"])
+    assert changed is not forward
+    # Only the path written to is copied - the rest of the pack is still shared
+    assert first.raw_path_to_data((".PKG", "turtle", "backward")) is shared.props["backward"]
+    assert first.raw_path_to_data((".PKG", "turtle", "Turtle")) is shared.props["Turtle"]
+
+    assert second.raw_path_to_data(forward_path) is forward
+    assert (forward.translated, forward.params) != ("correr", ["pasos"])
+    assert pack_data() == before
+    for env, found in ((first, 1), (second, 0)):
+        assert len(env.get_properties("correr", [("", env.raw_path_to_data((".PKG", "turtle")))])) == found
@@ -0,0 +1,44 @@
+# Syntax errors are all reported from one parse, and the parser can be used again after them
+import pytest
+
+import compile
+import languages.language
+from conftest import compile_text
+
+BROKEN = "x = = 1\nescribir(1)\nsi x\n    escribir(2)\nz = (1 +\nw = 3\nescribir(w)\n"
+
+
+def parse_errors(src: str, **options):
+    with pytest.raises(SyntaxError) as err:
+        compile_text(src, **options)
+    return err.value
+
+
+def test_every_error():
+    err = parse_errors(BROKEN)
+    assert [(error.lineno, error.text) for error in err.errors] == [(1, "x = = 1"), (4, "    escribir(2)"), (6, "w = 3")]
+    assert (err.lineno, err.msg) == (1, "sintaxis no válida en '='")
+
+
+def test_one_error():
+    assert len(parse_errors("escribir(1)\nx = = 1\n").errors) == 1
+
+
+def test_parser_reused_after_errors(lang_path):
+    parser = compile.build_parser(languages.language.LanguageEnv(lang_path))
+    with pytest.raises(SyntaxError):
+        compile.compile_source(languages.language.LanguageEnv(lang_path), BROKEN, parser=parser)
+    result = compile.compile_source(languages.language.LanguageEnv(lang_path), "si 1:\n    escribir(2)\n", parser=parser)
+    assert str(result) == compile_text("si 1:\n    escribir(2)\n")
+
+
+def test_lexer_errors():
+    err = parse_errors('x = "abc\nescribir(1)\nw = = 2\nz = 1 $ 2\n')
+    assert [(error.lineno, error.offset, error.msg) for error in err.errors] == [
+        (1, 5, "texto sin terminar"), (3, 5, "sintaxis no válida en '='"), (4, 7, "carácter no válido '$'")]
+    assert err.errors[0].text == 'x = "abc'
+
+
+def test_unterminated_triple_quoted():
+    err = parse_errors('escribir(1)\ns = """abc\nescribir(2)\n')
+    assert [(error.lineno, error.msg) for error in err.errors] == [(2, "texto sin terminar")]
@@ -0,0 +1,37 @@
+# The fast keyword-only path must compile to the same program as the full parser
+import ast
+
+import pytest
+
+import compilers.fast
+from conftest import compile_text
+
+PROGRAM = """importar tiempo
+función suma(n):
+    total = 0
+    para i en rango(n):
+        si i % 2 == 0:
+            total = total + i
+    devolver total
+
+escribir(suma(10), "hola")
+"""
+
+INFERRED = 'x = "a"\nescribir(x.mayúsculo())\n'
+
+
+def test_same_program_as_full_parse(language):
+    fast = str(compilers.fast.FastTranslator(language).translate(PROGRAM))
+    assert ast.dump(ast.parse(fast)) == ast.dump(ast.parse(compile_text(PROGRAM)))
+
+
+def test_keeps_layout(language):
+    fast = str(compilers.fast.FastTranslator(language).translate(PROGRAM))
+    assert fast.count("\n") == PROGRAM.count("\n")
+
+
+def test_inferred_types_fall_back(language):
+    with pytest.raises(compilers.fast.FallbackNeeded):
+        compilers.fast.FastTranslator(language).translate(INFERRED)
+    assert compile_text(INFERRED, fast=True) == compile_text(INFERRED)
+    assert "x.upper()" in compile_text(INFERRED, fast=True)
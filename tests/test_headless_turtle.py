@@ -0,0 +1,89 @@
+# The headless turtle has every name the language pack translates, and its drawings survive saving and rendering
+import json
+import os
+import struct
+import sys
+import zlib
+
+import pytest
+
+import headless_turtle
+
+TK_BASES = (".PKG", "tkinter")  # Tk widgets - there is no display, so only their names exist
+
+
+def pack_names(lang_path):
+    """Get (owner, name) for every turtle name the pack has - the module's, then each class's own (not inherited) members"""
+    with open(os.path.join(lang_path, "turtle.json"), encoding="utf8") as reader:
+        names = json.load(reader)[1]
+    found = [("turtle", name) for name in names]
+    for name, data in names.items():
+        bases = [tuple(base) for base in (data[3] if len(data) > 3 else [])]
+        if (len(data) > 1 and data[1] and not any(base[:2] == TK_BASES for base in bases)):
+            found += [(name, member) for member in data[1] if not member.startswith(".")]
+    return found
+
+
+@pytest.fixture
+def screen():
+    headless_turtle._screen = headless_turtle._turtle = None  # Fresh screen
+    yield headless_turtle.Screen()
+    headless_turtle._screen = headless_turtle._turtle = None
+
+
+def test_pack_names_exist(lang_path):
+    missing = [(owner, name) for owner, name in pack_names(lang_path)
+               if not hasattr(headless_turtle if owner == "turtle" else getattr(headless_turtle, owner), name)]
+    assert missing == []
+
+
+def test_installed_as_turtle(monkeypatch):
+    monkeypatch.setitem(sys.modules, "turtle", sys.modules.get("turtle"))
+    monkeypatch.setattr(headless_turtle, "__name__", headless_turtle.__name__)
+    headless_turtle.install()
+    import turtle
+    assert turtle is headless_turtle and turtle.__name__ == "turtle"
+    with pytest.raises(AttributeError, match="module 'turtle' has no attribute"):
+        turtle.nada
+
+
+def png_pixels(png: bytes):
+    """Get (width, height, set of RGB pixels) of a PNG as Raster writes them - 8-bit RGB rows without filters"""
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    chunks = {}
+    i = 8
+    while (i < len(png)):
+        length, = struct.unpack(">I", png[i:i + 4])
+        chunks[png[i + 4:i + 8]] = png[i + 8:i + 8 + length]
+        i += 12 + length
+    width, height = struct.unpack(">II", chunks[b"IHDR"][:8])
+    rows = zlib.decompress(chunks[b"IDAT"])
+    row_size = 1 + width * 3
+    pixels = {rows[start:start + 3] for row in range(height) for start in range(row * row_size + 1, (row + 1) * row_size, 3)}
+    return width, height, pixels
+
+
+def test_drawing_round_trip(screen, tmp_path):
+    screen.setup(200, 100)
+    screen.bgcolor("black")
+    pen = headless_turtle.Turtle()
+    pen.color("red")
+    pen.begin_fill()
+    for side in range(4):
+        pen.forward(30)
+        pen.left(90)
+    pen.end_fill()
+    pen.dot(10, "blue")
+    pen.write("hola")
+
+    drawing = headless_turtle.drawing()
+    drawing.save(str(tmp_path / "dibujo.bin"))
+    loaded = headless_turtle.Drawing.load(str(tmp_path / "dibujo.bin"))
+    assert list(loaded.records()) == list(drawing.records())
+    assert (loaded.width, loaded.height) == (200, 100)
+
+    png = loaded.render()
+    assert png == drawing.render()
+    width, height, pixels = png_pixels(png)
+    assert (width, height) == (200, 100)
+    assert pixels == {b"\x00\x00\x00", b"\xff\x00\x00", b"\x00\x00\xff"}  # Red square and blue dot on black
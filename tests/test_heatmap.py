@@ -0,0 +1,84 @@
+# Line heatmaps count each translated line's runs
+import builtins
+import sys
+
+import pytest
+
+import compile
+import debug
+from heatmap import LineHeatmap
+
+PROGRAM = """función suma(n):
+    total = 0
+    para i en rango(n):
+        total = total + i
+    devolver total
+
+escribir(suma(1000))
+"""
+
+
+def test_project():
+    heatmap = LineHeatmap("programa.py", 4)
+    heatmap.hits[1:] = [1, 5, 5, 2]
+    heatmap.times[1:] = [0.5, 1.0, 2.0, 0.25]
+    # Compiled lines 2 and 3 are one translated line
+    hits, times = heatmap.project(["0", "1", "3", "3", "4"])
+    assert hits == [0, 1, 0, 5, 2]
+    assert times == [0.0, 0.5, 0.0, 3.0, 0.25]
+    assert heatmap.project() == ([0, 1, 5, 5, 2], [0.0, 0.5, 1.0, 2.0, 0.25])
+
+
+def test_translated_lines(lang_path, tmp_path, capsys):
+    source_file, compiled_file, debug_file = (str(tmp_path / name) for name in ("programa.py", "out.py", "out.json"))
+    (tmp_path / "programa.py").write_text(PROGRAM, encoding="utf8")
+    compile.compile(lang_path, source_file, compiled_file, debug_file)
+
+    heatmap = debug.Debugger(compiled_file, source_file, debug_file, lang_path, heatmap=True).heatmap_json()
+    assert capsys.readouterr().out == "499500\n"
+    assert heatmap["file"] == source_file
+    assert heatmap["hits"][:8] == [0, 1, 1, 1001, 1000, 1, 0, 1]
+
+
+def test_timed_lines(tmp_path):
+    program = tmp_path / "programa.py"
+    program.write_text("total = 0\nfor i in range(1000):\n    total += i\n", encoding="utf8")
+    code = builtins.compile(program.read_text(encoding="utf8"), str(program), "exec")
+    with LineHeatmap.for_file(str(program), sample=False) as heatmap:
+        exec(code, {})
+    assert heatmap.hits[1:4] == [1, 1001, 1000]
+    assert heatmap.times[3] > 0
+
+
+@pytest.mark.skipif(not hasattr(sys, "monitoring"), reason="sys.monitoring is Python 3.12+")
+def test_coverage_tool_id_taken(tmp_path):
+    program = tmp_path / "programa.py"
+    program.write_text("total = 0\nfor i in range(10):\n    total += i\n", encoding="utf8")
+    code = builtins.compile(program.read_text(encoding="utf8"), str(program), "exec")
+    sys.monitoring.use_tool_id(sys.monitoring.COVERAGE_ID, "other coverage")
+    try:
+        with LineHeatmap.for_file(str(program)) as heatmap:
+            assert heatmap.tool != sys.monitoring.COVERAGE_ID
+            exec(code, {})
+    finally:
+        sys.monitoring.free_tool_id(sys.monitoring.COVERAGE_ID)
+    assert heatmap.hits[1:4] == [1, 11, 10]
+
+
+def test_previous_tracer_restored(tmp_path, monkeypatch):
+    program = tmp_path / "programa.py"
+    program.write_text("total = 0\nfor i in range(10):\n    total += i\n", encoding="utf8")
+    code = builtins.compile(program.read_text(encoding="utf8"), str(program), "exec")
+    monkeypatch.setattr(LineHeatmap, "free_tool", staticmethod(lambda: None))  # The settrace fallback
+
+    def tracer(frame, event, arg):
+        return None
+    original = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        with LineHeatmap.for_file(str(program)) as heatmap:
+            exec(code, {})
+        assert sys.gettrace() is tracer
+    finally:
+        sys.settrace(original)
+    assert heatmap.hits[1:4] == [1, 11, 10]
@@ -0,0 +1,87 @@
+# Incremental compiles must equal a full compile of each version, reparsing only what an edit affects
+import pytest
+
+import compile
+import languages.language
+from compilers.incremental import IncrementalCompiler
+
+VERSIONS = {}
+VERSIONS["first"] = """importar tortuga
+x = 1
+función doble(n):
+    devolver n * 2
+
+lista = [1,
+2,
+3]
+si x > 0:
+    escribir(doble(x))
+sino:
+    escribir(lista)
+t = tortuga.Tortuga()
+t.avanzar(doble(3))
+"""
+# Changes x's type, so the if statement using it is reparsed
+VERSIONS["retyped"] = VERSIONS["first"].replace("x = 1", 'x = "a"').replace("escribir(doble(x))", "escribir(x.mayúsculo())")
+# Only the last statement changes - what the rest defined is replayed
+VERSIONS["last line"] = VERSIONS["retyped"].replace("t.avanzar(doble(3))", "t.avanzar(doble(4))")
+
+
+def full_compile(lang_path, src):
+    return compile.compile_source(languages.language.LanguageEnv(lang_path), src)
+
+
+def syntax_errors(compile_src, src):
+    with pytest.raises(SyntaxError) as err:
+        compile_src(src)
+    return [(error.lineno, error.msg) for error in getattr(err.value, "errors", [err.value])]
+
+
+@pytest.fixture
+def compiler(lang_path):
+    """IncrementalCompiler which records the text of the regions it parses in .parsed"""
+    incremental = IncrementalCompiler(lang_path)
+    incremental.parsed = []
+    parse_region = incremental.parse_region
+
+    def record(env, key, lineno):
+        incremental.parsed.append(key[0])
+        return parse_region(env, key, lineno)
+    incremental.parse_region = record
+    return incremental
+
+
+def check(compiler, lang_path, src):
+    compiler.parsed.clear()
+    result = compiler.compile(src)
+    full = full_compile(lang_path, src)
+    assert str(result) == str(full)
+    assert compile.get_debug_data(result, src) == compile.get_debug_data(full, src)
+
+
+def test_edits(compiler, lang_path):
+    check(compiler, lang_path, VERSIONS["first"])
+    assert len(compiler.parsed) == 7  # lista's brackets keep its lines in one region
+
+    check(compiler, lang_path, VERSIONS["retyped"])
+    assert compiler.parsed == ['x = "a"\n', "si x > 0:\n    escribir(x.mayúsculo())\nsino:\n    escribir(lista)\n"]
+
+    check(compiler, lang_path, VERSIONS["last line"])
+    assert compiler.parsed == ["t.avanzar(doble(4))\n"]
+
+    check(compiler, lang_path, VERSIONS["last line"])
+    assert compiler.parsed == []
+
+
+def test_changed_lookahead(compiler, lang_path):
+    # The region before the last one is unchanged, but what the parser reads after it is
+    src = 't.avanzar(3)\nescribir(z)\nz = [x, 2]\nw = t\nimportar tiempo como reloj\nx = "a"\nimportar tortuga\nimportar tiempo como reloj\n'
+    check(compiler, lang_path, src)
+    check(compiler, lang_path, src.rsplit("importar tiempo", 1)[0] + "t = tortuga.Tortuga()\n")
+
+
+def test_errors(compiler, lang_path):
+    compiler.compile(VERSIONS["first"])
+    broken = VERSIONS["first"].replace("x = 1", "x = = 1").replace("t = tortuga", "t = = tortuga")
+    assert syntax_errors(compiler.compile, broken) == syntax_errors(lambda src: full_compile(lang_path, src), broken)
+    check(compiler, lang_path, VERSIONS["first"])
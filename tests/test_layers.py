@@ -0,0 +1,56 @@
+# Layered languages lay only what differs over the language under them, sharing the rest
+import json
+import os
+
+import pytest
+
+import compile
+import languages.language
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf8")
+
+
+@pytest.fixture
+def layer_path(lang_path, tmp_path):
+    layer = tmp_path / "es-regional"
+    layer.mkdir()
+    write_json(layer / ".layer.json", {"parent": os.path.relpath(lang_path, layer)})
+    write_json(layer / ".kw.json", {"cuando": "IF", "si": None})
+    write_json(layer / ".pkgs.json", {"matemáticas": "math"})
+    write_json(layer / "builtins.json", ["builtins", {"print": ["imprimir"]}])
+    write_json(layer / "math.json", ["matemáticas", {"sqrt": ["raiz", None, None, [[".PKG", "builtins", "builtin_function_or_method"]]]}])
+    return str(layer)
+
+
+def compile_text(lang_path, src: str):
+    return str(compile.compile_source(languages.language.LanguageEnv(lang_path), src))
+
+
+def test_overlay(layer_path):
+    assert compile_text(layer_path, "imprimir(rango(2))\n") == "print(range(2))"
+    assert compile_text(layer_path, "cuando 1:\n    imprimir(2)\n") == "if 1 :\n    print(2)"
+
+
+def test_removed_keyword(layer_path):
+    # Just a name now
+    assert compile_text(layer_path, "si = 1\n") == "si = 1"
+
+
+def test_layer_only_pack(layer_path):
+    assert compile_text(layer_path, "importar matemáticas\nimprimir(matemáticas.raiz(4))\n") == "import math\nprint(math.sqrt(4))"
+
+
+def test_base_unchanged(lang_path, layer_path):
+    compile_text(layer_path, "imprimir(1)\n")
+    assert compile_text(lang_path, "escribir(1)\n") == "print(1)"
+    assert languages.language.LanguageEnv(lang_path).kw["si"] == "IF"
+
+
+def test_shares_unchanged_nodes(lang_path, layer_path):
+    base = languages.language.LanguageEnv(lang_path).load_pack("builtins")
+    layered = languages.language.LanguageEnv(layer_path).load_pack("builtins")
+    assert layered.props["print"].translated == "imprimir"
+    assert base.props["print"].translated == "escribir"
+    assert layered.props["str"] is base.props["str"]
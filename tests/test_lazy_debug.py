@@ -0,0 +1,26 @@
+# Programs which run without errors never load their debug maps or language
+import compile
+import debug
+
+
+def run(lang_path, tmp_path, program: str, debug_name: str = "out.json"):
+    source_file, compiled_file = str(tmp_path / "programa.py"), str(tmp_path / "out.py")
+    (tmp_path / "programa.py").write_text(program, encoding="utf8")
+    compile.compile(lang_path, source_file, compiled_file, str(tmp_path / "out.json"))
+    return debug.Debugger(compiled_file, source_file, str(tmp_path / debug_name), lang_path)
+
+
+def test_success_loads_nothing(lang_path, tmp_path, capsys):
+    debugger = run(lang_path, tmp_path, "escribir(1)\n", "missing.json")
+    assert capsys.readouterr().out == "1\n"
+    assert debugger._debug_info is None
+    assert debugger._lang is None
+
+
+def test_error_translated(lang_path, tmp_path, capsys):
+    debugger = run(lang_path, tmp_path, "escribir(1)\nz = 1 / 0\n")
+    output = capsys.readouterr()
+    assert output.out == "1\n"
+    assert "ErrorDivisiónPorCero: división por cero" in output.err
+    assert "línea 2 | z = 1 / 0" in output.err
+    assert debugger._debug_info is not None
@@ -0,0 +1,105 @@
+# Strings end at their first unescaped closing quote and numbers take every Python literal form
+import time
+
+import pytest
+
+import compilers.python
+
+
+@pytest.fixture
+def lexer(language):
+    lexer = compilers.python.PythonLexer(language)
+    lexer.build()
+    return lexer
+
+
+def start(lexer, src: str):
+    lexer.reset()
+    lexer.errors = []
+    lexer.lexer.lexer.lineno = 1
+    lexer.lexer.input(src)
+
+
+def tokens(lexer, src: str):
+    start(lexer, src)
+    found = []
+    while (token := lexer.lexer.token()) is not None:
+        found.append((token.type, token.value))
+    return found
+
+
+def strings(lexer, src: str):
+    return [value for type, value in tokens(lexer, src) if type == "STRING"]
+
+
+@pytest.mark.parametrize("literal", [
+    r'"a\"b"', r"'a\'b'", r'"\\"', r"'\\\\'", r'"\\\"\\"', r'"a\\\\\"b"', r"'\"'", r'"\n\'\t"',
+])
+def test_escaped_quotes(lexer, literal):
+    assert strings(lexer, f"x = {literal} + 1\n") == [literal]
+
+
+def test_backslash_runs(lexer):
+    # An even run of backslashes escapes itself, so the quote after it closes the string
+    for count in range(1, 9):
+        literal = '"' + "\\" * count + ('"' if count % 2 == 0 else '""')
+        assert strings(lexer, f"x = {literal}\n") == [literal]
+        assert eval(literal) == "\\" * (count // 2) + ("" if count % 2 == 0 else '"')
+
+
+@pytest.mark.parametrize("prefix", ["r", "R", "b", "B", "f", "F", "u", "U", "rb", "Rb", "rB", "br", "bR", "BR", "fr", "Rf", "fR"])
+def test_string_prefixes(lexer, prefix):
+    literal = f"{prefix}'abc'"
+    assert strings(lexer, f"x = {literal}\n") == [literal]
+    assert tokens(lexer, f"{prefix} = 1\n")[0] == ("ID", prefix)  # Not followed by a quote, the prefix is a name
+
+
+def test_raw_string_escape(lexer):
+    # Even raw strings cannot end in an escaped quote
+    assert strings(lexer, r'x = r"a\"b" + r"\\"' + "\n") == [r'r"a\"b"', r'r"\\"']
+
+
+@pytest.mark.parametrize("quote", ['"""', "'''"])
+def test_triple_quoted(lexer, quote):
+    literal = f"{quote}uno\n'dos' \"tres\"\n\\{quote[0]}{quote[0]}{quote[0]}\n''\"\"cuatro{quote}"
+    src = f"x = {literal}\nz = 2\n"
+    assert strings(lexer, src) == [literal]
+    start(lexer, src)
+    while (token := lexer.lexer.token()).value != "z":
+        pass
+    assert token.lineno == literal.count("\n") + 2
+    assert lexer.errors == []
+
+
+def test_newline_ends_string(lexer):
+    assert strings(lexer, 'x = "a\\\nb"\n') == ['"a\\\nb"']  # Escaped, the newline is part of the string
+    assert strings(lexer, 'x = "a\ny = "b"\n')[0] == '"a'
+    assert [error.msg for error in lexer.errors] == ["texto sin terminar"]
+
+
+@pytest.mark.parametrize("literal", [
+    "0", "7", "1_000", "0xFF", "0XfF", "0x_1f_F", "0o17", "0O7_7", "0b1", "0B1_0_1",
+    "1.5", "1.", ".5", "1_000.000_5", "1e10", "1E+10", "1_0e-1_0", "1.5e-3", ".5e3", "3j", "1.5J", "1e3j",
+])
+def test_numbers(lexer, literal):
+    assert tokens(lexer, f"x = {literal}\n")[2] == ("NUMBER", literal)
+    eval(literal)  # Everything read as a number is one for Python too
+
+
+def unterminated_time(lexer, size: int):
+    src = 'x = "' + '\\"' * size + "\n" + "'" + "\\'" * size
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        found = tokens(lexer, src)
+        best = min(best, time.perf_counter() - start)
+    assert [type for type, value in found if type == "STRING"] == ["STRING", "STRING"]
+    assert [error.msg for error in lexer.errors] == ["texto sin terminar"] * 2
+    return best
+
+
+def test_unterminated_linear(lexer):
+    # Every quote in the string is escaped, which a backtracking pattern retries from each one
+    small, large = unterminated_time(lexer, 5_000), unterminated_time(lexer, 40_000)
+    assert large < small * 24  # 8 times the length - quadratic would take 64 times as long
+    assert large < 1
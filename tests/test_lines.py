@@ -0,0 +1,39 @@
+# Line-preserving compiles keep every statement on its translated line
+import ast
+
+from conftest import compile_text
+
+PROGRAM = """función suma(n):
+    total = 0
+
+    para i en rango(n):
+        total = total + i
+
+    devolver total
+x = [1,
+2]
+escribir(suma(3))
+z = 1 / 0
+"""
+
+
+def statement_lines(compiled: str):
+    return [(type(node).__name__, node.lineno) for node in ast.walk(ast.parse(compiled)) if isinstance(node, ast.stmt)]
+
+
+def test_statements_keep_their_lines():
+    assert statement_lines(compile_text(PROGRAM, lines=True)) == [
+        ("FunctionDef", 1), ("Assign", 8), ("Expr", 10), ("Assign", 11), ("Assign", 2), ("For", 4), ("Return", 7), ("Assign", 5)]
+
+
+def test_same_program():
+    assert ast.dump(ast.parse(compile_text(PROGRAM, lines=True))) == ast.dump(ast.parse(compile_text(PROGRAM)))
+
+
+def test_error_on_translated_line():
+    try:
+        exec(compile(compile_text(PROGRAM, lines=True), "programa", "exec"), {})
+    except ZeroDivisionError as err:
+        assert err.__traceback__.tb_next.tb_lineno == 11
+    else:
+        assert False, "expected ZeroDivisionError"
@@ -0,0 +1,60 @@
+# -v and -q on the command line choose which diagnostics are shown
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+import log
+from conftest import LANG_PATH, ROOT
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.levels = []
+
+    def emit(self, record):
+        self.levels.append(record.levelno)
+
+
+@pytest.fixture
+def shown():
+    handler = Collect()
+    log.logger.addHandler(handler)
+    try:
+        yield handler.levels
+    finally:
+        log.logger.removeHandler(handler)
+        log.set_verbosity(1)
+
+
+@pytest.mark.parametrize("options, levels", [
+    ([], [logging.ERROR, logging.WARNING]),
+    (["-q"], [logging.ERROR]),
+    (["-q", "-q"], [logging.ERROR]),
+    (["-v"], [logging.ERROR, logging.WARNING, logging.INFO]),
+    (["-vv"], [logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG]),
+    (["--poll", "-v", "-v"], [logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG]),
+    (["-vv", "-q"], [logging.ERROR, logging.WARNING, logging.INFO]),
+    (["-vvvvv"], [logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG]),
+])
+def test_gated(shown, options, levels):
+    log.set_verbosity_options(options)
+    for level in (logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG):
+        log.logger.log(level, "message")
+    assert shown == levels
+    log.set_verbosity_options(log.verbosity_options())
+    assert log.logger.level == levels[-1]  # Passed on unchanged
+
+
+def test_command_line(tmp_path):
+    (tmp_path / "programa.py").write_text("escribir(1)\n", encoding="utf8")
+    files = [str(tmp_path / name) for name in ("programa.py", "out.py", "debug.json")]
+    subprocess.run([sys.executable, os.path.join(ROOT, "compile.py"), LANG_PATH, *files, "-q"], check=True)
+    for options, banner in (([], False), (["-v"], True)):
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "debug.py"), files[1], files[0], files[2], LANG_PATH, *options],
+                                capture_output=True, encoding="utf8", check=True)
+        assert result.stdout == "1\n"
+        assert (f"GlobalPython ({LANG_PATH})" in result.stderr) == banner
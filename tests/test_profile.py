@@ -0,0 +1,29 @@
+# Profiles of translated programs report translated names and positions
+import compile
+import debug
+
+PROGRAM = """importar tiempo
+función suma(n):
+    total = 0
+    para i en rango(n):
+        total = total + i
+    devolver total
+
+tiempo.esperar(0)
+escribir(suma(10))
+escribir("a".mayúsculo())
+"""
+
+
+def test_translated_names(lang_path, tmp_path, capsys):
+    source_file, compiled_file, debug_file = (str(tmp_path / name) for name in ("programa.py", "out.py", "out.json"))
+    (tmp_path / "programa.py").write_text(PROGRAM, encoding="utf8")
+    compile.compile(lang_path, source_file, compiled_file, debug_file)
+
+    stats = debug.Debugger(compiled_file, source_file, debug_file, lang_path, profile=True).stats.stats
+    assert capsys.readouterr().out == "45\nA\n"
+    assert (source_file, 2, "suma") in stats
+    assert ("~", 0, "<built-in method escribir>") in stats
+    assert ("~", 0, "<built-in method tiempo.esperar>") in stats
+    assert ("~", 0, "<method 'mayúsculo' of 'texto' objects>") in stats
+    assert not any(filename == compiled_file for filename, lineno, name in stats)
@@ -0,0 +1,41 @@
+# Interactive sessions keep their variables and types between entries
+import pytest
+
+import repl
+
+SESSION = ["x = 2", "x * 3", "función doble(n):", "    devolver n * 2", "", "doble(x)", 's = "a"', "s.mayúsculo()",
+           "z = (1 +", "2)", "z", "1 / 0", "x = = 1", "x", "escribir)"]
+
+
+def interact(lang_path, lines: list):
+    entries = iter(lines)
+
+    def read(prompt):
+        line = next(entries, None)
+        if (line is None):
+            raise EOFError
+        return line
+    repl.Repl(lang_path).interact(read)
+
+
+def test_session(lang_path, capsys):
+    interact(lang_path, SESSION)
+    output = capsys.readouterr()
+    assert output.out == "6\n4\n'A'\n3\n2\n\n"
+    assert "ErrorDivisiónPorCero: división por cero" in output.err
+    assert "<entrada 10>" in output.err and "sintaxis no válida en '='" in output.err  # The session goes on after it
+    assert "sintaxis no válida en ')'" in output.err
+
+
+@pytest.mark.parametrize("text, more", [
+    ("a = [1,", True),
+    ('s = """a', True),
+    ("si x:", True),
+    ("si x:\n    x", True),
+    ("si x:\n    x\n", False),
+    ("a = 1", False),
+    ("a = 1)", False),
+    ("a = (1]", False),
+])
+def test_needs_more(text, more):
+    assert repl.Repl.needs_more(text) == more
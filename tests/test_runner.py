@@ -0,0 +1,52 @@
+# Each program runs in a fresh child of a warm zygote - killed on timeout, and nothing it does reaches the next run
+import time
+
+import pytest
+
+import compile
+import languages.language
+from conftest import LANG_PATH
+from runner import RunnerPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with RunnerPool(LANG_PATH, size=1, timeout=10) as pool:  # One runner, so every run comes from the same zygote
+        yield pool
+
+
+def run(pool, src: str, **options):
+    result = compile.compile_source(languages.language.LanguageEnv(LANG_PATH), src)
+    return pool.run(src, str(result), compile.get_debug_data(result, src), **options)
+
+
+def test_timeout_kills(pool):
+    start = time.monotonic()
+    result = run(pool, "mientras 1:\n    x = 1\n", timeout=0.5)
+    assert result.timed_out
+    assert result.returncode == -9  # SIGKILL
+    assert time.monotonic() - start < 5
+    assert run(pool, "escribir(1)\n").stdout == "1\n"
+
+
+def test_exit_recovers(pool):
+    # os._exit skips the child's cleanup, so only its return code comes back
+    result = run(pool, 'escribir(1)\n__import__("os")._exit(3)\n')
+    assert (result.returncode, result.timed_out) == (3, False)
+    assert run(pool, "escribir(2)\n").stdout == "2\n"
+
+
+def test_zygote_replaced(pool):
+    zygote = pool.runners[0].process
+    zygote.kill()
+    zygote.wait()
+    assert run(pool, "escribir(3)\n").stdout == "3\n"
+    assert pool.runners[0].process is not zygote
+
+
+def test_no_leaks(pool):
+    assert run(pool, "x = 5\nimportar tiempo\ntiempo.extra = 2\nescribir(x)\n").stdout == "5\n"
+    result = run(pool, "escribir(x)\n")
+    assert (result.stdout, result.stderr.split(" \n")[0]) == ("", "ErrorDeNombre: 'x' no es definido")
+    result = run(pool, "importar tiempo\nescribir(tiempo.extra)\n")
+    assert result.stderr.split(" \n")[0] == "ErrorDeAtributo: el módulo 'tiempo' no tiene el atributo 'extra'"
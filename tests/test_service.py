@@ -0,0 +1,91 @@
+# Cancelled compiles give their worker back at once, and requests past the queue's limit are refused
+import asyncio
+import threading
+import time
+
+import pytest
+
+from compilers._template import ParseCancelled
+from conftest import compile_text
+from service import CompileService, ServiceBusy
+
+LONG = "x = 1\nsi x > 0:\n    escribir(x * 2)\n" * 1000  # About half a second to parse
+SHORT = "escribir(1 + 2)\n"
+
+
+class WatchedService(CompileService):
+    """Records when each compile starts and how it ends, and can hold compiles until released"""
+
+    def __init__(self, *args, hold: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+        if (not hold):
+            self.release.set()
+        self.outcomes = []
+
+    def compile_job(self, cancel_event, src, fast, lines):
+        self.started.release()
+        self.release.wait()
+        try:
+            result = super().compile_job(cancel_event, src, fast, lines)
+        except Exception as err:
+            self.outcomes.append(type(err))
+            raise
+        self.outcomes.append("done")
+        return result
+
+    async def wait_started(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.started.acquire)
+
+
+def test_cancel_in_flight(lang_path):
+    async def main():
+        service = WatchedService(lang_path, max_workers=1)
+        task = asyncio.create_task(service.compile("doc", LONG))
+        await service.wait_started()
+        await asyncio.sleep(0.05)  # Parsing by now
+        start = time.perf_counter()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert time.perf_counter() - start < 0.25  # Stopped at the next token, not after the whole parse
+        assert service.outcomes == [ParseCancelled]
+
+        # The worker's parser carries on with the next compile as if nothing happened
+        compiled, _ = await service.compile("doc", SHORT)
+        assert compiled == compile_text(SHORT)
+        assert service.outcomes == [ParseCancelled, "done"]
+    asyncio.run(main())
+
+
+def test_superseded(lang_path):
+    async def main():
+        service = WatchedService(lang_path, max_workers=1)
+        first = asyncio.create_task(service.compile("doc", LONG))
+        await service.wait_started()
+        compiled, _ = await service.compile("doc", SHORT)
+        assert first.cancelled()
+        assert compiled == compile_text(SHORT)
+        assert service.outcomes == [ParseCancelled, "done"]
+    asyncio.run(main())
+
+
+def test_busy(lang_path):
+    async def main():
+        service = WatchedService(lang_path, max_workers=1, max_waiting=2, hold=True)
+        running = asyncio.create_task(service.compile("a", SHORT))
+        await service.wait_started()
+        waiting = [asyncio.create_task(service.compile(document, SHORT)) for document in ("b", "c")]
+        await asyncio.sleep(0)  # Queued behind the running compile
+        with pytest.raises(ServiceBusy):
+            await service.compile("d", SHORT)
+        assert service.waiting == 2
+
+        service.release.set()
+        results = await asyncio.gather(running, *waiting)
+        assert [compiled for compiled, _ in results] == [compile_text(SHORT)] * 3
+        # Once the queue has drained, requests are taken again
+        compiled, _ = await service.compile("d", SHORT)
+        assert compiled == compile_text(SHORT)
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+# Environments started from a snapshot compile exactly like ones loading the language files, until a file changes
+import os
+import shutil
+
+import pytest
+
+import compile
+import languages.language
+from conftest import compile_text
+
+LanguageEnv = languages.language.LanguageEnv
+
+PROGRAM = "importar tortuga\nimportar tiempo\nt = tortuga.Tortuga()\nt.avanzar(10)\ntiempo.esperar(1)\nescribir(texto(3).mayúsculo())\n"
+
+
+@pytest.fixture
+def fresh_process(monkeypatch):
+    """No packs loaded yet, as in a new process"""
+    monkeypatch.setattr(LanguageEnv, "packs", {})
+    monkeypatch.setattr(LanguageEnv, "frozen_ids", set())
+    monkeypatch.setattr(LanguageEnv, "pack_indexes", {})
+
+
+def save(lang_path, path):
+    language = LanguageEnv(lang_path)
+    for package in ("turtle", "time"):
+        language.import_pkg_raw(package)
+    language.save_snapshot(path)
+
+
+def test_round_trip(lang_path, tmp_path, fresh_process, monkeypatch):
+    expected = compile_text(PROGRAM)
+    save(lang_path, tmp_path / "es.snapshot")
+
+    monkeypatch.setattr(LanguageEnv, "packs", {})
+    def read_layer(data_dir, filename):
+        raise AssertionError(f"{filename} read from the language files")
+    monkeypatch.setattr(LanguageEnv, "read_layer", staticmethod(read_layer))
+    language = LanguageEnv(lang_path, snapshot=tmp_path / "es.snapshot")
+    assert str(compile.compile_source(language, PROGRAM)) == expected
+    assert len(LanguageEnv.pack_indexes) > 0  # Indexes came with it
+
+
+@pytest.mark.parametrize("change", ["edit", "touch", "add"])
+def test_stale_ignored(lang_path, tmp_path, fresh_process, change):
+    # A layer over a copy of the language, with no language files of its own yet
+    base, layer = str(tmp_path / "base"), str(tmp_path / "layer")
+    shutil.copytree(lang_path, base)
+    os.mkdir(layer)
+    with open(os.path.join(layer, LanguageEnv.LAYER_FILE), "w", encoding="utf8") as writer:
+        writer.write('{"parent": "../base"}')
+    save(layer, tmp_path / "layer.snapshot")
+
+    assert LanguageEnv(layer).load_snapshot(tmp_path / "layer.snapshot")
+
+    builtins = os.path.join(base, "builtins.json")
+    if (change == "edit"):
+        with open(builtins, encoding="utf8") as reader:
+            text = reader.read()
+        with open(builtins, "w", encoding="utf8") as writer:
+            writer.write(text.replace('"escribir"', '"imprimir"'))
+    elif (change == "touch"):
+        stat = os.stat(builtins)
+        os.utime(builtins, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    else:
+        with open(os.path.join(layer, "builtins.json"), "w", encoding="utf8") as writer:
+            writer.write('["builtins", {"print": ["imprimir"]}]')
+
+    LanguageEnv.packs.clear()
+    language = LanguageEnv(layer, snapshot=tmp_path / "layer.snapshot")
+    name = "escribir" if change == "touch" else "imprimir"
+    assert str(compile.compile_source(language, f"{name}(1)\n")) == "print(1)"
+    assert not LanguageEnv(layer).load_snapshot(tmp_path / "layer.snapshot")
@@ -0,0 +1,70 @@
+# Interface summaries let translated modules be imported, with their types, without compiling them again
+import json
+
+import pytest
+
+import compile
+import languages.language
+
+MODULE = 'función saludo():\n    devolver "hola"\nnombres = ["a"]\n'
+IMPORTER = "importar util\ns = util.saludo()\nescribir(s.mayúsculo())\npara n en util.nombres:\n    escribir(n.mayúsculo())\n"
+
+
+def compile_file(lang_path, tmp_path, name: str, src: str, **options):
+    (tmp_path / "fuentes").mkdir(exist_ok=True)
+    (tmp_path / "fuentes" / (name + ".py")).write_text(src, encoding="utf8")
+    compile.compile(lang_path, str(tmp_path / "fuentes" / (name + ".py")), str(tmp_path / (name + ".py")), None, **options)
+    return (tmp_path / (name + ".py")).read_text(encoding="utf8")
+
+
+def read_summary(tmp_path, name: str):
+    return json.loads((tmp_path / (name + languages.language.LanguageEnv.SUMMARY_SUFFIX)).read_text(encoding="utf8"))
+
+
+def test_round_trip(lang_path, tmp_path):
+    compile_file(lang_path, tmp_path, "util", MODULE, summary=True)
+    summary = read_summary(tmp_path, "util")
+    interface_hash, interface = languages.language.LanguageEnv(lang_path).load_summary(str(tmp_path / "util.pyi.json"))
+    assert interface_hash == summary["hash"]
+    assert json.loads(json.dumps(interface, default=languages.language.LanguageNode.to_json)) == summary["interface"]
+
+
+def test_import_types(lang_path, tmp_path):
+    compile_file(lang_path, tmp_path, "util", MODULE, summary=True)
+    (tmp_path / "fuentes" / "util.py").unlink()  # Only the summary is read
+    assert compile_file(lang_path, tmp_path, "principal", IMPORTER).endswith("print(s.upper())\nfor n in util.nombres :\n    print(n.upper())")
+
+
+def test_hash_follows_interface(lang_path, tmp_path):
+    compile_file(lang_path, tmp_path, "util", MODULE, summary=True)
+    first = read_summary(tmp_path, "util")["hash"]
+    compile_file(lang_path, tmp_path, "util", MODULE.replace('"hola"', '"adiós"'), summary=True)
+    assert read_summary(tmp_path, "util")["hash"] == first
+    compile_file(lang_path, tmp_path, "util", MODULE.replace('"hola"', "1"), summary=True)
+    assert read_summary(tmp_path, "util")["hash"] != first
+
+
+def test_old_version(lang_path, tmp_path):
+    compile_file(lang_path, tmp_path, "util", MODULE, summary=True)
+    summary = read_summary(tmp_path, "util")
+    summary["version"] = 0
+    (tmp_path / "util.pyi.json").write_text(json.dumps(summary), encoding="utf8")
+    with pytest.raises(ValueError):
+        languages.language.LanguageEnv(lang_path).load_summary(str(tmp_path / "util.pyi.json"))
+
+
+def test_replaced_when_changed(lang_path, tmp_path):
+    path = str(tmp_path / "util.pyi.json")
+    cache = languages.language.LanguageEnv.summaries
+    compile_file(lang_path, tmp_path, "util", MODULE, summary=True)
+    language = languages.language.LanguageEnv(lang_path)
+    first = language.load_summary(path)
+    language.reverse_index(first[1].props)
+    assert language.load_summary(path)[1] is first[1]  # Unchanged - cached
+
+    compile_file(lang_path, tmp_path, "util", MODULE.replace('"hola"', "1"), summary=True)
+    second = language.load_summary(path)
+    assert second[0] == read_summary(tmp_path, "util")["hash"] != first[0]
+    assert [key for key in cache if key.startswith(str(tmp_path))] == [path]  # One entry per file
+    assert cache[path][1:] == second
+    assert not any(props is first[1].props for props, index, size in languages.language.LanguageEnv.pack_indexes.values())
@@ -0,0 +1,52 @@
+# Sleeping on the virtual clock takes no real time, and the time module is back to normal afterwards
+import time
+
+import pytest
+
+from conftest import compile_text
+from virtual_clock import VirtualClock
+
+ORIGINALS = {name: getattr(time, name) for name in VirtualClock.patched}
+
+
+def test_sleep_is_instant():
+    real_start = time.perf_counter()
+    with VirtualClock(epoch=1000.0, tick=0.0) as clock:
+        start = time.monotonic()
+        time.sleep(3600)
+        assert time.monotonic() - start == 3600
+        assert time.time() == 1000.0 + 3600
+        assert time.gmtime() == ORIGINALS["gmtime"](1000.0 + 3600)
+        with pytest.raises(ValueError):
+            time.sleep(-1)
+    assert clock.elapsed == 3600
+    assert time.perf_counter() - real_start < 1
+
+
+def test_busy_wait_ends():
+    with VirtualClock() as clock:
+        end = time.time() + 5
+        while (time.time() < end):
+            pass
+    assert 5 <= clock.elapsed < 5.001
+
+
+def test_program_sleeps():
+    src = "importar tiempo\ntiempo.esperar(60)\ntiempo.esperar(0.5)\n"
+    real_start = time.perf_counter()
+    with VirtualClock() as clock:
+        exec(compile_text(src), {})
+    assert clock.elapsed == pytest.approx(60.5)
+    assert time.perf_counter() - real_start < 5  # Mostly compiling
+
+
+def test_restored():
+    clock = VirtualClock()
+    with pytest.raises(RuntimeError):
+        with clock:
+            assert time.time is not ORIGINALS["time"] and time.sleep is not ORIGINALS["sleep"]
+            raise RuntimeError()
+    assert {name: getattr(time, name) for name in VirtualClock.patched} == ORIGINALS
+    clock.uninstall()  # Again does nothing
+    assert time.monotonic is ORIGINALS["monotonic"]
+    assert abs(time.time() - ORIGINALS["time"]()) < 1
@@ -0,0 +1,56 @@
+# Watch mode recompiles only what a change affects, and runs programs importing the modules beside them
+import pytest
+
+import watch
+
+PROJECT = {
+    "util.py": 'función saludo():\n    devolver "hola"\n',
+    "sub/juego.py": "importar otro\nimportar util\nescribir(otro.doble(21), util.saludo())\n",
+    "sub/otro.py": "función doble(n):\n    devolver n * 2\n",
+}
+
+
+@pytest.fixture
+def project(tmp_path):
+    for name, src in PROJECT.items():
+        (tmp_path / "proyecto" / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "proyecto" / name).write_text(src, encoding="utf8")
+    return tmp_path / "proyecto"
+
+
+def watcher(lang_path, project):
+    return watch.Watcher(lang_path, str(project), str(project.parent / "salida"), polling=True)
+
+
+def test_recompiles_what_changed(lang_path, project):
+    files = watcher(lang_path, project)
+    assert sorted(files.sync()) == ["sub/juego.py", "sub/otro.py", "util.py"]
+    assert files.sync() == []
+
+    # Same interface - its importer isn't compiled again
+    (project / "sub/otro.py").write_text("función doble(n):\n    devolver n + n\n", encoding="utf8")
+    assert files.sync({"sub/otro.py"}) == ["sub/otro.py"]
+
+    # New interface
+    (project / "sub/otro.py").write_text("función doble(n):\n    devolver n + n\nfunción triple(n):\n    devolver n * 3\n", encoding="utf8")
+    assert files.sync({"sub/otro.py"}) == ["sub/otro.py", "sub/juego.py"]
+
+    # Hashes are kept, so a restart compiles nothing
+    assert watcher(lang_path, project).sync() == []
+
+
+def test_errors_reported(lang_path, project):
+    files = watcher(lang_path, project)
+    files.sync()
+    (project / "util.py").write_text("x = = 1\n", encoding="utf8")
+    reports = []
+    files.sync({"util.py"}, lambda name, seconds, error: reports.append((name, error)))
+    assert [name for name, error in reports] == ["util.py"]
+    assert isinstance(reports[0][1], SyntaxError)
+
+
+def test_run_imports_beside_and_top(lang_path, project, capfd):
+    files = watcher(lang_path, project)
+    files.sync()
+    files.run("sub/juego.py")
+    assert capfd.readouterr().out == "42 hola\n"
@@ -0,0 +1,338 @@
+"""Watch mode - recompile a project's translated files as they are saved, with the compiler kept warm between saves"""
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+
+import compile
+from compilers.incremental import CodeblockParser, IncrementalCompiler
+from compilers.python import PythonLexer
+from languages.language import LanguageEnv
+from log import logger, set_verbosity_options, verbosity_options
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Inotify:
+    """Changes to files in directory trees, from Linux's inotify (through libc, with ctypes)"""
+
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE  # Finished writes, not each one
+    event_header = struct.Struct("iIII")  # Watch descriptor, mask, cookie, name length
+
+    def __init__(self, ignore=lambda path: False):
+        """ignore(path) - whether to skip a directory (and everything in it)"""
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if (self.fd < 0):
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.ignore = ignore
+        self.directories = {}  # Watch descriptor > directory
+
+    def add(self, directory: str):
+        """Watch a directory tree, returning the files already in it"""
+        files = []
+        for dir_path, dir_names, file_names in os.walk(directory):
+            dir_names[:] = [name for name in dir_names if not self.ignore(os.path.join(dir_path, name))]
+            watch = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), self.mask)
+            if (watch < 0):
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), dir_path)
+            self.directories[watch] = dir_path
+            files += [os.path.join(dir_path, name) for name in file_names]
+        return files
+
+    def changes(self, timeout: float = None):
+        """Wait up to timeout seconds (forever if None) for changes, returning the set of paths changed - None if events were lost"""
+        if (len(select.select([self.fd], [], [], timeout)[0]) == 0):
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while (offset < len(data)):
+                watch, mask, cookie, length = self.event_header.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + self.event_header.size:offset + self.event_header.size + length].rstrip(b"\0"))
+                offset += self.event_header.size + length
+                if (mask & self.IN_Q_OVERFLOW):
+                    changed = None
+                if (changed is None or watch not in self.directories):
+                    continue
+                path = os.path.join(self.directories[watch], name)
+                if (mask & self.IN_ISDIR):
+                    if (mask & (self.IN_CREATE | self.IN_MOVED_TO) and not self.ignore(path)):
+                        changed.update(self.add(path))  # Files may be written before it is watched
+                else:
+                    changed.add(path)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller:
+    """Changes to files in a directory tree, found by comparing their modification times and sizes every interval seconds"""
+
+    def __init__(self, directory: str, interval: float = 0.5, ignore=lambda path: False):
+        self.directory = directory
+        self.interval = interval
+        self.ignore = ignore
+        self.stats = self.scan()
+
+    def scan(self):
+        """Get each file's (modification time, size)"""
+        stats = {}
+        for dir_path, dir_names, file_names in os.walk(self.directory):
+            dir_names[:] = [name for name in dir_names if not self.ignore(os.path.join(dir_path, name))]
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Just deleted
+                stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def changes(self, timeout: float = None):
+        """Wait up to timeout seconds (forever if None) for changes, returning the set of paths changed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - time.monotonic())))
+            stats = self.scan()
+            changed = {path for path in stats.keys() | self.stats.keys() if stats.get(path) != self.stats.get(path)}
+            self.stats = stats
+            if (len(changed) > 0 or (deadline is not None and time.monotonic() >= deadline)):
+                return changed
+
+    def close(self):
+        pass
+
+
+class Watcher:
+    """Compile the translated files (*.py) in project_dir to out_dir (compiled file, debug file and interface summary, e.g. juego.py,
+    juego.json and juego.pyi.json), recompiling files as they change. One parser (and the language's packs) is shared by every file, and
+    each file has an IncrementalCompiler, so a save only reparses its changed statements. Files are only compiled if their content hash
+    changed - hashes are saved in out_dir, so restarting doesn't recompile unchanged files either.
+    Files import each other's interface summaries, so a file is only compiled again for another's change if that one's interface changed."""
+
+    MANIFEST = ".watch.json"
+
+    def __init__(self, lang_dir: str, project_dir: str, out_dir: str, debounce: float = 0.05, polling: bool = None, poll_interval: float = 0.5):
+        """Saves are collected until none comes for debounce seconds. Changes are found by polling if polling, or if inotify isn't available (None)."""
+        self.lang_dir = lang_dir
+        self.project_dir = os.path.abspath(project_dir)
+        self.out_dir = os.path.abspath(out_dir)
+        self.debounce = debounce
+        self.polling = polling
+        self.poll_interval = poll_interval
+
+        lang = LanguageEnv(lang_dir)
+        lexer = PythonLexer(lang)
+        lexer.build()
+        self.parser = CodeblockParser(lang, lexer)
+        self.compilers = {}  # Source path (relative) > IncrementalCompiler
+        self.imports = {}  # Source path (relative) > names of the modules it imports, from its last compile
+        self.changed_interfaces = set()  # Modules whose interface changed since sync started
+
+        self.hashes = {}  # Source path (relative) > hash of the content its outputs were compiled from
+        if (os.path.exists(os.path.join(self.out_dir, self.MANIFEST))):
+            with open(os.path.join(self.out_dir, self.MANIFEST), "r", encoding="utf8") as reader:
+                self.hashes = json.load(reader)
+
+    def ignored(self, path: str):
+        """Whether a directory isn't part of the project"""
+        return path == self.out_dir or os.path.basename(path) in ("__pycache__", ".git")
+
+    def outputs(self, name: str):
+        """Get the compiled file, debug file and interface summary paths of a source path (relative)"""
+        base = os.path.join(self.out_dir, name[:-len(".py")])
+        return base + ".py", base + ".json", base + LanguageEnv.SUMMARY_SUFFIX
+
+    def module_dirs(self, name: str):
+        """Get the directories a source path's (relative) imports are found in - beside it (like a script's), then the top of out_dir"""
+        return list(dict.fromkeys([os.path.dirname(self.outputs(name)[0]), self.out_dir]))
+
+    @staticmethod
+    def module_name(name: str):
+        """Get the module name of a source path (relative), as imported"""
+        return os.path.basename(name)[:-len(".py")]
+
+    def imported_modules(self, name: str):
+        """Get the names of the modules a source path (relative) imported when it was last compiled - from its debug file after a restart"""
+        if (name not in self.imports):
+            try:
+                with open(self.outputs(name)[1], "r", encoding="utf8") as reader:
+                    self.imports[name] = {imported[0][0] for imported in json.load(reader)["imported"]}
+            except (OSError, ValueError, KeyError):
+                return set()
+        return self.imports[name]
+
+    def sources(self):
+        """Get the source paths (relative) in the project"""
+        names = []
+        for dir_path, dir_names, file_names in os.walk(self.project_dir):
+            dir_names[:] = sorted(name for name in dir_names if not self.ignored(os.path.join(dir_path, name)))
+            names += [os.path.relpath(os.path.join(dir_path, name), self.project_dir) for name in sorted(file_names) if name.endswith(".py")]
+        return names
+
+    def compile_file(self, name: str, force: bool = False):
+        """Compile a source file if its content changed (or if force), returning whether it was compiled. Raises the compiler's error if it doesn't compile.
+        If its interface changed, its module is added to changed_interfaces."""
+        with open(os.path.join(self.project_dir, name), "rb") as reader:
+            data = reader.read()
+        content_hash = hashlib.sha1(data).hexdigest()
+        compiled_file, debug_file, summary_file = self.outputs(name)
+        if (not force and self.hashes.get(name) == content_hash and os.path.exists(compiled_file)):
+            return False  # Saved without changes (or only touched)
+
+        src = data.decode("utf8")
+        compiler = None if force else self.compilers.get(name)  # Imported interfaces may have changed under its cached regions
+        if (compiler is None):
+            compiler = self.compilers[name] = IncrementalCompiler(self.lang_dir, self.parser, self.module_dirs(name))
+        self.hashes.pop(name, None)  # Outputs out of date until written
+        result = compiler.compile(src)
+
+        os.makedirs(os.path.dirname(compiled_file), exist_ok=True)
+        with open(compiled_file, "w", encoding="utf8") as writer:
+            writer.write(str(result))
+        debug_data = compile.get_debug_data(result, src)
+        with open(debug_file, "w", encoding="utf8") as writer:
+            json.dump(debug_data, writer)
+        self.imports[name] = {imported[0][0] for imported in debug_data["imported"]}
+
+        summary = compiler.module_summary(self.module_name(name))
+        if (not os.path.exists(summary_file) or self.parser.lang.load_summary(summary_file)[0] != summary["hash"]):
+            with open(summary_file, "w", encoding="utf8") as writer:
+                json.dump(summary, writer, ensure_ascii=False)
+            self.changed_interfaces.add(self.module_name(name))
+        self.hashes[name] = content_hash
+        return True
+
+    def remove_file(self, name: str):
+        """Remove a deleted source file's outputs"""
+        for path in self.outputs(name):
+            if (os.path.exists(path)):
+                os.remove(path)
+        self.hashes.pop(name, None)
+        self.compilers.pop(name, None)
+        self.imports.pop(name, None)
+        self.changed_interfaces.add(self.module_name(name))
+
+    def sync(self, names=None, report=None):
+        """Bring the outputs of source paths (relative; all if None) up to date, returning the paths compiled.
+        Files importing a module whose interface changed are compiled again, as are files which failed (they may have needed it).
+        report(name, seconds, error) is called for each file compiled (error is None if it compiled)."""
+        if (names is None):
+            names = set(self.sources()) | self.hashes.keys()
+        compiled = []
+        failed = set()
+        forced = set()
+        for i in range(len(self.sources()) + 1):  # Each round follows imports one step - more would mean the interfaces keep changing
+            self.changed_interfaces = set()
+            for name in sorted(names):
+                if (not os.path.isfile(os.path.join(self.project_dir, name))):
+                    self.remove_file(name)
+                    continue
+                start = time.perf_counter()
+                try:
+                    changed = self.compile_file(name, name in forced)
+                    error = None
+                    failed.discard(name)
+                except Exception as err:
+                    changed, error = True, err  # Reported - the next save will try again
+                    self.compilers.pop(name, None)  # Its state may be part-way through a parse
+                    failed.add(name)
+                if (changed):
+                    if (name not in compiled):
+                        compiled.append(name)
+                    if (report is not None):
+                        report(name, time.perf_counter() - start, error)
+
+            if (len(self.changed_interfaces) == 0):
+                break
+            # Importers of the changed modules
+            names = forced = {name for name in self.sources() if name in failed or len(self.imported_modules(name) & self.changed_interfaces) > 0}
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(os.path.join(self.out_dir, self.MANIFEST), "w", encoding="utf8") as writer:
+            json.dump(self.hashes, writer)
+        return compiled
+
+    def changes(self):
+        """Get an iterator of the source paths (relative) changed in each burst of saves - None if every file should be checked"""
+        if (self.polling is not True and sys.platform.startswith("linux")):
+            try:
+                events = Inotify(self.ignored)
+                events.add(self.project_dir)
+            except OSError as err:
+                logger.warning("Polling for changes - inotify isn't available (%s)", err)
+                events = Poller(self.project_dir, self.poll_interval, self.ignored)
+        else:
+            events = Poller(self.project_dir, self.poll_interval, self.ignored)
+
+        try:
+            while True:
+                changed = events.changes()
+                # Debounce - wait for the burst to end
+                while (changed is not None):
+                    more = events.changes(self.debounce)
+                    if (more is not None and len(more) == 0):
+                        break  # Quiet
+                    changed = None if more is None else changed | more
+
+                if (changed is None):
+                    yield None
+                else:
+                    names = {os.path.relpath(path, self.project_dir) for path in changed if path.endswith(".py")}
+                    if (len(names) > 0):
+                        yield names
+        finally:
+            events.close()
+
+    def watch(self, report=None, run: str = None):
+        """Compile the project, then recompile what changes until interrupted (see sync for report).
+        If run is a source path (relative), that program is run with the debugger after each burst of saves which compiled something."""
+        self.sync(None, report)
+        for names in self.changes():
+            if (len(self.sync(names, report)) > 0 and run is not None and run in self.hashes):
+                self.run(run)
+
+    def run(self, name: str):
+        """Run a compiled source path (relative) with the debugger, in out_dir - it can import the modules beside it and at the top of out_dir"""
+        compiled_file, debug_file = self.outputs(name)[:2]
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(self.module_dirs(name) + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+        subprocess.run([sys.executable, os.path.join(ROOT_DIR, "debug.py"), compiled_file, os.path.join(self.project_dir, name),
+                        debug_file, os.path.abspath(self.lang_dir)] + verbosity_options(), cwd=self.out_dir, env=env)
+
+
+def print_report(name: str, seconds: float, error):
+    if (error is None):
+        print(f"{name} ({seconds * 1000:.0f} ms)")
+    else:
+        for err in getattr(error, "errors", [error]):  # Every syntax error in the file
+            print(f"{name}: {type(err).__name__}: {err}")
+
+
+if __name__ == "__main__":
+    # watch.py language_path project_dir out_dir [--run program.py] [--poll] [-v|-q] - e.g. watch.py languages/es proyecto compilado --run main.py
+    options = sys.argv[4:]
+    set_verbosity_options(options)
+    watcher = Watcher(sys.argv[1], sys.argv[2], sys.argv[3], polling=True if "--poll" in options else None)
+    try:
+        watcher.watch(print_report, options[options.index("--run") + 1] if "--run" in options else None)
+    except KeyboardInterrupt:
+        pass